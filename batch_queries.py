@@ -0,0 +1,305 @@
+#!/usr/bin/env python
+"""
+Script para responder lotes de consultas (por ejemplo, listas de chequeo de due diligence).
+
+Lee las preguntas de un archivo CSV o JSONL con una columna de tema, ejecuta el flujo
+recuperación -> reranking -> generación con un pool de workers y escribe cada resultado
+en cuanto termina (JSONL o CSV) junto con los tiempos de cada etapa.
+
+El archivo de salida funciona también como punto de control: si la ejecución se
+interrumpe, al volver a lanzarla con la misma salida solo se procesan las preguntas
+que no tienen un resultado exitoso.
+
+Las llamadas a OpenAI del lote usan la prioridad "batch" del limitador compartido
+(graph/rate_limit.py), de modo que no desplazan a los usuarios de la aplicación.
+
+Ejemplo:
+    python batch_queries.py preguntas.csv --output respuestas.jsonl --workers 4 --rpm 20
+
+Columnas reconocidas en la entrada:
+    id (opcional), tema/topic, pregunta/question
+"""
+
+import argparse
+import csv
+import datetime
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Set
+
+from dotenv import load_dotenv
+
+# Cargar variables de entorno
+load_dotenv()
+
+from graph.chains.openai_client import format_metrics
+from graph.pipeline import answer_query, resolve_topic
+from graph.rate_limit import PRIORITY_BATCH, request_priority
+
+ID_COLUMNS = ["id"]
+TOPIC_COLUMNS = ["tema", "topic"]
+QUESTION_COLUMNS = ["pregunta", "question"]
+
+CSV_FIELDS = [
+    "id",
+    "tema",
+    "pregunta",
+    "estado",
+    "respuesta",
+    "citas",
+    "fuentes",
+    "error",
+    "tiempo_recuperacion",
+    "tiempo_reranking",
+    "tiempo_generacion",
+    "tiempo_total",
+    "fecha",
+]
+
+
+def _first_value(row: Dict[str, Any], columns: List[str]) -> Any:
+    """
+    Devuelve el valor de la primera columna presente en la fila.
+    """
+    lowered = {str(key).strip().lower(): value for key, value in row.items()}
+    for column in columns:
+        value = lowered.get(column)
+        if value not in (None, ""):
+            return value
+    return None
+
+
+def load_questions(path: str) -> List[Dict[str, str]]:
+    """
+    Carga las preguntas de un archivo CSV o JSONL.
+
+    Returns:
+        Lista de diccionarios con las claves id, tema y pregunta
+    """
+    if path.lower().endswith(".jsonl"):
+        with open(path, encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+    else:
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            rows = list(csv.DictReader(f))
+
+    questions = []
+    for i, row in enumerate(rows):
+        question = _first_value(row, QUESTION_COLUMNS)
+        topic = _first_value(row, TOPIC_COLUMNS)
+        if not question or not topic:
+            print(f"load_questions: Fila {i+1} sin pregunta o tema, se omite")
+            continue
+        question_id = _first_value(row, ID_COLUMNS)
+        questions.append({
+            "id": str(question_id) if question_id is not None else str(i + 1),
+            "tema": str(topic).strip(),
+            "pregunta": str(question).strip(),
+        })
+    return questions
+
+
+def load_completed_ids(path: str) -> Set[str]:
+    """
+    Lee el archivo de salida existente y devuelve los ids ya respondidos con éxito.
+    """
+    if not os.path.exists(path):
+        return set()
+
+    completed = set()
+    if path.lower().endswith(".csv"):
+        with open(path, encoding="utf-8", newline="") as f:
+            records = list(csv.DictReader(f))
+    else:
+        records = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # Línea truncada por una interrupción durante la escritura
+                    continue
+
+    for record in records:
+        if record.get("estado") == "ok":
+            completed.add(str(record.get("id")))
+    return completed
+
+
+class RequestThrottle:
+    """
+    Limita el número de consultas que se inician por minuto entre todos los workers.
+    """
+
+    def __init__(self, requests_per_minute: float):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = time.monotonic()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class ResultWriter:
+    """
+    Escribe resultados en JSONL o CSV a medida que llegan, de forma segura entre hilos.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.is_csv = path.lower().endswith(".csv")
+        self._lock = threading.Lock()
+        write_header = self.is_csv and (not os.path.exists(path) or os.path.getsize(path) == 0)
+        self._file = open(path, "a", encoding="utf-8", newline="")
+        if self.is_csv:
+            self._writer = csv.DictWriter(self._file, fieldnames=CSV_FIELDS)
+            if write_header:
+                self._writer.writeheader()
+                self._file.flush()
+
+    def write(self, record: Dict[str, Any]):
+        with self._lock:
+            if self.is_csv:
+                row = dict(record)
+                row["citas"] = " | ".join(record["citas"])
+                row["fuentes"] = " | ".join(record["fuentes"])
+                for key, value in record["tiempos"].items():
+                    row[f"tiempo_{key}"] = value
+                row.pop("tiempos", None)
+                self._writer.writerow(row)
+            else:
+                self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            # Vaciar en cada resultado para que una interrupción no pierda trabajo terminado
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+def process_question(item: Dict[str, str], throttle: RequestThrottle) -> Dict[str, Any]:
+    """
+    Responde una pregunta y construye el registro de salida.
+    """
+    throttle.wait()
+    record = {
+        "id": item["id"],
+        "tema": item["tema"],
+        "pregunta": item["pregunta"],
+        "estado": "ok",
+        "respuesta": "",
+        "citas": [],
+        "fuentes": [],
+        "error": "",
+        "tiempos": {},
+        "fecha": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    start_time = time.perf_counter()
+    try:
+        # Las llamadas del lote ceden el paso a las consultas interactivas de la aplicación
+        with request_priority(PRIORITY_BATCH):
+            result = answer_query(item["pregunta"], item["tema"])
+        record["respuesta"] = result["text"]
+        record["citas"] = [citation["document_title"] for citation in result["citations"]]
+        record["fuentes"] = [doc.metadata.get("source", "") for doc in result["documents"]]
+        record["tiempos"] = {
+            "recuperacion": round(result["timings"]["retrieval"], 3),
+            "reranking": round(result["timings"]["rerank"], 3),
+            "generacion": round(result["timings"]["generation"], 3),
+            "total": round(result["timings"]["total"], 3),
+        }
+        if result["error"]:
+            record["estado"] = "error"
+            record["error"] = result["error"]
+    except Exception as e:
+        record["estado"] = "error"
+        record["error"] = str(e)
+        record["tiempos"] = {"total": round(time.perf_counter() - start_time, 3)}
+    return record
+
+
+def run_batch(input_path: str, output_path: str, workers: int = 4, requests_per_minute: float = 0):
+    """
+    Procesa todas las preguntas pendientes del archivo de entrada.
+    """
+    questions = load_questions(input_path)
+
+    # Validar los temas antes de empezar para no gastar llamadas en filas inválidas
+    valid_questions = []
+    for item in questions:
+        try:
+            item["tema"] = resolve_topic(item["tema"])
+            valid_questions.append(item)
+        except ValueError as e:
+            print(f"run_batch: Pregunta {item['id']} omitida: {e}")
+
+    completed = load_completed_ids(output_path)
+    pending = [item for item in valid_questions if item["id"] not in completed]
+
+    print(f"run_batch: {len(valid_questions)} preguntas válidas, {len(completed)} ya respondidas, {len(pending)} pendientes")
+    if not pending:
+        return
+
+    throttle = RequestThrottle(requests_per_minute)
+    writer = ResultWriter(output_path)
+    batch_start = time.perf_counter()
+    ok_count = 0
+    error_count = 0
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(process_question, item, throttle): item for item in pending}
+            for i, future in enumerate(as_completed(futures)):
+                record = future.result()
+                writer.write(record)
+                if record["estado"] == "ok":
+                    ok_count += 1
+                else:
+                    error_count += 1
+                print(
+                    f"[{i+1}/{len(pending)}] id={record['id']} tema={record['tema']} "
+                    f"estado={record['estado']} total={record['tiempos'].get('total', 0):.2f}s"
+                )
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - batch_start
+    print(f"\nLote terminado en {elapsed:.1f} s: {ok_count} exitosas, {error_count} con error")
+    print("\nMétricas de OpenAI:")
+    print(format_metrics())
+    if error_count:
+        print("Las preguntas con error se reintentarán al volver a ejecutar el script con la misma salida.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Responde un lote de consultas tributarias")
+    parser.add_argument("input", type=str, help="Archivo CSV o JSONL con las preguntas")
+    parser.add_argument("--output", "-o", type=str, default="respuestas.jsonl",
+                        help="Archivo de salida (.jsonl o .csv); también sirve para reanudar")
+    parser.add_argument("--workers", "-w", type=int, default=4,
+                        help="Número de consultas procesadas en paralelo")
+    parser.add_argument("--rpm", type=float, default=0,
+                        help="Máximo de consultas iniciadas por minuto (0 = sin límite)")
+
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        print(f"No existe el archivo de entrada: {args.input}")
+        sys.exit(1)
+
+    run_batch(args.input, args.output, workers=max(1, args.workers), requests_per_minute=args.rpm)
+
+
+if __name__ == "__main__":
+    main()
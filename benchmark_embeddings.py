@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+"""
+Mide el rendimiento de los embeddings (textos por segundo) con EmbeddingService
+frente a una solicitud por texto (como get_embedding).
+
+Por defecto usa un servidor local que imita la API de OpenAI
+(graph/chains/fake_openai.py) con una latencia por solicitud configurable, de modo
+que la medición no depende de la red ni tiene costo. Con --base-url se mide contra
+otro servidor compatible.
+
+Ejemplo:
+    python benchmark_embeddings.py --texts 2000 --latency 0.2
+    python benchmark_embeddings.py --concurrency 1 2 4 8
+"""
+
+import argparse
+import time
+from typing import Callable, List
+
+from openai import OpenAI
+
+from graph.chains.embeddings import EMBEDDING_CONCURRENCY, EmbeddingService
+from graph.chains.fake_openai import FakeOpenAI
+from graph.rate_limit import RateLimiter
+
+
+def measure(label: str, texts: List[str], func: Callable[[List[str]], object]) -> float:
+    began = time.perf_counter()
+    func(texts)
+    seconds = time.perf_counter() - began
+    rate = len(texts) / seconds
+    print(f"{label:<40} {seconds:8.2f} s {rate:10.1f} textos/s")
+    return rate
+
+
+def run(client: OpenAI, args):
+    texts = [f"Fragmento {i}: " + "texto de prueba del corpus tributario " * args.words for i in range(args.texts)]
+    limiter = RateLimiter("benchmark", args.rpm, args.tpm)
+
+    def one_by_one(batch):
+        service = EmbeddingService(args.model, client=client, max_inputs=1, concurrency=1, limiter=limiter)
+        for text in batch:
+            service.embed([text])
+
+    single = texts[:args.single] if args.single else texts
+    baseline = measure(f"una solicitud por texto ({len(single)} textos)", single, one_by_one)
+    for concurrency in args.concurrency:
+        service = EmbeddingService(args.model, client=client, concurrency=concurrency, limiter=limiter)
+        rate = measure(f"EmbeddingService, concurrencia {concurrency}", texts, service.embed)
+        print(f"{'':<40} {service.stats['requests']} solicitudes, x{rate / baseline:.1f} frente a una por texto")
+        service.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rendimiento de EmbeddingService.")
+    parser.add_argument("--texts", type=int, default=1000, help="Textos a procesar")
+    parser.add_argument("--words", type=int, default=20, help="Repeticiones de la frase de prueba por texto")
+    parser.add_argument("--single", type=int, default=200, help="Textos para la medición de una solicitud por texto")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, EMBEDDING_CONCURRENCY])
+    parser.add_argument("--model", default="text-embedding-3-large")
+    parser.add_argument("--latency", type=float, default=0.1, help="Latencia por solicitud del servidor local (s)")
+    parser.add_argument("--latency-per-input", type=float, default=0.0005, help="Latencia por texto del servidor local (s)")
+    parser.add_argument("--rpm", type=float, default=100000, help="Solicitudes por minuto del limitador")
+    parser.add_argument("--tpm", type=float, default=100000000, help="Tokens por minuto del limitador")
+    parser.add_argument("--base-url", help="Servidor compatible con OpenAI (por defecto, el local)")
+    args = parser.parse_args()
+
+    if args.base_url:
+        run(OpenAI(base_url=args.base_url, max_retries=0), args)
+        return
+    with FakeOpenAI(latency=args.latency, latency_per_input=args.latency_per_input) as server:
+        run(OpenAI(api_key="benchmark", base_url=server.url, max_retries=0), args)
+
+
+if __name__ == "__main__":
+    main()
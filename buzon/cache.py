@@ -0,0 +1,143 @@
+"""
+Copia local de las observaciones de GitHub para la vista de administración.
+
+La copia se guarda ya procesada en SQLite (en la misma base del journal) junto con
+el ETag de la última descarga. Recargar hace una petición condicional: si el
+archivo no cambió, GitHub responde 304 y no se descarga ni se procesa nada. Los
+filtros y la paginación de la tabla se resuelven con SQL sobre la copia, sumando
+las observaciones del journal que aún no se han subido.
+"""
+
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from buzon.github import GitHubContents, parse_csv
+from buzon.journal import FIELDS, Journal
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS remote_observaciones (
+    seq INTEGER PRIMARY KEY,
+    id TEXT,
+    fecha TEXT,
+    nombre TEXT,
+    correo TEXT,
+    tipo TEXT,
+    asunto TEXT,
+    mensaje TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_remote_tipo_fecha ON remote_observaciones (tipo, fecha);
+CREATE INDEX IF NOT EXISTS idx_remote_fecha ON remote_observaciones (fecha);
+CREATE INDEX IF NOT EXISTS idx_remote_id ON remote_observaciones (id);
+CREATE TABLE IF NOT EXISTS remote_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Copia remota más las observaciones locales que no estaban en GitHub al descargarla
+# (pendientes o subidas después)
+ALL_OBSERVACIONES = """
+SELECT seq, id, fecha, nombre, correo, tipo, asunto, mensaje FROM remote_observaciones
+UNION ALL
+SELECT seq + 1000000000, id, fecha, nombre, correo, tipo, asunto, mensaje FROM observaciones
+WHERE (synced_at IS NULL OR synced_at > COALESCE((SELECT CAST(value AS REAL) FROM remote_meta WHERE key = 'fetched_at'), 0))
+  AND id NOT IN (SELECT id FROM remote_observaciones WHERE id IS NOT NULL)
+"""
+
+
+class ObservacionesCache:
+    """
+    Copia procesada del CSV remoto, actualizada con peticiones condicionales.
+    """
+
+    def __init__(self, journal: Journal, remote: Optional[GitHubContents]):
+        self.journal = journal
+        self.remote = remote
+        with journal.connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _meta(self, key: str) -> Optional[str]:
+        row = self.journal.connect().execute("SELECT value FROM remote_meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def refresh(self) -> Dict[str, Any]:
+        """
+        Actualiza la copia local si el archivo de GitHub cambió.
+
+        Returns:
+            Diccionario con el estado HTTP, si hubo cambios, filas y segundos
+        """
+        start = time.perf_counter()
+        if self.remote is None:
+            return {"status": None, "changed": False, "rows": self.count(), "seconds": 0.0}
+
+        status, text, sha, etag = self.remote.fetch(self._meta("etag"))
+        if status == 304:
+            return {"status": 304, "changed": False, "rows": self.count(), "seconds": time.perf_counter() - start}
+
+        rows = parse_csv(text)
+        with self.journal.connect() as conn:
+            conn.execute("DELETE FROM remote_observaciones")
+            conn.executemany(
+                f"INSERT INTO remote_observaciones ({', '.join(FIELDS)}) VALUES ({', '.join('?' * len(FIELDS))})",
+                [[row.get(column) or None for column in FIELDS.values()] for row in rows],
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO remote_meta (key, value) VALUES (?, ?)",
+                [("etag", etag), ("sha", sha), ("fetched_at", str(time.time()))],
+            )
+        return {"status": status, "changed": True, "rows": len(rows), "seconds": time.perf_counter() - start}
+
+    @staticmethod
+    def _where(tipo: Optional[str], fecha: Optional[str]) -> Tuple[str, List[Any]]:
+        clauses, params = [], []
+        if tipo not in (None, "", "Todos"):
+            clauses.append("tipo = ?")
+            params.append(tipo)
+        if fecha not in (None, "", "Todas"):
+            # Rango en lugar de LIKE para aprovechar el índice por fecha
+            clauses.append("fecha >= ? AND fecha < ?")
+            params.extend([fecha, fecha + "~"])
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def count(self, tipo: Optional[str] = None, fecha: Optional[str] = None) -> int:
+        where, params = self._where(tipo, fecha)
+        return self.journal.connect().execute(
+            f"SELECT COUNT(*) FROM ({ALL_OBSERVACIONES}){where}", params
+        ).fetchone()[0]
+
+    def query(self, page: int = 1, page_size: int = 50, tipo: Optional[str] = None,
+              fecha: Optional[str] = None) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Una página de observaciones (más recientes primero) con las columnas del CSV.
+
+        Args:
+            page_size: Observaciones por página; -1 para todas
+
+        Returns:
+            Tupla (observaciones de la página, total que cumple los filtros)
+        """
+        where, params = self._where(tipo, fecha)
+        rows = self.journal.connect().execute(
+            f"SELECT * FROM ({ALL_OBSERVACIONES}){where} ORDER BY fecha DESC, seq DESC LIMIT ? OFFSET ?",
+            params + [page_size, max(page - 1, 0) * max(page_size, 0)],
+        ).fetchall()
+        return [{column: row[field] for field, column in FIELDS.items()} for row in rows], self.count(tipo, fecha)
+
+    def facets(self) -> Dict[str, List[str]]:
+        """
+        Tipos y fechas (día) disponibles para los filtros.
+        """
+        conn = self.journal.connect()
+        return {
+            "tipo": [row[0] for row in conn.execute(
+                f"SELECT DISTINCT tipo FROM ({ALL_OBSERVACIONES}) WHERE tipo IS NOT NULL ORDER BY tipo")],
+            "fecha": [row[0] for row in conn.execute(
+                f"SELECT DISTINCT substr(fecha, 1, 10) AS dia FROM ({ALL_OBSERVACIONES}) "
+                "WHERE fecha IS NOT NULL ORDER BY dia DESC")],
+        }
+
+    def clear(self):
+        with self.journal.connect() as conn:
+            conn.execute("DELETE FROM remote_observaciones")
+            conn.execute("DELETE FROM remote_meta")
@@ -0,0 +1,135 @@
+"""
+Servidor local que imita la API de contenidos de GitHub, para probar el buzón sin red.
+
+Implementa GET y PUT de /repos/<owner>/<repo>/contents/<path> con la misma
+semántica de SHA (409 si el SHA no es el actual, 422 si se crea un archivo que ya
+existe), ETag/If-None-Match en GET, y permite simular fallos y escrituras de otra
+instancia.
+
+Ejemplo:
+    with FakeGitHub() as github:
+        remote = GitHubContents("o", "r", "data/observaciones.csv", "token", base_url=github.url)
+"""
+
+import base64
+import hashlib
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+
+class FakeGitHub:
+    """
+    API de contenidos en memoria servida en 127.0.0.1 en un puerto libre.
+    """
+
+    def __init__(self):
+        self.files: Dict[str, bytes] = {}
+        self.requests: List[str] = []
+        # Códigos de error que devolverán las próximas peticiones, en orden
+        self.fail_next: List[int] = []
+        # Contenido que "otra instancia" escribirá justo antes del próximo PUT
+        self.concurrent_write: Optional[Dict[str, str]] = None
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    @staticmethod
+    def sha(content: bytes) -> str:
+        return hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest()
+
+    def read(self, path: str) -> Optional[str]:
+        content = self.files.get(path)
+        return content.decode("utf-8") if content is not None else None
+
+    def write(self, path: str, text: str):
+        with self._lock:
+            self.files[path] = text.encode("utf-8")
+
+    def __enter__(self) -> "FakeGitHub":
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _path(self) -> Optional[str]:
+                parts = self.path.split("?")[0].split("/contents/", 1)
+                return parts[1] if len(parts) == 2 else None
+
+            def _reply(self, status: int, body: Optional[dict] = None, headers: Optional[Dict[str, str]] = None):
+                data = json.dumps(body).encode("utf-8") if body is not None else b""
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _fail(self) -> bool:
+                with fake._lock:
+                    fake.requests.append(f"{self.command} {self.path}")
+                    status = fake.fail_next.pop(0) if fake.fail_next else None
+                if status:
+                    self._reply(status, {"message": "Error simulado"})
+                    return True
+                return False
+
+            def do_GET(self):
+                if self._fail():
+                    return
+                path = self._path()
+                with fake._lock:
+                    content = fake.files.get(path)
+                if content is None:
+                    self._reply(404, {"message": "Not Found"})
+                    return
+                sha = fake.sha(content)
+                etag = f'"{sha}"'
+                if self.headers.get("If-None-Match") == etag:
+                    self._reply(304, headers={"ETag": etag})
+                    return
+                self._reply(
+                    200,
+                    {"path": path, "sha": sha, "encoding": "base64", "content": base64.b64encode(content).decode()},
+                    {"ETag": etag},
+                )
+
+            def do_PUT(self):
+                if self._fail():
+                    return
+                path = self._path()
+                data = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                with fake._lock:
+                    if fake.concurrent_write is not None:
+                        for other_path, text in fake.concurrent_write.items():
+                            fake.files[other_path] = text.encode("utf-8")
+                        fake.concurrent_write = None
+
+                    current = fake.files.get(path)
+                    if current is not None and "sha" not in data:
+                        self._reply(422, {"message": "\"sha\" wasn't supplied."})
+                        return
+                    if current is not None and data["sha"] != fake.sha(current):
+                        self._reply(409, {"message": f"{path} does not match {data['sha']}"})
+                        return
+                    content = base64.b64decode(data["content"])
+                    fake.files[path] = content
+                self._reply(201 if current is None else 200, {"content": {"path": path, "sha": fake.sha(content)}})
+
+        return Handler
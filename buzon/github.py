@@ -0,0 +1,127 @@
+"""
+Cliente mínimo de la API de contenidos de GitHub para el archivo de observaciones.
+
+Solo cubre lo que necesita el buzón: leer el archivo con su SHA y escribirlo
+indicando el SHA sobre el que se hicieron los cambios. Si otro proceso escribió
+entretanto, GitHub responde 409 y se lanza ShaConflict para que quien llama vuelva
+a leer y fusionar.
+"""
+
+import base64
+import csv
+import io
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+GITHUB_API_URL = os.environ.get("GITHUB_API_URL", "https://api.github.com")
+GITHUB_TIMEOUT = float(os.environ.get("GITHUB_TIMEOUT", 15))
+
+# Columnas del CSV de observaciones; Id permite fusionar sin duplicar
+COLUMNS = ["Id", "Fecha", "Nombre", "Correo", "Tipo", "Asunto", "Mensaje"]
+
+
+class GitHubError(Exception):
+    """
+    Error al leer o escribir el archivo en GitHub.
+    """
+
+
+class ShaConflict(GitHubError):
+    """
+    El archivo cambió en GitHub desde que se leyó su SHA.
+    """
+
+
+def parse_csv(text: Optional[str]) -> List[Dict[str, Any]]:
+    if not text:
+        return []
+    return [dict(row) for row in csv.DictReader(io.StringIO(text))]
+
+
+def to_csv(rows: List[Dict[str, Any]]) -> str:
+    buffer = io.StringIO()
+    extra = [key for row in rows for key in row if key not in COLUMNS]
+    writer = csv.DictWriter(buffer, fieldnames=COLUMNS + list(dict.fromkeys(extra)), lineterminator="\n")
+    writer.writeheader()
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+
+class GitHubContents:
+    """
+    Un archivo de un repositorio de GitHub, leído y escrito por la API de contenidos.
+    """
+
+    def __init__(self, owner: str, repo: str, path: str, token: str, base_url: str = GITHUB_API_URL,
+                 session=None):
+        import requests
+
+        self.url = f"{base_url.rstrip('/')}/repos/{owner}/{repo}/contents/{path}"
+        self.session = session or requests.Session()
+        self.session.headers.update({
+            "Authorization": f"token {token}",
+            "Accept": "application/vnd.github.v3+json",
+        })
+
+    @classmethod
+    def from_env(cls) -> Optional["GitHubContents"]:
+        """
+        Crea el cliente con GITHUB_TOKEN, GITHUB_REPO_OWNER, GITHUB_REPO_NAME y
+        GITHUB_FILE_PATH; None si no hay token.
+        """
+        token = os.environ.get("GITHUB_TOKEN", "")
+        if not token:
+            return None
+        return cls(
+            os.environ.get("GITHUB_REPO_OWNER", "EsguerraJHR"),
+            os.environ.get("GITHUB_REPO_NAME", "consultoriav-vf"),
+            os.environ.get("GITHUB_FILE_PATH", "data/observaciones.csv"),
+            token,
+        )
+
+    def fetch(self, etag: Optional[str] = None) -> Tuple[int, Optional[str], Optional[str], Optional[str]]:
+        """
+        Lee el archivo con una petición condicional: si `etag` sigue siendo el
+        actual, GitHub responde 304 sin contenido (y sin gastar cuota de la API).
+
+        Returns:
+            Tupla (estado HTTP, contenido, sha, etag); contenido y sha son None con 304 y 404
+        """
+        headers = {"If-None-Match": etag} if etag else {}
+        response = self.session.get(self.url, headers=headers, timeout=GITHUB_TIMEOUT)
+        if response.status_code == 304:
+            return 304, None, None, etag
+        if response.status_code == 404:
+            return 404, None, None, None
+        if response.status_code != 200:
+            raise GitHubError(f"GET {response.status_code}: {response.text[:200]}")
+        content = response.json()
+        text = base64.b64decode(content["content"]).decode("utf-8")
+        return 200, text, content["sha"], response.headers.get("ETag")
+
+    def get(self) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Returns:
+            Tupla (contenido, sha); (None, None) si el archivo no existe
+        """
+        _, text, sha, _ = self.fetch()
+        return text, sha
+
+    def put(self, text: str, sha: Optional[str], message: str) -> str:
+        """
+        Escribe el archivo sobre la versión `sha` (None para crearlo).
+
+        Returns:
+            SHA de la nueva versión
+        """
+        data = {"message": message, "content": base64.b64encode(text.encode("utf-8")).decode("utf-8")}
+        if sha:
+            data["sha"] = sha
+        response = self.session.put(self.url, data=json.dumps(data), timeout=GITHUB_TIMEOUT)
+        # 409: el SHA no es el actual; 422: se intentó crear un archivo que ya existe
+        if response.status_code in (409, 422):
+            raise ShaConflict(f"PUT {response.status_code}: {response.text[:200]}")
+        if response.status_code not in (200, 201):
+            raise GitHubError(f"PUT {response.status_code}: {response.text[:200]}")
+        return response.json()["content"]["sha"]
@@ -0,0 +1,242 @@
+"""
+Registro local de observaciones y sincronización por lotes con GitHub.
+
+Cada observación se guarda primero en un journal SQLite local (solo se agregan
+filas, así que escribir cuesta lo mismo con 10 que con 10.000 observaciones) y la
+página responde de inmediato. Un hilo en segundo plano sube las pendientes a
+GitHub en lotes: lee el CSV remoto con su SHA, agrega las que aún no están (por Id)
+y lo escribe indicando ese SHA. Si otra instancia escribió entretanto, vuelve a
+leer y fusionar; si GitHub falla, reintenta más tarde con espera exponencial.
+
+Configuración por variables de entorno:
+    BUZON_JOURNAL_DB: archivo SQLite del journal (por defecto buzon.sqlite)
+    BUZON_FLUSH_DELAY: segundos que se esperan para agrupar envíos (por defecto 5)
+    BUZON_FLUSH_INTERVAL: cada cuánto se reintenta si hay pendientes (por defecto 60)
+    BUZON_BATCH_SIZE: observaciones máximas por escritura (por defecto 200)
+"""
+
+import datetime
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from buzon.github import COLUMNS, GitHubContents, GitHubError, ShaConflict, parse_csv, to_csv
+
+BUZON_JOURNAL_DB = os.environ.get("BUZON_JOURNAL_DB", "buzon.sqlite")
+BUZON_FLUSH_DELAY = float(os.environ.get("BUZON_FLUSH_DELAY", 5))
+BUZON_FLUSH_INTERVAL = float(os.environ.get("BUZON_FLUSH_INTERVAL", 60))
+BUZON_BATCH_SIZE = int(os.environ.get("BUZON_BATCH_SIZE", 200))
+# Reintentos por conflicto de SHA dentro de una misma sincronización
+MAX_CONFLICT_RETRIES = 5
+MAX_BACKOFF = 900
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS observaciones (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    fecha TEXT NOT NULL,
+    nombre TEXT NOT NULL,
+    correo TEXT NOT NULL,
+    tipo TEXT NOT NULL,
+    asunto TEXT NOT NULL,
+    mensaje TEXT NOT NULL,
+    synced_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_observaciones_pendientes ON observaciones (synced_at, seq);
+"""
+
+# Columna del journal -> columna del CSV
+FIELDS = dict(zip(["id", "fecha", "nombre", "correo", "tipo", "asunto", "mensaje"], COLUMNS))
+
+
+class Journal:
+    """
+    Journal SQLite de observaciones, con marca de sincronización.
+    """
+
+    def __init__(self, db_path: str = BUZON_JOURNAL_DB):
+        self.db_path = db_path
+        self._local = threading.local()
+        with self.connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def append(self, observacion: Dict[str, Any]) -> str:
+        """
+        Guarda una observación (con las columnas del CSV) y devuelve su Id.
+        """
+        row = {field: observacion.get(column) for field, column in FIELDS.items()}
+        row["id"] = row["id"] or uuid.uuid4().hex
+        row["fecha"] = row["fecha"] or datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with self.connect() as conn:
+            conn.execute(
+                f"INSERT OR IGNORE INTO observaciones ({', '.join(FIELDS)}) VALUES ({', '.join('?' * len(FIELDS))})",
+                [row[field] for field in FIELDS],
+            )
+        return row["id"]
+
+    @staticmethod
+    def _to_csv_row(row: sqlite3.Row) -> Dict[str, Any]:
+        return {column: row[field] for field, column in FIELDS.items()}
+
+    def pending(self, limit: int = BUZON_BATCH_SIZE) -> List[Dict[str, Any]]:
+        rows = self.connect().execute(
+            "SELECT * FROM observaciones WHERE synced_at IS NULL ORDER BY seq LIMIT ?", (limit,)
+        ).fetchall()
+        return [self._to_csv_row(row) for row in rows]
+
+    def pending_count(self) -> int:
+        return self.connect().execute("SELECT COUNT(*) FROM observaciones WHERE synced_at IS NULL").fetchone()[0]
+
+    def mark_synced(self, ids: List[str]):
+        with self.connect() as conn:
+            conn.executemany(
+                "UPDATE observaciones SET synced_at = ? WHERE id = ?", [(time.time(), id_) for id_ in ids]
+            )
+
+    def clear(self):
+        with self.connect() as conn:
+            conn.execute("DELETE FROM observaciones")
+
+
+class Flusher:
+    """
+    Hilo que sincroniza las observaciones pendientes del journal con GitHub.
+    """
+
+    def __init__(self, journal: Journal, remote: GitHubContents, delay: float = BUZON_FLUSH_DELAY,
+                 interval: float = BUZON_FLUSH_INTERVAL, batch_size: int = BUZON_BATCH_SIZE):
+        self.journal = journal
+        self.remote = remote
+        self.delay = delay
+        self.interval = interval
+        self.batch_size = batch_size
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self.last_sync: Optional[float] = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "Flusher":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="buzon-flusher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, flush: bool = True):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=30)
+            self._thread = None
+        if flush:
+            self.flush()
+
+    def notify(self):
+        """
+        Avisa de una observación nueva; se sube junto con las que lleguen en los
+        siguientes BUZON_FLUSH_DELAY segundos.
+        """
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            # Con fallos recientes se espera más antes de volver a intentar
+            backoff = min(self.interval * (2 ** self.failures), MAX_BACKOFF) if self.failures else self.interval
+            self._wake.wait(timeout=backoff)
+            if self._stop.is_set():
+                break
+            if self._wake.is_set():
+                self._wake.clear()
+                self._stop.wait(self.delay)
+            try:
+                while self.flush() == self.batch_size:
+                    pass
+            except Exception as e:
+                print(f"Flusher._run: Error inesperado: {e}")
+
+    def flush(self) -> int:
+        """
+        Sube un lote de observaciones pendientes.
+
+        Returns:
+            Número de observaciones sincronizadas (0 si no había o si falló)
+        """
+        with self._lock:
+            pending = self.journal.pending(self.batch_size)
+            if not pending:
+                return 0
+            try:
+                self._merge_and_write(pending)
+            except GitHubError as e:
+                self.failures += 1
+                self.last_error = str(e)
+                print(f"Flusher.flush: No se pudo sincronizar ({self.failures} fallos seguidos): {e}")
+                return 0
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                print(f"Flusher.flush: Error de conexión con GitHub ({self.failures} fallos seguidos): {e}")
+                return 0
+
+            self.journal.mark_synced([row["Id"] for row in pending])
+            self.failures = 0
+            self.last_error = None
+            self.last_sync = time.time()
+            return len(pending)
+
+    def _merge_and_write(self, pending: List[Dict[str, Any]]):
+        for attempt in range(MAX_CONFLICT_RETRIES):
+            text, sha = self.remote.get()
+            rows = parse_csv(text)
+            present = {row.get("Id") for row in rows}
+            new = [row for row in pending if row["Id"] not in present]
+            if not new:
+                return
+            try:
+                self.remote.put(to_csv(rows + new), sha, f"Agregar {len(new)} observaciones")
+                return
+            except ShaConflict as e:
+                print(f"Flusher._merge_and_write: Conflicto de SHA, se vuelve a leer y fusionar (intento {attempt + 1}): {e}")
+                time.sleep(min(0.2 * (2 ** attempt), 2))
+        raise GitHubError(f"El archivo siguió cambiando tras {MAX_CONFLICT_RETRIES} intentos")
+
+    def reset_remote(self) -> bool:
+        """
+        Deja vacío el archivo remoto y el journal local (eliminar todas las observaciones).
+        """
+        with self._lock:
+            for _ in range(MAX_CONFLICT_RETRIES):
+                try:
+                    _, sha = self.remote.get()
+                    self.remote.put(to_csv([]), sha, "Eliminar observaciones")
+                    self.journal.clear()
+                    return True
+                except ShaConflict:
+                    continue
+                except Exception as e:
+                    print(f"Flusher.reset_remote: {e}")
+                    return False
+            return False
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "pending": self.journal.pending_count(),
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "last_sync": self.last_sync,
+        }
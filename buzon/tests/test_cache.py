@@ -0,0 +1,43 @@
+import pytest
+
+pytest.importorskip("requests")
+
+from buzon.cache import ObservacionesCache
+from buzon.fake_github import FakeGitHub
+from buzon.github import GitHubContents, to_csv
+from buzon.journal import Journal
+
+FILE = "data/observaciones.csv"
+
+
+def test_unchanged_file_costs_one_304(tmp_path) -> None:
+    with FakeGitHub() as github:
+        github.write(FILE, to_csv([
+            {"Id": str(i), "Fecha": f"2025-03-0{i % 3 + 1} 10:00:00", "Nombre": "Ana", "Correo": "a@b.co",
+             "Tipo": "Sugerencia" if i % 2 else "Pregunta", "Asunto": f"Asunto {i}", "Mensaje": "..."}
+            for i in range(10)
+        ]))
+        remote = GitHubContents("o", "r", FILE, "token", base_url=github.url)
+        cache = ObservacionesCache(Journal(str(tmp_path / "buzon.sqlite")), remote)
+
+        assert cache.refresh()["status"] == 200
+        result = cache.refresh()
+        assert (result["status"], result["changed"], result["rows"]) == (304, False, 10)
+        assert len(github.requests) == 2
+
+        rows, total = cache.query(page=2, page_size=3, tipo="Sugerencia")
+        assert total == 5 and len(rows) == 2
+        rows, total = cache.query(fecha="2025-03-02")
+        assert total == 3 and all(row["Fecha"].startswith("2025-03-02") for row in rows)
+        assert cache.facets()["fecha"] == ["2025-03-03", "2025-03-02", "2025-03-01"]
+
+
+def test_pending_journal_rows_are_listed(tmp_path) -> None:
+    with FakeGitHub() as github:
+        journal = Journal(str(tmp_path / "buzon.sqlite"))
+        cache = ObservacionesCache(journal, GitHubContents("o", "r", FILE, "token", base_url=github.url))
+        cache.refresh()
+        journal.append({"Nombre": "Ana", "Correo": "a@b.co", "Tipo": "Pregunta", "Asunto": "Local", "Mensaje": "..."})
+
+        rows, total = cache.query()
+        assert total == 1 and rows[0]["Asunto"] == "Local"
@@ -0,0 +1,70 @@
+import pytest
+
+pytest.importorskip("requests")
+
+from buzon.fake_github import FakeGitHub
+from buzon.github import GitHubContents, parse_csv, to_csv
+from buzon.journal import Flusher, Journal
+
+FILE = "data/observaciones.csv"
+
+
+def observacion(asunto: str) -> dict:
+    return {"Nombre": "Ana", "Correo": "ana@example.com", "Tipo": "Sugerencia", "Asunto": asunto, "Mensaje": "..."}
+
+
+def make_flusher(tmp_path, github: FakeGitHub) -> Flusher:
+    remote = GitHubContents("o", "r", FILE, "token", base_url=github.url)
+    return Flusher(Journal(str(tmp_path / "buzon.sqlite")), remote, delay=0, interval=0.05)
+
+
+def test_flush_batches_pending_observations(tmp_path) -> None:
+    with FakeGitHub() as github:
+        flusher = make_flusher(tmp_path, github)
+        for i in range(3):
+            flusher.journal.append(observacion(f"Asunto {i}"))
+
+        assert flusher.flush() == 3
+        assert [row["Asunto"] for row in parse_csv(github.read(FILE))] == ["Asunto 0", "Asunto 1", "Asunto 2"]
+        assert flusher.journal.pending_count() == 0
+        # Un solo GET y un solo PUT para todo el lote
+        assert len(github.requests) == 2
+
+
+def test_sha_conflict_merges_concurrent_write(tmp_path) -> None:
+    with FakeGitHub() as github:
+        github.write(FILE, to_csv([{"Id": "legacy", **observacion("Existente")}]))
+        flusher = make_flusher(tmp_path, github)
+        flusher.journal.append(observacion("Nueva"))
+        github.concurrent_write = {FILE: to_csv([
+            {"Id": "legacy", **observacion("Existente")},
+            {"Id": "otra", **observacion("De otra sesión")},
+        ])}
+
+        assert flusher.flush() == 1
+        assert [row["Asunto"] for row in parse_csv(github.read(FILE))] == ["Existente", "De otra sesión", "Nueva"]
+
+
+def test_failures_keep_observations_pending_until_retry(tmp_path) -> None:
+    with FakeGitHub() as github:
+        flusher = make_flusher(tmp_path, github)
+        flusher.journal.append(observacion("Pendiente"))
+        github.fail_next = [502]
+
+        assert flusher.flush() == 0
+        assert flusher.failures == 1 and flusher.journal.pending_count() == 1
+
+        # Volver a subir tras un fallo no duplica filas
+        assert flusher.flush() == 1
+        assert flusher.flush() == 0
+        assert len(parse_csv(github.read(FILE))) == 1
+
+
+def test_background_thread_flushes_on_notify(tmp_path) -> None:
+    with FakeGitHub() as github:
+        flusher = make_flusher(tmp_path, github).start()
+        flusher.journal.append(observacion("En segundo plano"))
+        flusher.notify()
+        flusher.stop()
+
+        assert len(parse_csv(github.read(FILE))) == 1
@@ -0,0 +1,502 @@
+"""
+Catálogo de los documentos del corpus en SQLite.
+
+Recorre data/<tema>/, extrae de cada archivo el tipo de documento, número, año,
+autoridad, tema y número de páginas, y lo guarda en una tabla con índices para
+filtrar y paginar sin recorrer los archivos en cada consulta.
+
+El texto de cada página se indexa además en una tabla FTS5 para la búsqueda de
+texto completo: ranking BM25, sin distinguir tildes ni mayúsculas, frases entre
+comillas y fragmentos resaltados.
+
+La construcción es incremental: solo se vuelven a leer los archivos cuyo tamaño o
+fecha de modificación cambió, y se eliminan los que ya no existen. Como leer el
+texto de los documentos nuevos puede tardar, la construcción se hace sin conexión
+(`python -m corpus.catalog`) o en un hilo en segundo plano (build_in_background);
+las páginas solo comparan tamaños y fechas con has_changes().
+
+Los metadatos salen de la ruta y el nombre de cada archivo. Los vectores de los
+índices no los tienen: su metadata es la fuente, el tema, la página y la jerarquía
+del fragmento (ver corpus/ingesta.py).
+
+Ejemplo:
+    python -m corpus.catalog                 # construye/actualiza catalog.sqlite
+    python -m corpus.catalog --data data --db catalog.sqlite
+"""
+
+import argparse
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Any, Dict, List, Optional, Tuple
+
+from corpus.extraccion import SUPPORTED_EXTENSIONS, count_pages, extract_pages
+
+DATA_DIR = os.environ.get("CORPUS_DATA_DIR", "data")
+CATALOG_DB = os.environ.get("CATALOG_DB", "catalog.sqlite")
+
+# Carpeta de data/ -> tema mostrado (coincide con los índices de Pinecone)
+TOPIC_FOLDERS = {
+    "renta": "Renta",
+    "timbre": "Timbre",
+    "retencion": "Retención",
+    "iva": "IVA",
+    "ica": "ICA",
+    "ipoconsumo": "Impuesto al Consumo",
+    "aduanas": "Aduanas",
+    "cambiario": "Cambiario",
+    "estatuto": "Estatuto Tributario",
+    "dur": "DUR",
+    "analisisley2277de2022": "Análisis Ley 2277",
+    "temasclave": "Temas Clave",
+    "leycrecimiento": "Ley Crecimiento",
+    "icagaitan": "ICA GAITÁN",
+    "dianfull": "Dian Full",
+}
+
+# Palabra (sin tildes, en minúsculas) -> tipo de documento
+DOCUMENT_TYPES = {
+    "concepto": "Concepto",
+    "oficio": "Oficio",
+    "resolucion": "Resolución",
+    "circular": "Circular",
+    "sentencia": "Sentencia",
+    "auto": "Auto",
+    "decreto": "Decreto",
+    "ley": "Ley",
+    "doctrina": "Doctrina",
+    "estatuto": "Estatuto",
+}
+
+# Patrón (sin tildes, en minúsculas) -> autoridad
+AUTHORITIES = [
+    (r"\bconsejo de estado\b", "Consejo de Estado"),
+    (r"\bcorte constitucional\b", "Corte Constitucional"),
+    (r"\bdian\b", "DIAN"),
+    (r"\besguerra\b", "Esguerra JHR"),
+    (r"\b(minhacienda|ministerio de hacienda)\b", "Ministerio de Hacienda"),
+    (r"\bsecretaria (distrital )?de hacienda\b", "Secretaría de Hacienda"),
+    (r"\bbanco de la republica\b", "Banco de la República"),
+]
+
+YEAR_PATTERN = re.compile(r"\b(19[6-9]\d|20\d\d)\b")
+# "12345 de 2020", "901234 de 15 de marzo de 2021", "100208192-451 del 2 de mayo de 2019"
+NUMBER_OF_YEAR_PATTERN = re.compile(
+    r"(\d[\d.\-]*)\s+del?\s+(?:\d{1,2}\s+de\s+)?(?:[a-z]+\s+del?\s+)?(19[6-9]\d|20\d\d)\b"
+)
+NUMBER_PATTERN = re.compile(r"(?:no\.?\s*|n°\s*|numero\s+|-\s*)?\b(\d[\d.\-]*\d|\d)\b")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    tema TEXT NOT NULL,
+    tipo TEXT,
+    numero TEXT,
+    anio INTEGER,
+    autoridad TEXT,
+    titulo TEXT NOT NULL,
+    paginas INTEGER,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    indexed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_documents_tema_anio ON documents (tema, anio DESC);
+CREATE INDEX IF NOT EXISTS idx_documents_tema_tipo ON documents (tema, tipo, anio DESC);
+CREATE INDEX IF NOT EXISTS idx_documents_autoridad ON documents (autoridad, anio DESC);
+CREATE INDEX IF NOT EXISTS idx_documents_numero ON documents (numero);
+
+-- Una fila por página; el título va en la primera para que también se pueda buscar
+CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+    titulo,
+    texto,
+    document_id UNINDEXED,
+    pagina UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+-- Documentos cuyo texto ya está en documents_fts (para catálogos creados sin él)
+CREATE TABLE IF NOT EXISTS documents_text (
+    document_id INTEGER PRIMARY KEY,
+    paginas INTEGER NOT NULL,
+    indexed_at REAL NOT NULL
+);
+"""
+
+# Peso de cada columna de documents_fts en bm25(): una coincidencia en el título cuenta más
+FTS_WEIGHTS = (5.0, 1.0)
+FTS_SNIPPET_TOKENS = 24
+# rowid de documents_fts = (id del documento << FTS_ROWID_BITS) + página
+FTS_ROWID_BITS = 20
+
+# Columnas por las que se puede ordenar desde la interfaz
+ORDER_BY = {
+    "anio": "anio DESC, titulo",
+    "titulo": "titulo",
+    "numero": "numero",
+}
+
+
+def _plain(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in text if not unicodedata.combining(char)).lower()
+
+
+def fts_query(text: str) -> str:
+    """
+    Convierte lo que escribe el usuario en una consulta FTS5 segura.
+
+    Las frases entre comillas se buscan literalmente; el resto de palabras deben
+    aparecer todas, en cualquier orden. Un * al final de una palabra busca por prefijo.
+    """
+    terms = []
+    for phrase in re.findall(r'"([^"]+)"', text):
+        words = re.findall(r"\w+", phrase)
+        if words:
+            terms.append('"' + " ".join(words) + '"')
+    for word, prefix in re.findall(r"(\w+)(\*?)", re.sub(r'"[^"]*"', " ", text)):
+        terms.append(f'"{word}"{prefix}')
+    return " ".join(terms)
+
+
+def parse_metadata(path: str, data_dir: str = DATA_DIR) -> Dict[str, Any]:
+    """
+    Extrae los metadatos de un documento a partir de su ruta y nombre de archivo.
+
+    Ejemplos:
+        data/renta/Concepto 12345 de 2020.pdf -> Concepto, 12345, 2020
+        data/timbre/Conceptos Dian timbre 2007 a enero de 2025.pdf -> Concepto, DIAN, 2025
+    """
+    relative = os.path.relpath(path, data_dir)
+    folder = relative.split(os.sep)[0] if os.sep in relative else ""
+    titulo = os.path.splitext(os.path.basename(path))[0]
+    plain = _plain(titulo)
+    words = re.findall(r"[a-z]+", plain)
+
+    tipo = None
+    for word in words:
+        singular = word[:-1] if word.endswith("s") and word[:-1] in DOCUMENT_TYPES else word
+        if singular in DOCUMENT_TYPES:
+            tipo = DOCUMENT_TYPES[singular]
+            break
+
+    autoridad = None
+    for pattern, name in AUTHORITIES:
+        if re.search(pattern, plain):
+            autoridad = name
+            break
+
+    numero = None
+    anio = None
+    match = NUMBER_OF_YEAR_PATTERN.search(plain)
+    if match:
+        numero, anio = match.group(1), int(match.group(2))
+    else:
+        years = YEAR_PATTERN.findall(plain)
+        # En rangos ("2007 a enero de 2025") se toma el año más reciente
+        anio = max(int(year) for year in years) if years else None
+        for candidate in NUMBER_PATTERN.findall(plain):
+            if not YEAR_PATTERN.fullmatch(candidate):
+                numero = candidate
+                break
+
+    return {
+        "tema": TOPIC_FOLDERS.get(folder.lower(), folder or "General"),
+        "tipo": tipo,
+        "numero": numero,
+        "anio": anio,
+        "autoridad": autoridad,
+        "titulo": titulo,
+    }
+
+
+class Catalog:
+    """
+    Catálogo de documentos en SQLite con filtros indexados y paginación.
+    """
+
+    def __init__(self, db_path: str = CATALOG_DB, data_dir: str = DATA_DIR):
+        self.db_path = db_path
+        self.data_dir = data_dir
+        self._local = threading.local()
+        self._build_lock = threading.Lock()
+        self._build_thread: Optional[threading.Thread] = None
+        with self.connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def connect(self) -> sqlite3.Connection:
+        # Una conexión por hilo: Streamlit atiende cada sesión en su propio hilo
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _scan(self) -> Dict[str, os.stat_result]:
+        files = {}
+        for root, _, names in os.walk(self.data_dir):
+            for name in names:
+                if os.path.splitext(name)[1].lower() in SUPPORTED_EXTENSIONS:
+                    path = os.path.join(root, name)
+                    files[os.path.relpath(path, self.data_dir)] = os.stat(path)
+        return files
+
+    @staticmethod
+    def _known(conn: sqlite3.Connection) -> Dict[str, Tuple[int, float, bool]]:
+        return {
+            row["path"]: (row["size"], row["mtime"], row["text_indexed"])
+            for row in conn.execute(
+                "SELECT path, size, mtime, id IN (SELECT document_id FROM documents_text) AS text_indexed FROM documents"
+            )
+        }
+
+    def has_changes(self) -> bool:
+        """
+        Indica si data/ tiene archivos nuevos, modificados o eliminados respecto al
+        catálogo. Solo compara tamaños y fechas; no lee los documentos.
+        """
+        if not os.path.isdir(self.data_dir):
+            return False
+        files = self._scan()
+        known = self._known(self.connect())
+        if files.keys() != known.keys():
+            return True
+        return any(
+            known[relative][:2] != (stat.st_size, stat.st_mtime) or not known[relative][2]
+            for relative, stat in files.items()
+        )
+
+    @property
+    def building(self) -> bool:
+        with self._build_lock:
+            return self._build_thread is not None and self._build_thread.is_alive()
+
+    def build_in_background(self) -> bool:
+        """
+        Lanza build() en un hilo si no hay otra construcción en curso.
+
+        Returns:
+            True si se lanzó una construcción nueva
+        """
+        with self._build_lock:
+            if self._build_thread is not None and self._build_thread.is_alive():
+                return False
+            self._build_thread = threading.Thread(target=self._build_logged, name="catalog-build", daemon=True)
+            self._build_thread.start()
+            return True
+
+    def _build_logged(self):
+        try:
+            stats = self.build()
+            print(f"Catalog.build_in_background: {stats}")
+        except Exception as e:
+            print(f"Catalog.build_in_background: Error al actualizar el catálogo: {e}")
+
+    def build(self) -> Dict[str, int]:
+        """
+        Sincroniza el catálogo con los archivos de data/.
+
+        Returns:
+            Conteo de documentos agregados, actualizados, eliminados y sin cambios
+        """
+        stats = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+        if not os.path.isdir(self.data_dir):
+            print(f"Catalog.build: No existe el directorio {self.data_dir}")
+            return stats
+
+        conn = self.connect()
+        files = self._scan()
+        known = self._known(conn)
+
+        with conn:
+            for relative, stat in files.items():
+                previous = known.get(relative)
+                if previous and previous[:2] == (stat.st_size, stat.st_mtime) and previous[2]:
+                    stats["unchanged"] += 1
+                    continue
+
+                path = os.path.join(self.data_dir, relative)
+                metadata = parse_metadata(path, self.data_dir)
+                pages = extract_pages(path)
+                conn.execute(
+                    """
+                    INSERT INTO documents (path, tema, tipo, numero, anio, autoridad, titulo, paginas, size, mtime, indexed_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(path) DO UPDATE SET
+                        tema = excluded.tema, tipo = excluded.tipo, numero = excluded.numero,
+                        anio = excluded.anio, autoridad = excluded.autoridad, titulo = excluded.titulo,
+                        paginas = excluded.paginas, size = excluded.size, mtime = excluded.mtime,
+                        indexed_at = excluded.indexed_at
+                    """,
+                    (
+                        relative, metadata["tema"], metadata["tipo"], metadata["numero"], metadata["anio"],
+                        metadata["autoridad"], metadata["titulo"],
+                        len(pages) if pages and path.lower().endswith(".pdf") else count_pages(path),
+                        stat.st_size, stat.st_mtime, time.time(),
+                    ),
+                )
+                document_id = conn.execute("SELECT id FROM documents WHERE path = ?", (relative,)).fetchone()[0]
+                self._index_text(conn, document_id, metadata["titulo"], pages)
+                stats["updated" if previous else "added"] += 1
+
+            removed = [path for path in known if path not in files]
+            for path in removed:
+                row = conn.execute("SELECT id FROM documents WHERE path = ?", (path,)).fetchone()
+                self._delete_text(conn, row["id"])
+                conn.execute("DELETE FROM documents WHERE id = ?", (row["id"],))
+            stats["removed"] = len(removed)
+
+        return stats
+
+    @staticmethod
+    def _delete_text(conn: sqlite3.Connection, document_id: int):
+        # Las filas de un documento ocupan un rango de rowid: se borran sin recorrer el índice
+        first = document_id << FTS_ROWID_BITS
+        conn.execute(
+            "DELETE FROM documents_fts WHERE rowid BETWEEN ? AND ?", (first, first + (1 << FTS_ROWID_BITS) - 1)
+        )
+        conn.execute("DELETE FROM documents_text WHERE document_id = ?", (document_id,))
+
+    @staticmethod
+    def _index_text(conn: sqlite3.Connection, document_id: int, titulo: str, pages: List[str]):
+        Catalog._delete_text(conn, document_id)
+        rows = [((document_id << FTS_ROWID_BITS) + number, titulo if number == 1 else "", text, document_id, number)
+                for number, text in enumerate(pages or [""], start=1)]
+        conn.executemany(
+            "INSERT INTO documents_fts (rowid, titulo, texto, document_id, pagina) VALUES (?, ?, ?, ?, ?)", rows
+        )
+        conn.execute(
+            "INSERT INTO documents_text (document_id, paginas, indexed_at) VALUES (?, ?, ?)",
+            (document_id, len(pages), time.time()),
+        )
+
+    @staticmethod
+    def _where(filters: Dict[str, Any], prefix: str = "", keyword: str = " WHERE ") -> Tuple[str, List[Any]]:
+        clauses = []
+        params: List[Any] = []
+        for column in ("tema", "tipo", "anio", "autoridad"):
+            value = filters.get(column)
+            if value not in (None, "", "Todos"):
+                clauses.append(f"{prefix}{column} = ?")
+                params.append(value)
+        if filters.get("titulo"):
+            clauses.append(f"{prefix}titulo LIKE ?")
+            params.append(f"%{filters['titulo']}%")
+        return (keyword + " AND ".join(clauses)) if clauses else "", params
+
+    def search(self, page: int = 1, page_size: int = 50, order_by: str = "anio", **filters) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Consulta una página del catálogo con los filtros indicados.
+
+        Args:
+            page: Página (desde 1)
+            page_size: Documentos por página
+            order_by: Clave de ORDER_BY
+            **filters: tema, tipo, anio, autoridad y titulo (texto contenido en el título)
+
+        Returns:
+            Tupla (documentos de la página, total de documentos que cumplen los filtros)
+        """
+        where, params = self._where(filters)
+        conn = self.connect()
+        total = conn.execute(f"SELECT COUNT(*) FROM documents{where}", params).fetchone()[0]
+        rows = conn.execute(
+            f"SELECT * FROM documents{where} ORDER BY {ORDER_BY.get(order_by, ORDER_BY['anio'])} LIMIT ? OFFSET ?",
+            params + [page_size, (max(page, 1) - 1) * page_size],
+        ).fetchall()
+        return [dict(row) for row in rows], total
+
+    def full_text_search(self, query: str, page: int = 1, page_size: int = 20,
+                         highlight: Tuple[str, str] = ("**", "**"), **filters) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Búsqueda de texto completo ordenada por BM25.
+
+        Cada resultado es una página de un documento, con sus metadatos, el número de
+        página ("pagina"), un fragmento con los términos resaltados ("fragmento") y su
+        puntuación ("rank", menor es mejor).
+
+        Args:
+            query: Texto a buscar; admite "frases entre comillas" y prefijos con *
+            page: Página de resultados (desde 1)
+            page_size: Resultados por página
+            highlight: Marcas de inicio y fin para los términos encontrados
+            **filters: Los mismos filtros de search()
+
+        Returns:
+            Tupla (resultados de la página, total de páginas de documentos que coinciden)
+        """
+        match = fts_query(query)
+        if not match:
+            return [], 0
+
+        where, params = self._where(filters, prefix="d.", keyword=" AND ")
+        conn = self.connect()
+        base = f"FROM documents_fts JOIN documents d ON d.id = documents_fts.document_id WHERE documents_fts MATCH ?{where}"
+        try:
+            total = conn.execute(f"SELECT COUNT(*) {base}", [match] + params).fetchone()[0]
+            rows = conn.execute(
+                f"""
+                SELECT d.*, documents_fts.pagina AS pagina,
+                       snippet(documents_fts, -1, ?, ?, '…', {FTS_SNIPPET_TOKENS}) AS fragmento,
+                       bm25(documents_fts, {FTS_WEIGHTS[0]}, {FTS_WEIGHTS[1]}) AS rank
+                {base}
+                ORDER BY rank LIMIT ? OFFSET ?
+                """,
+                [highlight[0], highlight[1], match] + params + [page_size, (max(page, 1) - 1) * page_size],
+            ).fetchall()
+        except sqlite3.OperationalError as e:
+            print(f"Catalog.full_text_search: Consulta no válida {match!r}: {e}")
+            return [], 0
+        return [dict(row) for row in rows], total
+
+    def facets(self, tema: Optional[str] = None) -> Dict[str, List[Any]]:
+        """
+        Valores disponibles de cada filtro (para llenar los selectores de la interfaz).
+        """
+        where, params = self._where({"tema": tema})
+        conn = self.connect()
+        result = {}
+        for column in ("tipo", "anio", "autoridad"):
+            order = "DESC" if column == "anio" else "ASC"
+            result[column] = [
+                row[0] for row in conn.execute(
+                    f"SELECT DISTINCT {column} FROM documents{where} "
+                    f"{'AND' if where else 'WHERE'} {column} IS NOT NULL ORDER BY {column} {order}",
+                    params,
+                )
+            ]
+        return result
+
+    def topics(self) -> List[str]:
+        return [row[0] for row in self.connect().execute("SELECT DISTINCT tema FROM documents ORDER BY tema")]
+
+    def get(self, document_id: int) -> Optional[Dict[str, Any]]:
+        row = self.connect().execute("SELECT * FROM documents WHERE id = ?", (document_id,)).fetchone()
+        return dict(row) if row else None
+
+    def absolute_path(self, document: Dict[str, Any]) -> str:
+        return os.path.join(self.data_dir, document["path"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Construye o actualiza el catálogo del corpus")
+    parser.add_argument("--data", type=str, default=DATA_DIR, help="Directorio del corpus")
+    parser.add_argument("--db", type=str, default=CATALOG_DB, help="Base SQLite del catálogo")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    catalog = Catalog(args.db, args.data)
+    stats = catalog.build()
+    elapsed = time.perf_counter() - start
+    print(
+        f"Catálogo actualizado en {elapsed:.2f} s: {stats['added']} nuevos, {stats['updated']} actualizados, "
+        f"{stats['removed']} eliminados, {stats['unchanged']} sin cambios"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,401 @@
+"""
+Fragmentación de documentos jurídicos según su estructura.
+
+Reconoce los encabezados del Estatuto Tributario y del DUR (Parte, Libro, Título,
+Capítulo, Sección, Artículo, Parágrafo), los numerales y los apartados de
+sentencias y conceptos ("Consideraciones de la Sala", "Problema jurídico",
+"Tesis jurídica"...). Cada fragmento coincide con una unidad completa:
+
+- Un artículo se queda con sus parágrafos y numerales en un mismo fragmento si
+  cabe en CHUNK_MAX_TOKENS.
+- Un artículo más largo se divide en el inicio de un parágrafo o de un numeral
+  (o, si no hay, en un salto de línea), y cada parte repite el encabezado del
+  artículo para que se entienda sola y lleva su número en fragmento_parte.
+- Las unidades cortas seguidas (artículos derogados, encabezados) se unen
+  mientras el fragmento tenga menos de CHUNK_MIN_TOKENS y no cambie el capítulo.
+
+Cada fragmento lleva la jerarquía en sus metadatos (libro, titulo, capitulo,
+seccion, articulo, apartado, jerarquia) y las páginas de inicio y fin. El texto
+se recorre línea por línea y solo se guarda la unidad en curso: un documento
+largo no se tiene completo en memoria.
+
+Ejemplo:
+    python -m corpus.chunker data/estatuto   # fragmentos por segundo sobre un directorio
+
+Configuración por variables de entorno:
+    CHUNK_MAX_TOKENS: tokens estimados máximos por fragmento (por defecto 700)
+    CHUNK_MIN_TOKENS: por debajo de este tamaño se unen unidades seguidas (por defecto 150)
+"""
+
+import argparse
+import os
+import re
+import time
+import unicodedata
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+CHUNK_MAX_TOKENS = int(os.environ.get("CHUNK_MAX_TOKENS", 700))
+CHUNK_MIN_TOKENS = int(os.environ.get("CHUNK_MIN_TOKENS", 150))
+
+# Misma aproximación que openai_client.estimate_tokens
+CHARS_PER_TOKEN = 4
+
+# Niveles de la jerarquía, de mayor a menor
+LEVELS = ("parte", "libro", "titulo", "capitulo", "seccion", "apartado", "articulo")
+# Niveles que agrupan unidades: no se unen fragmentos de contenedores distintos
+CONTAINER_LEVELS = ("parte", "libro", "titulo", "capitulo", "seccion", "apartado")
+# Encabezados que solo abren un contenedor: si no traen texto propio se unen a la unidad siguiente
+HEADER_LEVELS = ("parte", "libro", "titulo", "capitulo", "seccion")
+
+_ORDINAL = (
+    r"(?:\d+(?:\.\d+)*|[IVXLC]+|PRELIMINAR|PRIMER[OA]?|SEGUND[OA]|TERCER[OA]?|CUART[OA]|QUINT[OA]|SEXT[OA]|"
+    r"S[EÉ]PTIM[OA]|OCTAV[OA]|NOVEN[OA]|D[EÉ]CIM[OA]|[UÚ]NIC[OA])"
+)
+_CONTAINER_PATTERNS = [
+    (level, re.compile(rf"^(?:{words})\s+({_ORDINAL})\b\.?(?!\d)", re.IGNORECASE))
+    for level, words in (
+        ("parte", "PARTE"),
+        ("libro", "LIBRO"),
+        ("titulo", "T[IÍ]TULO"),
+        ("capitulo", "CAP[IÍ]TULO"),
+        ("seccion", "SECCI[OÓ]N"),
+    )
+]
+# "ARTÍCULO 240.", "ARTICULO 240-1.", "Artículo 1.2.1.5.1.", "Art. 5o.", "ARTÍCULO TRANSITORIO."
+# Debe empezar en mayúscula y terminar el número con un signo: "artículo 240 del..." es prosa
+_ARTICLE_PATTERN = re.compile(
+    r"^(?:ART[IÍ]CULO|Art[ií]culo|ART\.|Art\.)\s+"
+    r"(\d+(?:\.\d+)*(?:\s*-\s*\d+)?(?:\s+[A-Z]\b)?|TRANSITORIO|Transitorio|NUEVO|Nuevo)\s*[oº°]?\s*(?:[\.\-:–]|$)"
+)
+_PARAGRAPH_PATTERN = re.compile(
+    r"^(?:PAR[AÁ]GRAFO|Par[aá]grafo)(?:\s+(?:\d+|[IVX]+|[A-ZÁÉÍÓÚ]+[oº°]?|[A-Za-záéíóú]+)\s*[oº°]?)*\s*[\.\-:–]"
+)
+_NUMERAL_PATTERN = re.compile(r"^(?:\d{1,2}(?:\.\d{1,2})?[\.\)]|[a-z]\)|[a-z]\.|[ivx]{1,4}\)|(?:NUMERAL|Numeral)\s+\d+)\s+\S")
+_LEADING_NUMBER = re.compile(r"^(?:[IVXLC]+|\d+(?:\.\d+)*|[A-Z])[\.\)\-]\s*")
+
+# Apartados de sentencias y conceptos (sin tildes, en mayúsculas, sin numeración)
+SECTION_HEADINGS = {
+    "ANTECEDENTES", "ANTECEDENTES ADMINISTRATIVOS", "LA DEMANDA", "DEMANDA", "PRETENSIONES",
+    "NORMAS VIOLADAS Y CONCEPTO DE LA VIOLACION", "CONTESTACION DE LA DEMANDA", "SENTENCIA APELADA",
+    "LA SENTENCIA APELADA", "SENTENCIA DE PRIMERA INSTANCIA", "RECURSO DE APELACION", "EL RECURSO DE APELACION",
+    "ALEGATOS DE CONCLUSION", "CONCEPTO DEL MINISTERIO PUBLICO", "CONSIDERACIONES", "CONSIDERACIONES DE LA SALA",
+    "CONSIDERACIONES DE LA CORTE", "CONSIDERACIONES DEL DESPACHO", "CONSIDERANDO", "PROBLEMA JURIDICO",
+    "PROBLEMAS JURIDICOS", "TESIS JURIDICA", "TESIS", "INTERPRETACION JURIDICA", "FUENTES FORMALES",
+    "DESCRIPTORES", "NORMAS RELACIONADAS", "ANALISIS", "ANALISIS DEL CASO", "CASO CONCRETO", "EL CASO CONCRETO",
+    "DECISION", "FALLA", "RESUELVE", "CONCLUSION", "CONCLUSIONES", "PLANTEAMIENTO", "PLANTEAMIENTO DEL PROBLEMA",
+    "CONSULTA", "RESPUESTA", "PREGUNTA", "HECHOS", "MARCO NORMATIVO", "MARCO JURIDICO",
+}
+SECTION_HEADING_MAX_CHARS = 70
+
+# Prioridad de un corte antes de la línea al dividir una unidad larga
+BREAK_PARAGRAPH = 3
+BREAK_NUMERAL = 2
+BREAK_LINE = 1
+BREAK_INSIDE = 0
+
+Line = Tuple[int, str, int]  # (página, texto, prioridad de corte antes de la línea)
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def split_text(text: str, size: int, overlap: int = 0) -> List[str]:
+    """
+    Divide el texto en ventanas de `size` caracteres que se solapan `overlap`,
+    cortando de preferencia en un fin de párrafo, de oración o un espacio.
+    """
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(start + size, len(text))
+        if end < len(text):
+            for separator in ("\n\n", ". ", " "):
+                cut = text.rfind(separator, start + size // 2, end)
+                if cut != -1:
+                    end = cut + len(separator)
+                    break
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        if end >= len(text):
+            break
+        start = max(end - overlap, start + 1)
+    return chunks
+
+
+def _plain(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text.upper())
+    return "".join(char for char in text if not unicodedata.combining(char))
+
+
+def classify(line: str) -> Optional[Tuple[str, str]]:
+    """
+    Nivel y etiqueta del encabezado con que empieza la línea (None si no es un encabezado).
+
+    Returns:
+        ("articulo", "240-1"), ("capitulo", "CAPÍTULO II. Ingresos"), ("apartado", "Consideraciones de la Sala")...
+    """
+    first = line[:1]
+    if first in "AaPp":
+        match = _ARTICLE_PATTERN.match(line)
+        if match:
+            return "articulo", re.sub(r"\s+", "", match.group(1)) if match.group(1)[0].isdigit() else match.group(1).title()
+    if first in "PpLlTtCcSs":
+        for level, pattern in _CONTAINER_PATTERNS:
+            if pattern.match(line):
+                return level, line[:120]
+    if len(line) <= SECTION_HEADING_MAX_CHARS:
+        heading = _LEADING_NUMBER.sub("", _plain(line)).strip(" .:-–")
+        if heading in SECTION_HEADINGS:
+            label = _LEADING_NUMBER.sub("", line).strip(" .:-–")
+            return "apartado", label.capitalize() if label.isupper() else label
+    return None
+
+
+def break_priority(line: str) -> int:
+    """
+    Qué tan buen punto de corte es el inicio de la línea dentro de una unidad.
+    """
+    if _PARAGRAPH_PATTERN.match(line):
+        return BREAK_PARAGRAPH
+    if _NUMERAL_PATTERN.match(line):
+        return BREAK_NUMERAL
+    return BREAK_LINE
+
+
+def breadcrumb(path: Dict[str, str]) -> str:
+    parts = []
+    for level in LEVELS:
+        value = path.get(level)
+        if not value:
+            continue
+        if level == "articulo":
+            parts.append(f"Art. {value}")
+        elif level == "apartado":
+            parts.append(value)
+        else:
+            parts.append(_title(value))
+    return " > ".join(parts)
+
+
+def _title(heading: str) -> str:
+    # "TÍTULO II RENTA LÍQUIDA" -> "Título II": el nombre queda en el texto del fragmento
+    words = heading.split()
+    if len(words) < 2:
+        return heading
+    number = words[1].rstrip(".")
+    return f"{words[0].capitalize()} {number if re.fullmatch(r'[IVXLC]+|[0-9.]+', number) else number.capitalize()}"
+
+
+def _shorten(heading: str, limit: int = 150) -> str:
+    # El encabezado de un artículo suele venir en la misma línea que su primer inciso
+    if len(heading) <= limit:
+        return heading
+    return heading[:heading.rfind(" ", 0, limit)].rstrip(" ,;:") + "…"
+
+
+class _Unit:
+    """
+    Unidad en curso (un artículo, un apartado o el texto bajo un encabezado).
+    """
+
+    def __init__(self, path: Dict[str, str], heading: Optional[str], level: Optional[str] = None):
+        self.path = dict(path)
+        self.heading = heading
+        self.level = level
+        self.lines: List[Line] = []
+        self.tokens = 0
+        self.parts = 0
+
+    def add(self, line: Line):
+        self.lines.append(line)
+        self.tokens += estimate_tokens(line[1])
+
+    def container(self) -> Tuple[Optional[str], ...]:
+        return tuple(self.path.get(level) for level in CONTAINER_LEVELS)
+
+    def header_only(self, min_tokens: int) -> bool:
+        # "CAPÍTULO II / Ingresos" sin más texto antes del primer artículo
+        return self.level in HEADER_LEVELS and self.tokens < min_tokens
+
+
+class LegalChunker:
+    """
+    Fragmentador por estructura con ventana de tokens.
+    """
+
+    def __init__(self, max_tokens: int = CHUNK_MAX_TOKENS, min_tokens: int = CHUNK_MIN_TOKENS):
+        self.max_tokens = max_tokens
+        self.min_tokens = min_tokens
+
+    def chunk(self, pages: Iterable[Tuple[int, str]]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Fragmentos de un documento a partir de sus páginas (número, texto), en orden.
+
+        Yields:
+            (texto, metadatos) con page, page_end, jerarquia y los niveles presentes
+        """
+        path: Dict[str, str] = {}
+        unit = _Unit(path, None)
+        pending: List[_Unit] = []
+        max_chars = self.max_tokens * CHARS_PER_TOKEN
+
+        for page, text in pages:
+            for raw in text.split("\n"):
+                line = raw.strip()
+                if not line:
+                    continue
+                heading = classify(line)
+                if heading is not None:
+                    level, label = heading
+                    pending, emitted = self._close(unit, pending)
+                    yield from emitted
+                    # Un encabezado reinicia los niveles inferiores
+                    for lower in LEVELS[LEVELS.index(level):]:
+                        path.pop(lower, None)
+                    path[level] = label
+                    unit = _Unit(path, line, level)
+                    unit.add((page, line, BREAK_LINE))
+                    continue
+
+                priority = break_priority(line)
+                if len(line) > max_chars:
+                    pieces = split_text(line, max_chars)
+                    unit.add((page, pieces[0], priority))
+                    for piece in pieces[1:]:
+                        unit.add((page, piece, BREAK_INSIDE))
+                else:
+                    unit.add((page, line, priority))
+
+                # Unidad muy larga sin encabezados: se emiten sus partes completas sin esperar al final
+                if unit.tokens > 3 * self.max_tokens:
+                    yield from self._flush(pending)
+                    pending = []
+                    yield from self._split(unit, keep_last=True)
+
+        pending, emitted = self._close(unit, pending)
+        yield from emitted
+        yield from self._flush(pending)
+
+    def _close(self, unit: _Unit, pending: List[_Unit]) -> Tuple[List[_Unit], List[Tuple[str, Dict[str, Any]]]]:
+        # Decide si la unidad terminada se une a las pendientes o se emite
+        emitted: List[Tuple[str, Dict[str, Any]]] = []
+        if not unit.lines:
+            return pending, emitted
+        if unit.tokens > self.max_tokens or unit.parts:
+            if pending and all(item.header_only(self.min_tokens) for item in pending):
+                # Los encabezados sueltos (Título, Capítulo) van al inicio de la unidad
+                unit.lines[:0] = [line for item in pending for line in item.lines]
+                pending = []
+            emitted.extend(self._flush(pending))
+            emitted.extend(self._split(unit))
+            return [], emitted
+        body = [item for item in pending if not item.header_only(self.min_tokens)]
+        if pending:
+            total = sum(item.tokens for item in pending)
+            if total + unit.tokens > self.max_tokens or (body and (
+                    total >= self.min_tokens or unit.header_only(self.min_tokens)
+                    or body[0].container() != unit.container())):
+                emitted.extend(self._flush(pending))
+                pending = []
+        return pending + [unit], emitted
+
+    def _flush(self, units: List[_Unit]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        if not units:
+            return
+        lines = [line for unit in units for line in unit.lines]
+        # La jerarquía es la de la primera unidad con contenido (no la de un encabezado suelto)
+        first = next((unit for unit in units if not unit.header_only(self.min_tokens)), units[-1])
+        metadata = self._metadata(first.path, lines)
+        articles = [unit.path["articulo"] for unit in units if unit.path.get("articulo")]
+        if len(set(articles)) > 1:
+            metadata["articulo"] = f"{articles[0]} a {articles[-1]}"
+            metadata["jerarquia"] = breadcrumb({**first.path, "articulo": metadata["articulo"]})
+        yield "\n".join(line[1] for line in lines), metadata
+
+    def _split(self, unit: _Unit, keep_last: bool = False) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Divide una unidad larga en partes de hasta max_tokens, cortando en el mejor
+        punto (parágrafo > numeral > línea) de la segunda mitad de cada ventana.
+        Con keep_last, la última parte se deja en la unidad para seguir llenándola.
+        """
+        prefix = f"{_shorten(unit.heading)} (continuación)" if unit.heading else None
+        prefix_tokens = estimate_tokens(prefix) if prefix else 0
+        lines = unit.lines
+        while lines:
+            budget = self.max_tokens - (prefix_tokens if unit.parts else 0)
+            end, tokens = 0, 0
+            while end < len(lines) and (end == 0 or tokens + estimate_tokens(lines[end][1]) <= budget):
+                tokens += estimate_tokens(lines[end][1])
+                end += 1
+            if end == len(lines):
+                if keep_last:
+                    break
+            else:
+                # Mejor corte en la segunda mitad de la ventana
+                half = max(1, end // 2)
+                best = max(range(half, end + 1), key=lambda i: (lines[i][2] if i < len(lines) else 0, i))
+                end = best
+            piece, lines = lines[:end], lines[end:]
+            unit.parts += 1
+            text = "\n".join(line[1] for line in piece)
+            if unit.parts > 1 and prefix:
+                text = f"{prefix}\n{text}"
+            metadata = self._metadata(unit.path, piece)
+            metadata["fragmento_parte"] = unit.parts
+            yield text, metadata
+        unit.lines = lines
+        unit.tokens = sum(estimate_tokens(line[1]) for line in lines)
+
+    @staticmethod
+    def _metadata(path: Dict[str, str], lines: List[Line]) -> Dict[str, Any]:
+        metadata: Dict[str, Any] = {"page": lines[0][0], "page_end": lines[-1][0]}
+        for level in LEVELS:
+            if path.get(level):
+                metadata[level] = path[level]
+        trail = breadcrumb(path)
+        if trail:
+            metadata["jerarquia"] = trail
+        return metadata
+
+
+def main():
+    from corpus.extraccion import SUPPORTED_EXTENSIONS, iter_pages
+
+    parser = argparse.ArgumentParser(description="Mide la fragmentación por estructura sobre un directorio.")
+    parser.add_argument("path", nargs="?", default="data", help="Directorio o archivo a fragmentar")
+    parser.add_argument("--max-tokens", type=int, default=CHUNK_MAX_TOKENS)
+    parser.add_argument("--min-tokens", type=int, default=CHUNK_MIN_TOKENS)
+    parser.add_argument("--show", type=int, default=0, help="Imprime los primeros N fragmentos")
+    args = parser.parse_args()
+
+    files = [args.path] if os.path.isfile(args.path) else [
+        os.path.join(root, name)
+        for root, _, names in os.walk(args.path)
+        for name in sorted(names)
+        if os.path.splitext(name)[1].lower() in SUPPORTED_EXTENSIONS
+    ]
+    chunker = LegalChunker(args.max_tokens, args.min_tokens)
+    pages = chunks = tokens = 0
+    extraction = chunking = 0.0
+    for path in files:
+        began = time.perf_counter()
+        document = list(iter_pages(path))
+        extraction += time.perf_counter() - began
+        pages += len(document)
+
+        began = time.perf_counter()
+        for text, metadata in chunker.chunk(document):
+            if chunks < args.show:
+                print(f"--- {path} {metadata}\n{text}\n")
+            chunks += 1
+            tokens += estimate_tokens(text)
+        chunking += time.perf_counter() - began
+
+    print(f"{len(files)} archivos, {pages} páginas, {chunks} fragmentos ({tokens / max(chunks, 1):.0f} tokens en promedio)")
+    print(f"extracción: {extraction:.1f} s; fragmentación: {chunking:.2f} s ({chunks / max(chunking, 1e-9):.0f} fragmentos/s)")
+
+
+if __name__ == "__main__":
+    main()
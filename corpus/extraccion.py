@@ -0,0 +1,143 @@
+"""
+Lectura de los archivos del corpus (PDF, HTML y texto).
+
+pypdf (dependencia del proyecto) lee los PDF página por página. Si no está
+instalado, el texto se extrae con unstructured, que procesa el archivo completo:
+en ese caso count_pages devuelve None y el PDF se trata como una sola tarea. El
+HTML se limpia con BeautifulSoup.
+"""
+
+import os
+import re
+from itertools import islice
+from typing import Iterator, List, Optional, Tuple
+
+SUPPORTED_EXTENSIONS = {".pdf", ".html", ".htm", ".txt"}
+
+_TAG_PATTERN = re.compile(r"<(script|style)[^>]*>.*?</\1>|<[^>]+>", re.IGNORECASE | re.DOTALL)
+_SPACES_PATTERN = re.compile(r"[ \t\r\f\v]+")
+
+
+def count_pages(path: str) -> Optional[int]:
+    """
+    Número de páginas de un PDF según pypdf. None para otros formatos, si no se
+    puede leer o si pypdf no está instalado: sin pypdf no hay lectura por rangos.
+    """
+    if os.path.splitext(path)[1].lower() != ".pdf":
+        return None
+
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        return None
+
+    try:
+        return len(PdfReader(path).pages) or None
+    except Exception as e:
+        print(f"count_pages: pypdf no pudo leer {path}: {e}")
+        return None
+
+
+def _clean(text: str) -> str:
+    return _SPACES_PATTERN.sub(" ", text).strip()
+
+
+def _pdf_pages(path: str, start: int = 0, stop: Optional[int] = None) -> Iterator[str]:
+    # pypdf carga cada página al pedirla: un PDF grande no se tiene entero en memoria
+    try:
+        from pypdf import PdfReader
+
+        reader = PdfReader(path)
+    except ImportError:
+        reader = None
+    except Exception as e:
+        print(f"iter_pages: pypdf no pudo leer {path}: {e}")
+        reader = None
+
+    if reader is not None:
+        for page in reader.pages[start:stop]:
+            yield page.extract_text() or ""
+        return
+
+    try:
+        from unstructured.partition.pdf import partition_pdf
+    except ImportError:
+        print(f"iter_pages: Instala pypdf o unstructured para extraer el texto de {path}")
+        return
+
+    # unstructured procesa el archivo completo; las páginas se entregan a medida que cambian
+    current, parts = start + 1, []
+    for element in partition_pdf(filename=path):
+        number = getattr(element.metadata, "page_number", None) or 1
+        if number <= start or (stop is not None and number > stop):
+            continue
+        while current < number:
+            yield "\n".join(parts)
+            current, parts = current + 1, []
+        parts.append(str(element))
+    if parts:
+        yield "\n".join(parts)
+
+
+def _text_pages(path: str, block_size: int = 1 << 16) -> Iterator[str]:
+    # Lee por bloques y corta en los saltos de página (\f)
+    with open(path, encoding="utf-8", errors="replace") as f:
+        pending = ""
+        for block in iter(lambda: f.read(block_size), ""):
+            pending += block
+            *pages, pending = pending.split("\f")
+            yield from pages
+        yield pending
+
+
+def _html_text(path: str) -> str:
+    with open(path, encoding="utf-8", errors="replace") as f:
+        html = f.read()
+    try:
+        from bs4 import BeautifulSoup
+    except ImportError:
+        return _TAG_PATTERN.sub(" ", html)
+
+    soup = BeautifulSoup(html, "html.parser")
+    for tag in soup(["script", "style"]):
+        tag.decompose()
+    return soup.get_text("\n")
+
+
+def iter_pages(path: str, start: int = 0, stop: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+    """
+    Recorre las páginas del documento de `start` a `stop` (sin incluir, base 0) sin
+    cargar el archivo completo: un PDF se lee página por página y un texto por
+    bloques. HTML y texto se tratan como una sola página, salvo que el texto tenga
+    saltos de página (\\f).
+
+    Yields:
+        (número de página desde 1, texto de la página)
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".pdf":
+        pages = _pdf_pages(path, start, stop)
+    elif extension in (".html", ".htm"):
+        pages = iter([_html_text(path)][start:stop])
+    elif extension == ".txt":
+        pages = _text_pages(path)
+        if start or stop is not None:
+            pages = islice(pages, start, stop)
+    else:
+        return
+    for number, page in enumerate(pages, start + 1):
+        yield number, _clean(page)
+
+
+def extract_pages(path: str) -> List[str]:
+    """
+    Texto de cada página del documento (ver iter_pages).
+
+    Returns:
+        Lista con el texto de cada página (vacía si no se pudo extraer)
+    """
+    try:
+        return [page for _, page in iter_pages(path)]
+    except Exception as e:
+        print(f"extract_pages: No se pudo extraer el texto de {path}: {e}")
+        return []
@@ -0,0 +1,113 @@
+"""
+Índice en memoria con la interfaz de pinecone.Index que usan la ingesta y la carga
+masiva (upsert, delete, fetch, describe_index_stats), para probarlas sin Pinecone.
+
+Rechaza las solicitudes que pasan del límite de 1000 vectores o de 2 MB, y permite
+simular errores y latencia.
+
+Ejemplo:
+    indexes = FakePinecone()
+    BulkUpserter(indexes.Index).run(jobs)
+    indexes.Index("renta").count("renta")
+"""
+
+import json
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+MAX_VECTORS_PER_REQUEST = 1000
+MAX_REQUEST_BYTES = 2 * 1024 * 1024
+
+
+class FakePineconeError(Exception):
+    """
+    Error con código HTTP, como PineconeApiException.
+    """
+
+    def __init__(self, status: int, message: str = ""):
+        super().__init__(message or f"HTTP {status}")
+        self.status = status
+
+
+class FakeIndex:
+    """
+    Namespaces con sus vectores por id.
+    """
+
+    def __init__(self, name: str, latency: float = 0.0):
+        self.name = name
+        self.latency = latency
+        self.namespaces: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        # Códigos de error que devolverán las próximas solicitudes de upsert, en orden
+        self.fail_next: List[int] = []
+        self.requests = 0
+        self.max_concurrent = 0
+        self._active = 0
+        self._lock = threading.Lock()
+
+    def upsert(self, vectors: List[Dict[str, Any]], namespace: str = "") -> Dict[str, int]:
+        with self._lock:
+            self.requests += 1
+            self._active += 1
+            self.max_concurrent = max(self.max_concurrent, self._active)
+            status = self.fail_next.pop(0) if self.fail_next else None
+        try:
+            time.sleep(self.latency)
+            if status is not None:
+                raise FakePineconeError(status)
+            if len(vectors) > MAX_VECTORS_PER_REQUEST:
+                raise FakePineconeError(400, f"Too many vectors: {len(vectors)}")
+            size = len(json.dumps({"vectors": vectors, "namespace": namespace}).encode("utf-8"))
+            if size > MAX_REQUEST_BYTES:
+                raise FakePineconeError(400, f"Request size {size} exceeds {MAX_REQUEST_BYTES}")
+            with self._lock:
+                stored = self.namespaces.setdefault(namespace, {})
+                for vector in vectors:
+                    stored[vector["id"]] = {
+                        "id": vector["id"], "values": list(vector["values"]), "metadata": vector.get("metadata") or {}
+                    }
+            return {"upserted_count": len(vectors)}
+        finally:
+            with self._lock:
+                self._active -= 1
+
+    def delete(self, ids: Optional[List[str]] = None, namespace: str = "", delete_all: bool = False):
+        with self._lock:
+            stored = self.namespaces.get(namespace, {})
+            if delete_all:
+                stored.clear()
+            for vector_id in ids or []:
+                stored.pop(vector_id, None)
+        return {}
+
+    def fetch(self, ids: List[str], namespace: str = "") -> Dict[str, Any]:
+        with self._lock:
+            stored = self.namespaces.get(namespace, {})
+            return {"vectors": {vector_id: stored[vector_id] for vector_id in ids if vector_id in stored}}
+
+    def count(self, namespace: str = "") -> int:
+        with self._lock:
+            return len(self.namespaces.get(namespace, {}))
+
+    def describe_index_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            namespaces = {name: {"vector_count": len(vectors)} for name, vectors in self.namespaces.items()}
+        return {"namespaces": namespaces, "total_vector_count": sum(ns["vector_count"] for ns in namespaces.values())}
+
+
+class FakePinecone:
+    """
+    Cliente con los índices en memoria; Index(nombre) crea el índice si no existe.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.indexes: Dict[str, FakeIndex] = {}
+        self._lock = threading.Lock()
+
+    def Index(self, name: str) -> FakeIndex:
+        with self._lock:
+            if name not in self.indexes:
+                self.indexes[name] = FakeIndex(name, self.latency)
+            return self.indexes[name]
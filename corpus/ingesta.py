@@ -0,0 +1,591 @@
+"""
+Ingesta del corpus de data/<tema>/ en los índices vectoriales.
+
+El proceso es una cadena de generadores, de modo que la memoria usada no depende
+del tamaño del corpus ni de los archivos:
+
+    archivos -> páginas -> fragmentos -> lotes con embeddings -> upsert
+
+- Los fragmentos siguen la estructura de los documentos (artículos, parágrafos,
+  apartados de sentencias); ver corpus/chunker.py.
+
+- La extracción se reparte en un grupo de procesos. Cada tarea es un rango de
+  PAGES_PER_TASK páginas de un PDF (o un archivo HTML/texto completo) y solo hay
+  INGEST_MAX_IN_FLIGHT tareas pendientes a la vez: un PDF de cientos de páginas
+  nunca se tiene completo en memoria.
+- Los fragmentos se agrupan en lotes de EMBEDDING_BATCH_SIZE textos para pedir
+  los embeddings con EmbeddingService (graph/chains/embeddings.py), que reparte
+  cada lote en solicitudes concurrentes con la prioridad "batch" del limitador.
+- Cada lote con sus vectores se envía al destino: el índice y el namespace de
+  Pinecone del tema, la colección local de Chroma o un directorio de carga que
+  corpus/upsert.py sube después en paralelo.
+- Cada etapa lleva la cuenta de elementos y segundos; el avance se imprime cada
+  INGEST_REPORT_INTERVAL segundos y al final.
+- Con un manifiesto (corpus/manifest.py) solo se procesan los archivos nuevos o
+  modificados y se borran los fragmentos que dejaron de existir.
+
+Uso desde la línea de comandos: `python ingest_legal_docs.py [temas...]`.
+
+Configuración por variables de entorno:
+    INGEST_WORKERS: procesos de extracción (por defecto, los núcleos disponibles)
+    INGEST_MAX_IN_FLIGHT: tareas de extracción pendientes a la vez (por defecto 2 por proceso)
+    INGEST_PAGES_PER_TASK: páginas de PDF por tarea (por defecto 16)
+    EMBEDDING_BATCH_SIZE: textos por lote de embeddings (por defecto 256)
+    INGEST_REPORT_INTERVAL: segundos entre reportes de avance (por defecto 10)
+"""
+
+import hashlib
+import json
+import os
+import time
+from collections import defaultdict, deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from itertools import groupby
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from corpus.chunker import LegalChunker
+from corpus.extraccion import SUPPORTED_EXTENSIONS, count_pages, iter_pages
+from corpus.manifest import FileEntry, Manifest, Plan
+from corpus.upsert import iter_batches
+
+INGEST_WORKERS = int(os.environ.get("INGEST_WORKERS", os.cpu_count() or 2))
+INGEST_MAX_IN_FLIGHT = int(os.environ.get("INGEST_MAX_IN_FLIGHT", 2 * INGEST_WORKERS))
+PAGES_PER_TASK = int(os.environ.get("INGEST_PAGES_PER_TASK", 16))
+EMBEDDING_BATCH_SIZE = int(os.environ.get("EMBEDDING_BATCH_SIZE", 256))
+INGEST_REPORT_INTERVAL = float(os.environ.get("INGEST_REPORT_INTERVAL", 10))
+
+# Cambiarla obliga a volver a ingerir todo el corpus (ver corpus/manifest.py)
+CHUNKER_VERSION = "legal-2"
+
+# Ids por solicitud de borrado en Pinecone
+DELETE_BATCH_SIZE = 1000
+
+# Carpeta de data/ -> prefijo de las constantes <PREFIJO>_INDEX_NAME/_NAMESPACE de retrieval
+PINECONE_TOPICS = {
+    "renta": "RENTA",
+    "timbre": "TIMBRE",
+    "dianfull": "DIANFULL",
+    "retencion": "RETENCION",
+    "iva": "IVA",
+    "ica": "ICA",
+    "ipoconsumo": "IPOCONSUMO",
+    "aduanas": "ADUANAS",
+    "cambiario": "CAMBIARIO",
+    "estatuto": "ESTATUTO",
+    "dur": "DUR",
+    "analisisley2277de2022": "ANALISIS_LEY_2277",
+    "temasclave": "TEMAS_CLAVE",
+    "leycrecimiento": "LEY_CRECIMIENTO",
+    "icagaitan": "ICA_GAITAN",
+}
+
+# Fragmentos (texto, metadatos) de un documento a partir de sus páginas (número, texto)
+Chunker = Callable[[Iterable[Tuple[int, str]]], Iterable[Tuple[str, Dict[str, Any]]]]
+
+# Embeddings de una lista de textos, en el mismo orden (matriz NumPy o listas)
+Embedder = Callable[[List[str]], Sequence[Sequence[float]]]
+
+# Modelo con el que consulta la colección local (OpenAIEmbeddings() sin argumentos)
+LOCAL_EMBEDDING_MODEL = "text-embedding-ada-002"
+
+
+class Chunk:
+    """
+    Fragmento de una página, con el id estable con el que se guarda en el índice.
+    """
+
+    __slots__ = ("id", "text", "metadata")
+
+    def __init__(self, id: str, text: str, metadata: Dict[str, Any]):
+        self.id = id
+        self.text = text
+        self.metadata = metadata
+
+
+class StageStats:
+    """
+    Elementos procesados y segundos de trabajo de una etapa.
+    """
+
+    def __init__(self, name: str, unit: str):
+        self.name = name
+        self.unit = unit
+        self.items = 0
+        self.seconds = 0.0
+
+    def add(self, items: int, seconds: float):
+        self.items += items
+        self.seconds += seconds
+
+    def rate(self) -> float:
+        return self.items / self.seconds if self.seconds else 0.0
+
+    def __str__(self) -> str:
+        return f"{self.name}: {self.items} {self.unit} en {self.seconds:.1f} s ({self.rate():.1f} {self.unit}/s)"
+
+
+class IngestStats:
+    """
+    Contadores de todas las etapas y reporte periódico del avance.
+    """
+
+    def __init__(self, report_interval: float = INGEST_REPORT_INTERVAL):
+        self.stages = {
+            "extract": StageStats("extracción", "páginas"),
+            "chunk": StageStats("fragmentación", "fragmentos"),
+            "embed": StageStats("embeddings", "fragmentos"),
+            "upsert": StageStats("upsert", "vectores"),
+        }
+        self.files = 0
+        self.errors = 0
+        self.deleted = 0
+        self.failed_paths = set()
+        self.plan: Optional[Plan] = None
+        self.started_at = time.perf_counter()
+        self.report_interval = report_interval
+        self._last_report = self.started_at
+
+    def __getitem__(self, stage: str) -> StageStats:
+        return self.stages[stage]
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started_at
+
+    def maybe_report(self):
+        now = time.perf_counter()
+        if now - self._last_report >= self.report_interval:
+            self._last_report = now
+            self.report()
+
+    def report(self):
+        print(f"ingest: {self.files} archivos, {self.errors} errores, {self.deleted} vectores borrados, "
+              f"{self.elapsed():.1f} s")
+        for stage in self.stages.values():
+            print(f"ingest:   {stage}")
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "files": self.files,
+            "errors": self.errors,
+            "deleted": self.deleted,
+            "seconds": self.elapsed(),
+            **({"plan": self.plan.counts()} if self.plan is not None else {}),
+            **{name: {"items": stage.items, "seconds": stage.seconds} for name, stage in self.stages.items()},
+        }
+
+
+def iter_files(data_dir: str, topics: Optional[Sequence[str]] = None) -> Iterator[Tuple[str, str]]:
+    """
+    Recorre data/<tema>/ en orden y entrega (tema, ruta) de los archivos soportados.
+    """
+    topics = topics or sorted(
+        name for name in os.listdir(data_dir) if os.path.isdir(os.path.join(data_dir, name))
+    )
+    for topic in topics:
+        for root, dirs, files in os.walk(os.path.join(data_dir, topic)):
+            dirs.sort()
+            for name in sorted(files):
+                if os.path.splitext(name)[1].lower() in SUPPORTED_EXTENSIONS:
+                    yield topic, os.path.join(root, name)
+
+
+def extraction_tasks(files: Iterable[Tuple[str, str]],
+                     pages_per_task: int = PAGES_PER_TASK) -> Iterator[Tuple[str, str, int, Optional[int]]]:
+    """
+    Divide cada PDF en rangos de páginas; los demás archivos son una sola tarea.
+
+    Yields:
+        (tema, ruta, página inicial, página final) con páginas en base 0
+    """
+    for topic, path in files:
+        pages = count_pages(path)
+        if not pages:
+            yield topic, path, 0, None
+            continue
+        for start in range(0, pages, pages_per_task):
+            yield topic, path, start, min(start + pages_per_task, pages)
+
+
+def extract_task(path: str, start: int, stop: Optional[int]) -> Tuple[List[Tuple[int, str]], float]:
+    """
+    Tarea del grupo de procesos: texto de las páginas [start, stop) de `path`.
+    """
+    began = time.perf_counter()
+    return list(iter_pages(path, start, stop)), time.perf_counter() - began
+
+
+def _bounded_map(executor: Optional[Executor], func: Callable, tasks: Iterable[tuple],
+                 max_in_flight: int) -> Iterator[Tuple[tuple, Any]]:
+    # Como executor.map, pero sin encolar todas las tareas de una vez y en el mismo orden
+    if executor is None:
+        for task in tasks:
+            yield task, _call(func, task)
+        return
+
+    pending: Deque[Tuple[tuple, Any]] = deque()
+    for task in tasks:
+        pending.append((task, executor.submit(func, *task[1:])))
+        if len(pending) >= max_in_flight:
+            done, future = pending.popleft()
+            yield done, _result(future)
+    while pending:
+        done, future = pending.popleft()
+        yield done, _result(future)
+
+
+def _call(func: Callable, task: tuple) -> Any:
+    try:
+        return func(*task[1:])
+    except Exception as e:
+        return e
+
+
+def _result(future) -> Any:
+    try:
+        return future.result()
+    except Exception as e:
+        return e
+
+
+def iter_extracted_pages(tasks: Iterable[Tuple[str, str, int, Optional[int]]], stats: IngestStats,
+                         executor: Optional[Executor] = None,
+                         max_in_flight: int = INGEST_MAX_IN_FLIGHT) -> Iterator[Tuple[str, str, int, str]]:
+    """
+    Ejecuta las tareas de extracción en `executor` (o en este proceso si es None).
+
+    Yields:
+        (tema, ruta, número de página, texto) de las páginas con texto
+    """
+    last_path = None
+    for (topic, path, start, _), result in _bounded_map(executor, extract_task, tasks, max_in_flight):
+        if path != last_path:
+            stats.files += 1
+            last_path = path
+        if isinstance(result, Exception):
+            print(f"ingest: No se pudo extraer {path} (desde la página {start + 1}): {result}")
+            stats.errors += 1
+            stats.failed_paths.add(path)
+            continue
+        pages, seconds = result
+        stats["extract"].add(len(pages), seconds)
+        for number, text in pages:
+            if text:
+                yield topic, path, number, text
+
+
+def chunk_id(source: str, index: int) -> str:
+    """
+    Id estable de un fragmento: volver a ingerir un archivo sobrescribe sus vectores.
+    """
+    digest = hashlib.sha1(source.encode("utf-8")).hexdigest()[:16]
+    return f"{digest}-{index}"
+
+
+def source_of(path: str, data_dir: str) -> str:
+    """
+    Ruta con la que se guarda el archivo en los metadatos (data/<tema>/<archivo>).
+    """
+    base = os.path.dirname(os.path.abspath(data_dir))
+    return os.path.relpath(os.path.abspath(path), base).replace(os.sep, "/")
+
+
+class _TimedPages:
+    # Cuenta el tiempo que el fragmentador pasa esperando páginas, para descontarlo de su etapa
+    def __init__(self, pages: Iterable[Tuple[str, str, int, str]]):
+        self.pages = pages
+        self.waited = 0.0
+
+    def __iter__(self) -> Iterator[Tuple[int, str]]:
+        iterator = iter(self.pages)
+        while True:
+            began = time.perf_counter()
+            try:
+                _, _, number, text = next(iterator)
+            except StopIteration:
+                self.waited += time.perf_counter() - began
+                return
+            self.waited += time.perf_counter() - began
+            yield number, text
+
+
+def iter_chunks(pages: Iterable[Tuple[str, str, int, str]], data_dir: str, stats: IngestStats,
+                chunker: Chunker = LegalChunker().chunk) -> Iterator[Chunk]:
+    """
+    Fragmentos de cada documento con los metadatos que lee query_pinecone
+    (`text`, `source`, `page`), el tema y la jerarquía que agregue el fragmentador.
+
+    Las páginas de un documento se pasan al fragmentador a medida que llegan, de
+    modo que una unidad (un artículo) puede continuar en la página siguiente.
+    """
+    for (topic, path), document in groupby(pages, key=lambda page: page[:2]):
+        source = source_of(path, data_dir)
+        timed = _TimedPages(document)
+        pieces = iter(chunker(timed))
+        index = 0
+        while True:
+            began, waited = time.perf_counter(), timed.waited
+            try:
+                text, metadata = next(pieces)
+            except StopIteration:
+                break
+            stats["chunk"].add(1, time.perf_counter() - began - (timed.waited - waited))
+            yield Chunk(chunk_id(source, index), text, {**metadata, "text": text, "source": source, "topic": topic})
+            index += 1
+
+
+def batched(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def openai_embedder(model: str) -> Embedder:
+    """
+    Embeddings por lotes con el EmbeddingService del modelo, con prioridad "batch"
+    para no desplazar a las consultas de la aplicación.
+    """
+    def embed(texts: List[str]):
+        from graph.chains.embeddings import get_embedding_service
+        from graph.rate_limit import PRIORITY_BATCH, request_priority
+
+        with request_priority(PRIORITY_BATCH):
+            return get_embedding_service(model).embed(texts)
+
+    return embed
+
+
+def _values(vector: Sequence[float]) -> List[float]:
+    return vector.tolist() if hasattr(vector, "tolist") else list(vector)
+
+
+def iter_embedded(chunks: Iterable[Chunk], embed: Embedder, stats: IngestStats,
+                  batch_size: int = EMBEDDING_BATCH_SIZE) -> Iterator[List[Tuple[Chunk, Sequence[float]]]]:
+    """
+    Lotes de fragmentos con su embedding.
+    """
+    for batch in batched(chunks, batch_size):
+        began = time.perf_counter()
+        vectors = embed([chunk.text for chunk in batch])
+        stats["embed"].add(len(batch), time.perf_counter() - began)
+        yield list(zip(batch, vectors))
+
+
+def pinecone_target(topic: str) -> Tuple[str, str]:
+    """
+    Índice y namespace de Pinecone de un tema.
+    """
+    from graph.chains import retrieval
+
+    prefix = PINECONE_TOPICS.get(topic)
+    if prefix is None:
+        raise ValueError(f"El tema {topic} no tiene índice de Pinecone configurado.")
+    return getattr(retrieval, f"{prefix}_INDEX_NAME"), getattr(retrieval, f"{prefix}_NAMESPACE")
+
+
+def _records(batch: List[Tuple[Chunk, Sequence[float]]]) -> List[Dict[str, Any]]:
+    return [{"id": chunk.id, "values": _values(vector), "metadata": chunk.metadata} for chunk, vector in batch]
+
+
+class PineconeSink:
+    """
+    Destino en el índice y namespace de Pinecone de un tema.
+    """
+
+    def __init__(self, index_name: str, namespace: str, index: Any = None):
+        self.index_name = index_name
+        self.namespace = namespace
+        if index is None:
+            from graph.chains.retrieval import initialize_pinecone
+
+            index = initialize_pinecone(index_name)
+        self.index = index
+        if self.index is None:
+            raise ValueError(f"El índice {index_name} no existe en Pinecone. Créelo antes de la ingesta.")
+
+    @classmethod
+    def for_topic(cls, topic: str) -> "PineconeSink":
+        return cls(*pinecone_target(topic))
+
+    def upsert(self, batch: List[Tuple[Chunk, Sequence[float]]]):
+        # Un lote de embeddings no cabe en una solicitud (límite de 2 MB): se parte por tamaño
+        for request in iter_batches(_records(batch)):
+            self.index.upsert(vectors=request, namespace=self.namespace)
+
+    def delete(self, ids: Sequence[str]):
+        for start in range(0, len(ids), DELETE_BATCH_SIZE):
+            self.index.delete(ids=list(ids[start:start + DELETE_BATCH_SIZE]), namespace=self.namespace)
+
+
+class SpoolSink:
+    """
+    Destino en un directorio de carga (<índice>/<namespace>.jsonl) que después sube
+    corpus/upsert.py en paralelo y con continuación. Sin borrado: se usa sin manifiesto.
+    """
+
+    def __init__(self, spool_dir: str, index_name: str, namespace: str):
+        folder = os.path.join(spool_dir, index_name)
+        os.makedirs(folder, exist_ok=True)
+        self.path = os.path.join(folder, f"{namespace}.jsonl")
+        # Cada ingesta empieza el archivo de nuevo: el avance de la carga se cuenta desde el inicio
+        open(self.path, "w", encoding="utf-8").close()
+
+    @classmethod
+    def for_topic(cls, spool_dir: str) -> Callable[[str], "SpoolSink"]:
+        return lambda topic: cls(spool_dir, *pinecone_target(topic))
+
+    def upsert(self, batch: List[Tuple[Chunk, Sequence[float]]]):
+        with open(self.path, "a", encoding="utf-8") as f:
+            for record in _records(batch):
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+class ChromaSink:
+    """
+    Destino en la colección local de Chroma que usa get_chroma_retriever.
+    """
+
+    def __init__(self):
+        import chromadb
+
+        from graph.chains.retrieval import CHROMA_COLLECTION_NAME, CHROMA_PERSIST_DIRECTORY
+
+        client = chromadb.PersistentClient(path=CHROMA_PERSIST_DIRECTORY)
+        self.collection = client.get_or_create_collection(CHROMA_COLLECTION_NAME)
+
+    def upsert(self, batch: List[Tuple[Chunk, Sequence[float]]]):
+        self.collection.upsert(
+            ids=[chunk.id for chunk, _ in batch],
+            embeddings=[_values(vector) for _, vector in batch],
+            documents=[chunk.text for chunk, _ in batch],
+            metadatas=[{k: v for k, v in chunk.metadata.items() if k != "text"} for chunk, _ in batch],
+        )
+
+    def delete(self, ids: Sequence[str]):
+        self.collection.delete(ids=list(ids))
+
+
+class _ManifestWriter:
+    """
+    Registra en el manifiesto cada archivo cuyos fragmentos ya se enviaron completos.
+
+    Los fragmentos llegan en el orden de los archivos, así que cuando un lote trae
+    fragmentos de un archivo, los anteriores ya terminaron.
+    """
+
+    def __init__(self, manifest: Manifest, entries: List[FileEntry], get_sink: Callable[[str], Any],
+                 stats: IngestStats, chunker_version: str, embedding_model: str):
+        self.manifest = manifest
+        self.get_sink = get_sink
+        self.stats = stats
+        self.chunker_version = chunker_version
+        self.embedding_model = embedding_model
+        self._order: Deque[FileEntry] = deque(entries)
+        self._ids: Dict[str, List[str]] = defaultdict(list)
+
+    def upserted(self, batch: List[Tuple[Chunk, Any]]):
+        for chunk, _ in batch:
+            self._ids[chunk.metadata["source"]].append(chunk.id)
+        current = batch[-1][0].metadata["source"]
+        while self._order and self._order[0].source != current:
+            self._finish(self._order.popleft())
+
+    def close(self):
+        while self._order:
+            self._finish(self._order.popleft())
+
+    def _finish(self, entry: FileEntry):
+        ids = self._ids.pop(entry.source, [])
+        if entry.path in self.stats.failed_paths:
+            # Se reintenta en la próxima ingesta; sus fragmentos anteriores se conservan
+            return
+        stale = sorted(set(entry.previous_ids) - set(ids))
+        if stale:
+            self.get_sink(entry.topic).delete(stale)
+            self.stats.deleted += len(stale)
+        self.manifest.record(entry, ids, self.chunker_version, self.embedding_model)
+
+
+def ingest(data_dir: str, topics: Optional[Sequence[str]] = None, sink_for: Callable[[str], Any] = PineconeSink.for_topic,
+           embed: Optional[Embedder] = None, workers: int = INGEST_WORKERS,
+           batch_size: int = EMBEDDING_BATCH_SIZE, chunker: Optional[Chunker] = None,
+           stats: Optional[IngestStats] = None, embedding_model: Optional[str] = None,
+           chunker_version: str = CHUNKER_VERSION, manifest: Optional[Manifest] = None,
+           dry_run: bool = False) -> IngestStats:
+    """
+    Ingiere los archivos de data/<tema>/ de `topics` (todos si es None).
+
+    Args:
+        sink_for: devuelve el destino de un tema (objeto con upsert(lote) y delete(ids))
+        embed: embeddings de una lista de textos (por defecto, OpenAI con `embedding_model`)
+        workers: procesos de extracción (0 para extraer en este proceso)
+        embedding_model: modelo de embeddings (por defecto EMBEDDING_MODEL de retrieval)
+        manifest: si se indica, solo se ingieren los archivos nuevos o modificados
+        dry_run: con manifiesto, solo calcula e imprime el plan
+
+    Returns:
+        Las estadísticas por etapa (y el plan, si hay manifiesto)
+    """
+    if embedding_model is None:
+        from graph.chains.retrieval import EMBEDDING_MODEL
+
+        embedding_model = EMBEDDING_MODEL
+    embed = embed or openai_embedder(embedding_model)
+    stats = stats or IngestStats()
+    sinks: Dict[str, Any] = {}
+
+    def get_sink(topic: str):
+        if topic not in sinks:
+            sinks[topic] = sink_for(topic)
+        return sinks[topic]
+
+    files: Iterable[Tuple[str, str]] = iter_files(data_dir, topics)
+    writer = None
+    if manifest is not None:
+        stats.plan = manifest.plan(
+            ((topic, path, source_of(path, data_dir)) for topic, path in files), chunker_version, embedding_model, topics,
+            dry_run=dry_run,
+        )
+        print(f"ingest: {stats.plan.describe()}")
+        if dry_run:
+            return stats
+        for entry in stats.plan.removed:
+            if entry.previous_ids:
+                get_sink(entry.topic).delete(entry.previous_ids)
+                stats.deleted += len(entry.previous_ids)
+            manifest.forget(entry.source)
+        pending = stats.plan.pending
+        files = [(entry.topic, entry.path) for entry in pending]
+        writer = _ManifestWriter(manifest, pending, get_sink, stats, chunker_version, embedding_model)
+
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 0 and files else None
+    try:
+        tasks = extraction_tasks(files)
+        pages = iter_extracted_pages(tasks, stats, executor, max(INGEST_MAX_IN_FLIGHT, workers))
+        chunks = iter_chunks(pages, data_dir, stats, chunker or LegalChunker().chunk)
+        # Un lote no mezcla temas: cada tema va a su índice y namespace
+        for topic, topic_chunks in _group_by_topic(chunks):
+            sink = get_sink(topic)
+            for batch in iter_embedded(topic_chunks, embed, stats, batch_size):
+                began = time.perf_counter()
+                sink.upsert(batch)
+                stats["upsert"].add(len(batch), time.perf_counter() - began)
+                if writer is not None:
+                    writer.upserted(batch)
+                stats.maybe_report()
+        if writer is not None:
+            writer.close()
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+    stats.report()
+    return stats
+
+
+def _group_by_topic(chunks: Iterable[Chunk]) -> Iterator[Tuple[str, Iterator[Chunk]]]:
+    # Los archivos llegan ordenados por tema, así que basta agrupar los consecutivos
+    return groupby(chunks, key=lambda chunk: chunk.metadata["topic"])
@@ -0,0 +1,220 @@
+"""
+Manifiesto de la ingesta en SQLite, para volver a ingerir solo lo que cambió.
+
+Por cada archivo ingerido en un destino (Pinecone o la colección local) guarda el
+hash SHA-256 del contenido, el tamaño y la fecha de modificación, la versión del
+fragmentador, el modelo de embeddings y los ids de los fragmentos resultantes.
+
+Con eso, plan() clasifica los archivos de data/ en nuevos, modificados, sin
+cambios y eliminados:
+
+- Un archivo con el mismo tamaño y fecha no se vuelve a leer; si cambió la fecha
+  pero el hash es el mismo, solo se actualiza la fecha.
+- Cambiar la versión del fragmentador o el modelo de embeddings marca como
+  modificados todos los archivos del destino.
+- De un archivo modificado se borran después del upsert los fragmentos que ya no
+  produce; de uno eliminado, todos sus fragmentos.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+INGEST_MANIFEST_DB = os.environ.get("INGEST_MANIFEST_DB", "ingest_manifest.sqlite")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS manifest_files (
+    target TEXT NOT NULL,
+    source TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    chunker_version TEXT NOT NULL,
+    embedding_model TEXT NOT NULL,
+    chunk_ids TEXT NOT NULL,
+    ingested_at REAL NOT NULL,
+    PRIMARY KEY (target, source)
+);
+CREATE INDEX IF NOT EXISTS idx_manifest_files_topic ON manifest_files(target, topic);
+"""
+
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def file_digest(path: str) -> str:
+    """
+    SHA-256 del archivo, leído por bloques.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class FileEntry:
+    """
+    Un archivo del plan: su estado actual y los ids que produjo en la ingesta anterior.
+    """
+
+    __slots__ = ("topic", "path", "source", "sha256", "size", "mtime", "previous_ids")
+
+    def __init__(self, topic: str, path: str, source: str, sha256: str, size: int, mtime: float,
+                 previous_ids: Sequence[str] = ()):
+        self.topic = topic
+        self.path = path
+        self.source = source
+        self.sha256 = sha256
+        self.size = size
+        self.mtime = mtime
+        self.previous_ids = list(previous_ids)
+
+
+class Plan:
+    """
+    Archivos nuevos, modificados, sin cambios y eliminados respecto del manifiesto.
+    """
+
+    def __init__(self):
+        self.new: List[FileEntry] = []
+        self.changed: List[FileEntry] = []
+        self.unchanged: List[FileEntry] = []
+        self.removed: List[FileEntry] = []
+
+    @property
+    def pending(self) -> List[FileEntry]:
+        """
+        Archivos por ingerir, en el orden en que se recorrieron.
+        """
+        return sorted(self.new + self.changed, key=lambda entry: (entry.topic, entry.path))
+
+    def counts(self) -> Dict[str, int]:
+        return {
+            "new": len(self.new),
+            "changed": len(self.changed),
+            "unchanged": len(self.unchanged),
+            "removed": len(self.removed),
+            "removed_chunks": sum(len(entry.previous_ids) for entry in self.removed),
+        }
+
+    def describe(self) -> str:
+        lines = [
+            "{new} nuevos, {changed} modificados, {unchanged} sin cambios, "
+            "{removed} eliminados ({removed_chunks} fragmentos por borrar)".format(**self.counts())
+        ]
+        for label, entries in (("+", self.new), ("~", self.changed), ("-", self.removed)):
+            for entry in entries:
+                detail = f" ({len(entry.previous_ids)} fragmentos)" if entry.previous_ids else ""
+                lines.append(f"  {label} {entry.source}{detail}")
+        return "\n".join(lines)
+
+
+class Manifest:
+    """
+    Estado de la ingesta de cada archivo en un destino.
+    """
+
+    def __init__(self, target: str, db_path: str = INGEST_MANIFEST_DB):
+        self.target = target
+        self.db_path = db_path
+        self._local = threading.local()
+        with self.connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def plan(self, files: Iterable[Tuple[str, str, str]], chunker_version: str, embedding_model: str,
+             topics: Optional[Sequence[str]] = None, dry_run: bool = False) -> Plan:
+        """
+        Compara los archivos actuales con el manifiesto.
+
+        Args:
+            files: (tema, ruta, fuente) de los archivos de data/
+            topics: temas recorridos; los archivos de otros temas no se dan por eliminados
+            dry_run: no guardar las fechas nuevas de los archivos que solo cambiaron de fecha
+        """
+        conn = self.connect()
+        known = {
+            row["source"]: row
+            for row in conn.execute("SELECT * FROM manifest_files WHERE target = ?", (self.target,))
+            if not topics or row["topic"] in topics
+        }
+        plan = Plan()
+        seen = set()
+        touched = []
+        for topic, path, source in files:
+            seen.add(source)
+            stat = os.stat(path)
+            row = known.get(source)
+            same_version = (
+                row is not None
+                and row["chunker_version"] == chunker_version
+                and row["embedding_model"] == embedding_model
+            )
+            if same_version and (row["size"], row["mtime"]) == (stat.st_size, stat.st_mtime):
+                plan.unchanged.append(FileEntry(topic, path, source, row["sha256"], stat.st_size, stat.st_mtime))
+                continue
+
+            entry = FileEntry(topic, path, source, file_digest(path), stat.st_size, stat.st_mtime,
+                              json.loads(row["chunk_ids"]) if row is not None else ())
+            if row is None:
+                plan.new.append(entry)
+            elif same_version and row["sha256"] == entry.sha256:
+                # Solo cambió la fecha (copia, checkout): no hay nada que volver a ingerir
+                touched.append((stat.st_mtime, stat.st_size, self.target, source))
+                plan.unchanged.append(entry)
+            else:
+                plan.changed.append(entry)
+
+        if touched and not dry_run:
+            with conn:
+                conn.executemany("UPDATE manifest_files SET mtime = ?, size = ? WHERE target = ? AND source = ?", touched)
+
+        for source, row in known.items():
+            if source not in seen:
+                plan.removed.append(FileEntry(row["topic"], "", source, row["sha256"], row["size"], row["mtime"],
+                                              json.loads(row["chunk_ids"])))
+        return plan
+
+    def record(self, entry: FileEntry, chunk_ids: Sequence[str], chunker_version: str, embedding_model: str):
+        """
+        Registra un archivo ingerido por completo con los ids de sus fragmentos.
+        """
+        with self.connect() as conn:
+            conn.execute(
+                """
+                INSERT INTO manifest_files
+                    (target, source, topic, sha256, size, mtime, chunker_version, embedding_model, chunk_ids, ingested_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(target, source) DO UPDATE SET
+                    topic = excluded.topic, sha256 = excluded.sha256, size = excluded.size, mtime = excluded.mtime,
+                    chunker_version = excluded.chunker_version, embedding_model = excluded.embedding_model,
+                    chunk_ids = excluded.chunk_ids, ingested_at = excluded.ingested_at
+                """,
+                (
+                    self.target, entry.source, entry.topic, entry.sha256, entry.size, entry.mtime,
+                    chunker_version, embedding_model, json.dumps(list(chunk_ids)), time.time(),
+                ),
+            )
+
+    def forget(self, source: str):
+        with self.connect() as conn:
+            conn.execute("DELETE FROM manifest_files WHERE target = ? AND source = ?", (self.target, source))
+
+    def chunk_ids(self, source: str) -> List[str]:
+        row = self.connect().execute(
+            "SELECT chunk_ids FROM manifest_files WHERE target = ? AND source = ?", (self.target, source)
+        ).fetchone()
+        return json.loads(row["chunk_ids"]) if row else []
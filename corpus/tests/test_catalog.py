@@ -0,0 +1,73 @@
+import os
+
+from corpus.catalog import Catalog, parse_metadata
+
+
+def test_parse_metadata_from_filename() -> None:
+    metadata = parse_metadata(os.path.join("data", "iva", "Oficio No. 901234 de 15 de marzo de 2021.pdf"), "data")
+
+    assert metadata["tema"] == "IVA"
+    assert metadata["tipo"] == "Oficio"
+    assert metadata["numero"] == "901234"
+    assert metadata["anio"] == 2021
+
+
+def test_incremental_build_and_filters(tmp_path) -> None:
+    data = tmp_path / "data"
+    (data / "renta").mkdir(parents=True)
+    for name in ["Concepto 100 de 2020.txt", "Concepto 200 de 2021.txt", "Sentencia 300 Consejo de Estado 2021.txt"]:
+        (data / "renta" / name).write_text("texto", encoding="utf-8")
+
+    catalog = Catalog(str(tmp_path / "catalog.sqlite"), str(data))
+    assert catalog.has_changes()
+    assert catalog.build()["added"] == 3
+    assert catalog.build()["unchanged"] == 3
+    assert not catalog.has_changes()
+
+    (data / "renta" / "Concepto 100 de 2020.txt").unlink()
+    (data / "renta" / "Concepto 200 de 2021.txt").write_text("texto modificado", encoding="utf-8")
+    assert catalog.has_changes()
+    stats = catalog.build()
+    assert (stats["removed"], stats["updated"]) == (1, 1)
+
+    rows, total = catalog.search(tema="Renta", anio=2021, page_size=1)
+    assert total == 2 and len(rows) == 1
+    assert catalog.facets("Renta")["tipo"] == ["Concepto", "Sentencia"]
+
+    (data / "renta" / "Oficio 400 de 2022.txt").write_text("texto", encoding="utf-8")
+    assert catalog.has_changes()
+    assert catalog.build_in_background()
+    catalog._build_thread.join()
+    assert not catalog.building and not catalog.has_changes()
+    assert catalog.search(tema="Renta")[1] == 3
+
+
+def test_full_text_search(tmp_path) -> None:
+    data = tmp_path / "data"
+    (data / "retencion").mkdir(parents=True)
+    (data / "retencion" / "Concepto 10 de 2022.txt").write_text(
+        "La retención en la fuente sobre pagos al exterior.\fTarifa general del impuesto.", encoding="utf-8"
+    )
+    (data / "retencion" / "Oficio 20 de 2023.txt").write_text("Pagos laborales y retención mínima.", encoding="utf-8")
+
+    catalog = Catalog(str(tmp_path / "catalog.sqlite"), str(data))
+    catalog.build()
+
+    # Sin tildes y sin distinguir mayúsculas
+    results, total = catalog.full_text_search("RETENCION")
+    assert total == 2
+    assert "**retención**" in results[0]["fragmento"]
+
+    # Frase exacta, con la página donde aparece
+    results, total = catalog.full_text_search('"tarifa general"')
+    assert total == 1 and results[0]["pagina"] == 2
+
+    results, total = catalog.full_text_search('"pagos laborales"', tipo="Concepto")
+    assert total == 0
+
+    # Actualización incremental del índice
+    (data / "retencion" / "Concepto 30 de 2024.txt").write_text("Dividendos gravados.", encoding="utf-8")
+    (data / "retencion" / "Oficio 20 de 2023.txt").unlink()
+    catalog.build()
+    assert catalog.full_text_search("dividendos")[1] == 1
+    assert catalog.full_text_search("laborales")[1] == 0
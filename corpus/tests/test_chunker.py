@@ -0,0 +1,79 @@
+from corpus.chunker import LegalChunker, classify, estimate_tokens
+
+ESTATUTO = [
+    (1, """LIBRO PRIMERO
+IMPUESTO SOBRE LA RENTA Y COMPLEMENTARIOS
+TÍTULO I
+RENTA
+CAPÍTULO I
+Sujetos pasivos
+ARTÍCULO 5o. EL IMPUESTO SOBRE LA RENTA Y COMPLEMENTARIOS SE CONSIDERA COMO UN SOLO TRIBUTO. Comprende el impuesto de renta y el de ganancias ocasionales.
+ARTÍCULO 6. DEROGADO.
+ARTÍCULO 7. DEROGADO.
+CAPÍTULO II
+Ingresos
+ARTÍCULO 26. LOS INGRESOS SON BASE DE LA RENTA LÍQUIDA. La renta líquida gravable se determina así:"""),
+    (2, """1. De la suma de todos los ingresos ordinarios y extraordinarios realizados en el año o período gravable.
+2. Se restan las devoluciones, rebajas y descuentos, con lo cual se obtienen los ingresos netos.
+PARÁGRAFO 1o. Lo dispuesto en este artículo aplica también a las sucursales de sociedades extranjeras.
+PARÁGRAFO TRANSITORIO. Durante el año gravable 2023 aplica la regla anterior."""),
+]
+
+
+def test_classify_headings() -> None:
+    assert classify("ARTÍCULO 240-1. TARIFA PARA USUARIOS DE ZONA FRANCA.") == ("articulo", "240-1")
+    assert classify("Artículo 1.2.1.5.1. Ámbito de aplicación.") == ("articulo", "1.2.1.5.1")
+    assert classify("CAPÍTULO II")[0] == "capitulo"
+    assert classify("II. CONSIDERACIONES DE LA SALA") == ("apartado", "Consideraciones de la sala")
+    assert classify("Problema jurídico") == ("apartado", "Problema jurídico")
+    assert classify("artículo 240 del Estatuto Tributario") is None
+    assert classify("Artículo 240 del Estatuto Tributario establece la tarifa") is None
+
+
+def test_chunks_follow_articles_and_keep_hierarchy() -> None:
+    chunks = list(LegalChunker(max_tokens=200, min_tokens=30).chunk(ESTATUTO))
+
+    assert [metadata.get("articulo") for _, metadata in chunks] == ["5", "6 a 7", "26"]
+    text, metadata = chunks[0]
+    assert text.startswith("LIBRO PRIMERO") and "ARTÍCULO 6." not in text
+    assert metadata["jerarquia"] == "Libro Primero > Título I > Capítulo I > Art. 5"
+
+    # El artículo 26 continúa en la página 2 y queda completo, con sus parágrafos
+    text, metadata = chunks[2]
+    assert text.startswith("CAPÍTULO II\nIngresos\nARTÍCULO 26.") and text.endswith("regla anterior.")
+    assert (metadata["page"], metadata["page_end"], metadata["capitulo"]) == (1, 2, "CAPÍTULO II")
+
+
+def test_long_article_splits_at_paragraphs_with_heading() -> None:
+    chunks = list(LegalChunker(max_tokens=90, min_tokens=30).chunk(ESTATUTO))
+    parts = [(text, metadata) for text, metadata in chunks if metadata.get("articulo") == "26"]
+
+    assert [metadata["fragmento_parte"] for _, metadata in parts] == [1, 2]
+    assert parts[1][0].startswith("ARTÍCULO 26. LOS INGRESOS SON BASE DE LA RENTA LÍQUIDA.")
+    assert parts[1][0].split("\n")[1].startswith("PARÁGRAFO 1o.")
+    assert all(estimate_tokens(text) <= 90 for text, _ in parts)
+
+
+def test_split_article_keeps_parte_level() -> None:
+    pages = [(1, "PARTE II\nDISPOSICIONES FINALES\n" + ESTATUTO[0][1])] + ESTATUTO[1:]
+    chunks = list(LegalChunker(max_tokens=90, min_tokens=30).chunk(pages))
+    parts = [metadata for _, metadata in chunks if metadata.get("articulo") == "26"]
+
+    assert [metadata["fragmento_parte"] for metadata in parts] == [1, 2]
+    assert all(metadata["parte"] == "PARTE II" for metadata in parts)
+    assert all(metadata["jerarquia"].startswith("Parte II") for metadata in parts)
+
+
+def test_sentencia_sections_and_bounded_buffer() -> None:
+    body = " ".join(["La Sala reitera su precedente sobre la deducción de intereses."] * 10)
+    pages = [(1, "ANTECEDENTES\nLa sociedad presentó la declaración."), (2, "CONSIDERACIONES DE LA SALA")]
+    pages += [(page, body) for page in range(3, 30)]
+    pages += [(30, "FALLA\nCONFIRMAR la sentencia apelada.")]
+
+    chunks = list(LegalChunker(max_tokens=300, min_tokens=50).chunk(pages))
+
+    assert [metadata.get("apartado") for _, metadata in chunks][0] == "Antecedentes"
+    considerations = [metadata for _, metadata in chunks if metadata.get("apartado") == "Consideraciones de la sala"]
+    assert len(considerations) > 5 and considerations[-1]["page_end"] == 29
+    assert chunks[-1][1]["apartado"] == "Falla" and chunks[-1][1]["page"] == 30
+    assert all(estimate_tokens(text) <= 300 for text, _ in chunks)
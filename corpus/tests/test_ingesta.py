@@ -0,0 +1,102 @@
+import random
+import sys
+
+from corpus.chunker import split_text
+from corpus.fake_pinecone import FakePinecone
+from corpus.ingesta import IngestStats, PineconeSink, extraction_tasks, ingest, iter_files
+
+
+class ListSink:
+    def __init__(self):
+        self.batches = []
+
+    def upsert(self, batch):
+        self.batches.append(batch)
+
+
+def fake_embed(texts):
+    return [[float(len(text)), 1.0] for text in texts]
+
+
+def test_split_text_overlaps_and_covers_text() -> None:
+    text = " ".join(f"palabra{i}" for i in range(500))
+    chunks = split_text(text, size=200, overlap=40)
+
+    assert all(len(chunk) <= 200 for chunk in chunks)
+    assert chunks[0].startswith("palabra0 ") and chunks[-1].endswith("palabra499")
+    assert chunks[1].split()[0] in chunks[0]
+
+
+def test_iter_files_and_tasks(tmp_path) -> None:
+    (tmp_path / "renta").mkdir()
+    (tmp_path / "iva").mkdir()
+    (tmp_path / "renta" / "b.txt").write_text("b", encoding="utf-8")
+    (tmp_path / "renta" / "a.txt").write_text("a", encoding="utf-8")
+    (tmp_path / "renta" / "notas.docx").write_text("x", encoding="utf-8")
+    (tmp_path / "iva" / "c.html").write_text("<p>c</p>", encoding="utf-8")
+
+    files = list(iter_files(str(tmp_path)))
+    assert [(topic, path.rsplit("/", 1)[1]) for topic, path in files] == [
+        ("iva", "c.html"), ("renta", "a.txt"), ("renta", "b.txt")
+    ]
+    assert [task[2:] for task in extraction_tasks(files)] == [(0, None)] * 3
+
+
+def test_pdf_without_pypdf_is_a_single_task(tmp_path, monkeypatch) -> None:
+    # Sin pypdf, unstructured procesa el PDF completo: dividirlo en rangos lo repetiría
+    monkeypatch.setitem(sys.modules, "pypdf", None)
+    pdf = tmp_path / "renta" / "estatuto.pdf"
+    pdf.parent.mkdir()
+    pdf.write_bytes(b"%PDF-1.4\n" + b"<< /Type /Page >>\n" * 40)
+
+    assert list(extraction_tasks([("renta", str(pdf))], pages_per_task=16)) == [("renta", str(pdf), 0, None)]
+
+
+def test_ingest_streams_topics_to_their_sinks(tmp_path) -> None:
+    data = tmp_path / "data"
+    (data / "renta").mkdir(parents=True)
+    (data / "timbre").mkdir(parents=True)
+    (data / "renta" / "Concepto 1.txt").write_text("Primera página.\fSegunda página.\f", encoding="utf-8")
+    (data / "timbre" / "Concepto 2.html").write_text("<h1>Timbre</h1><script>x()</script>", encoding="utf-8")
+
+    sinks = {}
+    stats = ingest(str(data), sink_for=lambda topic: sinks.setdefault(topic, ListSink()), embed=fake_embed,
+                   embedding_model="modelo", workers=2, batch_size=1, stats=IngestStats(report_interval=3600))
+
+    # Las dos páginas cortas del mismo documento quedan en un solo fragmento
+    renta = [chunk for batch in sinks["renta"].batches for chunk, _ in batch]
+    assert [(chunk.metadata["source"], chunk.metadata["page"], chunk.metadata["page_end"], chunk.text)
+            for chunk in renta] == [("data/renta/Concepto 1.txt", 1, 2, "Primera página.\nSegunda página.")]
+    assert [chunk.text for batch in sinks["timbre"].batches for chunk, _ in batch] == ["Timbre"]
+
+    summary = stats.summary()
+    assert (summary["files"], summary["errors"]) == (2, 0)
+    assert summary["extract"]["items"] == 4
+    assert summary["upsert"]["items"] == summary["embed"]["items"] == 2
+
+
+def test_pinecone_sink_splits_batches_under_request_limit(tmp_path) -> None:
+    data = tmp_path / "data"
+    (data / "renta").mkdir(parents=True)
+    (data / "renta" / "Concepto 3.txt").write_text(
+        "\f".join(f"Página {n}. " + "Texto del concepto. " * 30 for n in range(120)), encoding="utf-8"
+    )
+    rng = random.Random(0)
+    index = FakePinecone().Index("renta")
+
+    def embed(texts):
+        # Vectores del tamaño de text-embedding-3-large
+        return [[rng.uniform(-0.05, 0.05) for _ in range(3072)] for _ in texts]
+
+    def per_page(pages):
+        for number, text in pages:
+            yield text, {"page": number}
+
+    stats = ingest(str(data), sink_for=lambda topic: PineconeSink("renta", topic, index=index), embed=embed,
+                   embedding_model="modelo", chunker=per_page, workers=0, batch_size=256,
+                   stats=IngestStats(report_interval=3600))
+
+    # Un solo lote de 120 embeddings (unos 8 MB) se envía en varias solicitudes de menos de 2 MB
+    assert stats.summary()["errors"] == 0
+    assert index.count("renta") == 120
+    assert index.requests > 1
@@ -0,0 +1,79 @@
+import os
+
+from corpus.ingesta import IngestStats, ingest
+from corpus.manifest import Manifest
+
+
+class MemorySink:
+    def __init__(self):
+        self.vectors = {}
+        self.upserts = 0
+
+    def upsert(self, batch):
+        self.upserts += len(batch)
+        for chunk, vector in batch:
+            self.vectors[chunk.id] = chunk
+
+    def delete(self, ids):
+        for chunk_id in ids:
+            del self.vectors[chunk_id]
+
+
+def per_page(pages):
+    for number, text in pages:
+        yield text, {"page": number}
+
+
+def run(data, manifest, sink, **kwargs):
+    return ingest(str(data), sink_for=lambda topic: sink, embed=lambda texts: [[1.0]] * len(texts), workers=0,
+                  embedding_model="modelo", chunker=per_page, manifest=manifest,
+                  stats=IngestStats(report_interval=3600), **kwargs)
+
+
+def test_incremental_ingest(tmp_path) -> None:
+    data = tmp_path / "data"
+    (data / "renta").mkdir(parents=True)
+    (data / "renta" / "a.txt").write_text("Página uno.\fPágina dos.\fPágina tres.", encoding="utf-8")
+    (data / "renta" / "b.txt").write_text("Otro documento.", encoding="utf-8")
+    manifest = Manifest("pinecone", str(tmp_path / "manifest.sqlite"))
+    sink = MemorySink()
+
+    assert run(data, manifest, sink).summary()["plan"]["new"] == 2
+    assert (len(sink.vectors), sink.upserts) == (4, 4)
+
+    # Sin cambios: no se vuelve a ingerir nada, aunque cambie la fecha
+    os.utime(data / "renta" / "b.txt", (1, 1))
+    mtime = "SELECT mtime FROM manifest_files WHERE source = 'data/renta/b.txt'"
+    assert run(data, manifest, sink, dry_run=True).plan.counts()["unchanged"] == 2
+    # La simulación no guarda la fecha nueva
+    assert manifest.connect().execute(mtime).fetchone()[0] != 1
+    stats = run(data, manifest, sink)
+    assert (stats.plan.counts()["unchanged"], sink.upserts) == (2, 4)
+    assert manifest.connect().execute(mtime).fetchone()[0] == 1
+
+    # a.txt pierde una página y b.txt se elimina
+    (data / "renta" / "a.txt").write_text("Página uno.\fPágina dos modificada.", encoding="utf-8")
+    (data / "renta" / "b.txt").unlink()
+    dry = run(data, manifest, sink, dry_run=True)
+    assert dry.plan.counts() == {"new": 0, "changed": 1, "unchanged": 0, "removed": 1, "removed_chunks": 1}
+    assert sink.upserts == 4
+
+    stats = run(data, manifest, sink)
+    assert stats.deleted == 2
+    assert sorted(chunk.text for chunk in sink.vectors.values()) == ["Página dos modificada.", "Página uno."]
+    assert manifest.chunk_ids("data/renta/a.txt") == sorted(sink.vectors)
+
+
+def test_model_change_reingests_everything(tmp_path) -> None:
+    data = tmp_path / "data"
+    (data / "iva").mkdir(parents=True)
+    (data / "iva" / "c.txt").write_text("Texto.", encoding="utf-8")
+    manifest = Manifest("pinecone", str(tmp_path / "manifest.sqlite"))
+
+    run(data, manifest, MemorySink())
+    assert run(data, manifest, MemorySink(), dry_run=True).plan.counts()["unchanged"] == 1
+
+    stats = ingest(str(data), sink_for=lambda topic: MemorySink(), embed=lambda texts: [[1.0]] * len(texts),
+                   workers=0, embedding_model="otro-modelo", manifest=manifest, dry_run=True,
+                   stats=IngestStats(report_interval=3600))
+    assert stats.plan.counts()["changed"] == 1
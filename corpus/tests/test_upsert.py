@@ -0,0 +1,121 @@
+import json
+import os
+
+from corpus.fake_pinecone import MAX_REQUEST_BYTES, FakePinecone
+from corpus.ingesta import IngestStats, SpoolSink, ingest
+from corpus.upsert import BulkUpserter, Target, UpsertProgress, iter_batches, spool_jobs, vector_bytes
+
+
+def vectors(prefix, count, dimensions=8, text=""):
+    return [
+        {"id": f"{prefix}#{i:05d}", "values": [0.1] * dimensions, "metadata": {"text": text, "source": prefix}}
+        for i in range(count)
+    ]
+
+
+def test_batches_respect_count_and_size() -> None:
+    records = vectors("a", 50, dimensions=1536, text="x" * 2000)
+    size = vector_bytes(records[0])
+    batches = list(iter_batches(records, max_vectors=20, max_bytes=size * 7 + 1))
+    assert [len(batch) for batch in batches] == [7] * 7 + [1]
+    assert [len(batch) for batch in iter_batches(records, max_vectors=20, max_bytes=10 ** 9)] == [20, 20, 10]
+    # El estimado no se queda corto frente al JSON real
+    assert size * 7 < MAX_REQUEST_BYTES
+    assert [v["id"] for batch in batches for v in batch] == [v["id"] for v in records]
+
+
+def test_parallel_upsert_retries_transient_errors() -> None:
+    pinecone = FakePinecone(latency=0.01)
+    pinecone.Index("legal").fail_next = [429, 503]
+    jobs = [(Target("legal", f"ns{n}"), vectors(f"ns{n}", 95)) for n in range(4)]
+    jobs.append((Target("otro", "renta"), vectors("renta", 30)))
+    upserter = BulkUpserter(pinecone.Index, max_vectors=10, concurrency=8, parallel_namespaces=5, in_flight=2,
+                            sleep=lambda seconds: None)
+
+    stats = upserter.run(jobs)
+
+    for n in range(4):
+        assert pinecone.Index("legal").count(f"ns{n}") == 95
+        assert stats[f"legal/ns{n}"].status == "done"
+        assert stats[f"legal/ns{n}"].vectors == 95
+        assert stats[f"legal/ns{n}"].batches == 10
+    assert pinecone.Index("otro").count("renta") == 30
+    assert sum(entry.retries for entry in stats.values()) == 2
+    assert sum(entry.errors for entry in stats.values()) == 0
+    assert pinecone.Index("legal").max_concurrent > 1
+
+
+def test_resume_from_last_acknowledged_batch(tmp_path) -> None:
+    pinecone = FakePinecone()
+    index = pinecone.Index("legal")
+    records = vectors("renta", 100)
+    target = Target("legal", "renta")
+    progress = UpsertProgress("carga-1", str(tmp_path / "progress.sqlite"))
+    upserter = BulkUpserter(pinecone.Index, progress, max_vectors=10, in_flight=1, sleep=lambda seconds: None)
+
+    # El cuarto lote falla con un error permanente: se confirman los tres primeros
+    index.fail_next = [None, None, None, 400]
+    stats = upserter.run([(target, records)])
+    assert stats["legal/renta"].status == "failed"
+    assert stats["legal/renta"].errors == 1
+    assert progress.acked(target) == 30
+    assert index.count("renta") == 30
+
+    requests = index.requests
+    stats = upserter.run([(target, records)])
+    assert stats["legal/renta"].status == "done"
+    assert stats["legal/renta"].skipped == 30
+    assert stats["legal/renta"].vectors == 70
+    assert index.requests - requests == 7
+    assert progress.acked(target) == 100
+    assert index.count("renta") == 100
+
+    # Otra corrida empieza de cero; los ids estables hacen que repetir no duplique
+    UpsertProgress("carga-1", str(tmp_path / "progress.sqlite")).reset()
+    BulkUpserter(pinecone.Index, UpsertProgress("carga-1", str(tmp_path / "progress.sqlite")),
+                 max_vectors=10).run([(target, records)])
+    assert index.count("renta") == 100
+
+
+def test_spool_from_ingest(tmp_path) -> None:
+    data = tmp_path / "data"
+    (data / "renta").mkdir(parents=True)
+    (data / "renta" / "a.txt").write_text("Artículo 1. Uno.\fArtículo 2. Dos.", encoding="utf-8")
+    spool = tmp_path / "spool"
+    ingest(str(data), sink_for=lambda topic: SpoolSink(str(spool), "legal", topic),
+           embed=lambda texts: [[0.5, 0.5]] * len(texts), workers=0, embedding_model="modelo",
+           stats=IngestStats(report_interval=3600))
+
+    jobs = spool_jobs(str(spool))
+    assert [job.target for job in jobs] == [Target("legal", "renta")]
+    pinecone = FakePinecone()
+    BulkUpserter(pinecone.Index).run(jobs)
+    stored = pinecone.Index("legal").namespaces["renta"]
+    assert stored and all(vector["values"] == [0.5, 0.5] for vector in stored.values())
+    assert all(vector["metadata"]["source"].endswith("a.txt") for vector in stored.values())
+
+
+def test_rewritten_spool_restarts_progress(tmp_path) -> None:
+    spool = tmp_path / "spool" / "legal"
+    spool.mkdir(parents=True)
+    path = spool / "renta.jsonl"
+
+    def write(prefix, count, mtime):
+        path.write_text("".join(json.dumps(vector) + "\n" for vector in vectors(prefix, count)), encoding="utf-8")
+        os.utime(path, (mtime, mtime))
+
+    pinecone = FakePinecone()
+    index = pinecone.Index("legal")
+    progress = UpsertProgress("carga", str(tmp_path / "progress.sqlite"))
+    upserter = BulkUpserter(pinecone.Index, progress, max_vectors=10, in_flight=1, sleep=lambda seconds: None)
+
+    write("a", 50, 1_000_000)
+    index.fail_next = [None, None, 400]
+    upserter.run(spool_jobs(str(tmp_path / "spool")))
+    assert progress.acked(Target("legal", "renta")) == 20
+
+    # La ingesta volvió a escribir el archivo: los 20 primeros ya no son los confirmados
+    write("b", 50, 2_000_000)
+    stats = upserter.run(spool_jobs(str(tmp_path / "spool")))
+    assert stats["legal/renta"].skipped == 0 and stats["legal/renta"].vectors == 50
+    assert index.fetch(["b#00000"], "renta")["vectors"]
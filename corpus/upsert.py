@@ -0,0 +1,437 @@
+"""
+Carga masiva de vectores en varios índices y namespaces de Pinecone en paralelo.
+
+Cada trabajo es un destino (índice, namespace) con su secuencia de vectores
+({"id", "values", "metadata"}). BulkUpserter:
+
+- arma lotes de hasta UPSERT_BATCH_VECTORS vectores y UPSERT_BATCH_BYTES bytes
+  estimados (el límite de Pinecone es 2 MB por solicitud);
+- atiende UPSERT_PARALLEL_NAMESPACES destinos a la vez, con hasta
+  UPSERT_IN_FLIGHT lotes en vuelo por destino, sobre un grupo común de
+  UPSERT_CONCURRENCY hilos;
+- reintenta los errores transitorios (429, 5xx, conexión) con backoff exponencial;
+- guarda en SQLite, por corrida y destino, cuántos vectores van confirmados sin
+  huecos. Si la carga se interrumpe o un lote agota sus reintentos, la siguiente
+  ejecución con el mismo nombre de corrida continúa desde el último lote
+  confirmado. Los ids son estables, así que reenviar un lote es inofensivo.
+  Con el avance se guarda la huella del origen (tamaño y fecha del archivo de
+  carga); si el archivo se volvió a escribir, ese destino empieza de cero en vez
+  de saltar vectores que no son los ya confirmados.
+
+Para cada destino se informan vectores, lotes, bytes, reintentos, errores y vectores
+por segundo.
+
+Los vectores se leen de un directorio de carga con un archivo JSONL por destino
+(<directorio>/<índice>/<namespace>.jsonl), que escribe `ingest_legal_docs.py --spool`.
+
+Ejemplo:
+    python -m corpus.upsert spool/ --run carga-2025-06
+    python -m corpus.upsert spool/ --run carga-2025-06 --restart   # empieza de cero
+
+Configuración por variables de entorno:
+    UPSERT_BATCH_VECTORS: vectores por lote (por defecto 100)
+    UPSERT_BATCH_BYTES: bytes estimados por lote (por defecto 1800000)
+    UPSERT_CONCURRENCY: solicitudes simultáneas en total (por defecto 8)
+    UPSERT_PARALLEL_NAMESPACES: destinos que se cargan a la vez (por defecto 4)
+    UPSERT_IN_FLIGHT: lotes en vuelo por destino (por defecto 2)
+    UPSERT_MAX_RETRIES: reintentos por lote (por defecto 5)
+    UPSERT_PROGRESS_DB: base de datos del avance (por defecto upsert_progress.sqlite)
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import islice
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from graph.rate_limit import RETRYABLE_STATUS_CODES, backoff_delay, is_retryable
+
+UPSERT_BATCH_VECTORS = int(os.environ.get("UPSERT_BATCH_VECTORS", 100))
+UPSERT_BATCH_BYTES = int(os.environ.get("UPSERT_BATCH_BYTES", 1800000))
+UPSERT_CONCURRENCY = int(os.environ.get("UPSERT_CONCURRENCY", 8))
+UPSERT_PARALLEL_NAMESPACES = int(os.environ.get("UPSERT_PARALLEL_NAMESPACES", 4))
+UPSERT_IN_FLIGHT = int(os.environ.get("UPSERT_IN_FLIGHT", 2))
+UPSERT_MAX_RETRIES = int(os.environ.get("UPSERT_MAX_RETRIES", 5))
+UPSERT_PROGRESS_DB = os.environ.get("UPSERT_PROGRESS_DB", "upsert_progress.sqlite")
+
+# Bytes por componente de un vector en el JSON de la solicitud: el repr de un float32
+# convertido a float ocupa hasta 23 caracteres ("-1.2345678918063641e-05"), más ", "
+BYTES_PER_VALUE = 25
+# Llaves y separadores de cada vector en el JSON
+VECTOR_OVERHEAD_BYTES = 64
+
+PROGRESS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS upsert_progress (
+    run TEXT NOT NULL,
+    index_name TEXT NOT NULL,
+    namespace TEXT NOT NULL,
+    acked INTEGER NOT NULL,
+    fingerprint TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (run, index_name, namespace)
+);
+"""
+
+
+class Target(NamedTuple):
+    index: str
+    namespace: str
+
+    def __str__(self) -> str:
+        return f"{self.index}/{self.namespace}"
+
+
+class UpsertJob(NamedTuple):
+    target: Target
+    vectors: Iterable[Dict[str, Any]]
+    # Huella del origen de los vectores; si cambia, el avance guardado no sirve
+    fingerprint: Optional[str] = None
+
+
+class UpsertError(Exception):
+    """
+    Un lote agotó sus reintentos; el destino se detiene en el último lote confirmado.
+    """
+
+
+def vector_bytes(vector: Dict[str, Any]) -> int:
+    """
+    Tamaño estimado del vector en el cuerpo de la solicitud.
+    """
+    metadata = vector.get("metadata")
+    size = len(vector["id"]) + BYTES_PER_VALUE * len(vector["values"]) + VECTOR_OVERHEAD_BYTES
+    if metadata:
+        size += len(json.dumps(metadata, ensure_ascii=False).encode("utf-8"))
+    return size
+
+
+def iter_batches(vectors: Iterable[Dict[str, Any]], max_vectors: int = UPSERT_BATCH_VECTORS,
+                 max_bytes: int = UPSERT_BATCH_BYTES) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Lotes consecutivos sin pasar de `max_vectors` vectores ni de `max_bytes` bytes
+    (un vector más grande que el límite va solo).
+    """
+    batch: List[Dict[str, Any]] = []
+    size = 0
+    for vector in vectors:
+        vector_size = vector_bytes(vector)
+        if batch and (len(batch) >= max_vectors or size + vector_size > max_bytes):
+            yield batch
+            batch, size = [], 0
+        batch.append(vector)
+        size += vector_size
+    if batch:
+        yield batch
+
+
+def is_transient(error: Exception) -> bool:
+    # El SDK de Pinecone expone el código HTTP en `status`
+    return (
+        is_retryable(error)
+        or getattr(error, "status", None) in RETRYABLE_STATUS_CODES
+        or isinstance(error, (ConnectionError, TimeoutError))
+    )
+
+
+class NamespaceStats:
+    """
+    Avance y errores de la carga de un destino.
+    """
+
+    def __init__(self, target: Target):
+        self.target = target
+        self.vectors = 0
+        self.batches = 0
+        self.bytes = 0
+        self.retries = 0
+        self.errors = 0
+        self.skipped = 0
+        self.status = "pending"
+        self.last_error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def seconds(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+    def rate(self) -> float:
+        seconds = self.seconds()
+        return self.vectors / seconds if seconds else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "vectors": self.vectors,
+            "batches": self.batches,
+            "bytes": self.bytes,
+            "retries": self.retries,
+            "errors": self.errors,
+            "skipped": self.skipped,
+            "seconds": self.seconds(),
+            "vectors_per_second": self.rate(),
+            "last_error": self.last_error,
+        }
+
+    def __str__(self) -> str:
+        return (f"{self.target}: {self.status}, {self.vectors} vectores en {self.batches} lotes "
+                f"({self.rate():.0f} vectores/s), {self.retries} reintentos, {self.errors} errores"
+                + (f", {self.skipped} ya confirmados" if self.skipped else ""))
+
+
+class UpsertProgress:
+    """
+    Vectores confirmados sin huecos por corrida y destino.
+    """
+
+    def __init__(self, run: str, db_path: str = UPSERT_PROGRESS_DB):
+        self.run = run
+        self.db_path = db_path
+        self._local = threading.local()
+        with self.connect() as conn:
+            conn.executescript(PROGRESS_SCHEMA)
+            # Bases creadas antes de guardar la huella del origen
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(upsert_progress)")}
+            if "fingerprint" not in columns:
+                conn.execute("ALTER TABLE upsert_progress ADD COLUMN fingerprint TEXT")
+
+    def connect(self) -> sqlite3.Connection:
+        # Una conexión por hilo: cada destino confirma desde su propio hilo
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def acked(self, target: Target, fingerprint: Optional[str] = None) -> int:
+        """
+        Vectores confirmados del destino; 0 si el origen cambió desde que se guardó el avance.
+        """
+        row = self.connect().execute(
+            "SELECT acked, fingerprint FROM upsert_progress WHERE run = ? AND index_name = ? AND namespace = ?",
+            (self.run, target.index, target.namespace),
+        ).fetchone()
+        if row is None:
+            return 0
+        if fingerprint is not None and row[1] != fingerprint:
+            print(f"UpsertProgress.acked: {target}: el origen cambió desde la corrida {self.run}; se empieza de cero")
+            return 0
+        return row[0]
+
+    def ack(self, target: Target, acked: int, fingerprint: Optional[str] = None):
+        with self.connect() as conn:
+            conn.execute(
+                """
+                INSERT INTO upsert_progress (run, index_name, namespace, acked, fingerprint, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(run, index_name, namespace) DO UPDATE SET
+                    acked = excluded.acked, fingerprint = excluded.fingerprint, updated_at = excluded.updated_at
+                """,
+                (self.run, target.index, target.namespace, acked, fingerprint, time.time()),
+            )
+
+    def reset(self):
+        with self.connect() as conn:
+            conn.execute("DELETE FROM upsert_progress WHERE run = ?", (self.run,))
+
+
+class BulkUpserter:
+    """
+    Carga paralela por lotes con reintentos y continuación desde el último lote confirmado.
+    """
+
+    def __init__(self, index_for: Callable[[str], Any], progress: Optional[UpsertProgress] = None,
+                 max_vectors: int = UPSERT_BATCH_VECTORS, max_bytes: int = UPSERT_BATCH_BYTES,
+                 concurrency: int = UPSERT_CONCURRENCY, parallel_namespaces: int = UPSERT_PARALLEL_NAMESPACES,
+                 in_flight: int = UPSERT_IN_FLIGHT, max_retries: int = UPSERT_MAX_RETRIES,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.index_for = index_for
+        self.progress = progress
+        self.max_vectors = max_vectors
+        self.max_bytes = max_bytes
+        self.concurrency = concurrency
+        self.parallel_namespaces = parallel_namespaces
+        self.in_flight = in_flight
+        self.max_retries = max_retries
+        self.sleep = sleep
+        self._indexes: Dict[str, Any] = {}
+        self._indexes_lock = threading.Lock()
+
+    def _index(self, name: str) -> Any:
+        with self._indexes_lock:
+            if name not in self._indexes:
+                self._indexes[name] = self.index_for(name)
+            return self._indexes[name]
+
+    def run(self, jobs: Iterable[Tuple[Any, ...]]) -> Dict[str, NamespaceStats]:
+        """
+        Carga los vectores de cada destino.
+
+        Args:
+            jobs: UpsertJob o tuplas (destino, vectores[, huella del origen])
+
+        Returns:
+            Estadísticas por destino ("índice/namespace")
+        """
+        jobs = [UpsertJob(*job) for job in jobs]
+        stats = {str(job.target): NamespaceStats(job.target) for job in jobs}
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="upsert") as requests, \
+                ThreadPoolExecutor(max_workers=self.parallel_namespaces, thread_name_prefix="upsert-ns") as namespaces:
+            futures = [
+                namespaces.submit(self._run_target, job, stats[str(job.target)], requests)
+                for job in jobs
+            ]
+            for future in futures:
+                future.result()
+        for entry in stats.values():
+            print(f"upsert: {entry}")
+        return stats
+
+    def _run_target(self, job: UpsertJob, stats: NamespaceStats, requests: ThreadPoolExecutor):
+        target, vectors = job.target, job.vectors
+        stats.started_at = time.perf_counter()
+        stats.status = "running"
+        acked = self.progress.acked(target, job.fingerprint) if self.progress else 0
+        stats.skipped = acked
+        pending: Deque[Tuple[int, Future]] = deque()
+        failed = False
+
+        def settle_oldest():
+            # Los lotes se confirman en orden: el avance guardado nunca deja huecos
+            nonlocal acked, failed
+            count, future = pending.popleft()
+            try:
+                future.result()
+            except Exception as e:
+                failed = True
+                stats.last_error = str(e)
+                return
+            if not failed:
+                acked += count
+                if self.progress:
+                    self.progress.ack(target, acked, job.fingerprint)
+
+        try:
+            index = self._index(target.index)
+            for batch in iter_batches(islice(vectors, acked, None), self.max_vectors, self.max_bytes):
+                if failed:
+                    break
+                pending.append((len(batch), requests.submit(self._send, index, target, batch, stats)))
+                while len(pending) >= self.in_flight:
+                    settle_oldest()
+            while pending:
+                settle_oldest()
+        except Exception as e:
+            # Error al abrir el índice o al leer los vectores
+            failed = True
+            stats.errors += 1
+            stats.last_error = str(e)
+            print(f"upsert: {target}: {e}")
+            for _, future in pending:
+                future.cancel()
+        stats.finished_at = time.perf_counter()
+        stats.status = "failed" if failed else "done"
+
+    def _send(self, index: Any, target: Target, batch: List[Dict[str, Any]], stats: NamespaceStats):
+        size = sum(vector_bytes(vector) for vector in batch)
+        attempt = 0
+        while True:
+            try:
+                index.upsert(vectors=batch, namespace=target.namespace)
+                break
+            except Exception as e:
+                if not is_transient(e) or attempt >= self.max_retries:
+                    with stats._lock:
+                        stats.errors += 1
+                    print(f"upsert: {target}: lote de {len(batch)} vectores falló: {e}")
+                    raise UpsertError(str(e)) from e
+                delay = backoff_delay(attempt)
+                with stats._lock:
+                    stats.retries += 1
+                print(f"upsert: {target}: error transitorio ({type(e).__name__}), reintento {attempt + 1}/{self.max_retries} "
+                      f"en {delay:.1f}s")
+                self.sleep(delay)
+                attempt += 1
+        with stats._lock:
+            stats.vectors += len(batch)
+            stats.batches += 1
+            stats.bytes += size
+
+
+def read_spool(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Vectores de un archivo JSONL de carga, en orden.
+    """
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def spool_fingerprint(path: str) -> str:
+    """
+    Huella de un archivo de carga: SpoolSink lo reescribe completo en cada ingesta.
+    """
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def spool_jobs(spool_dir: str) -> List[UpsertJob]:
+    """
+    Destinos de un directorio de carga (<índice>/<namespace>.jsonl).
+    """
+    jobs = []
+    for index_name in sorted(os.listdir(spool_dir)):
+        folder = os.path.join(spool_dir, index_name)
+        if not os.path.isdir(folder):
+            continue
+        for name in sorted(os.listdir(folder)):
+            if name.endswith(".jsonl"):
+                path = os.path.join(folder, name)
+                jobs.append(UpsertJob(Target(index_name, name[: -len(".jsonl")]), read_spool(path), spool_fingerprint(path)))
+    return jobs
+
+
+def pinecone_index(name: str) -> Any:
+    from graph.chains.retrieval import initialize_pinecone
+
+    index = initialize_pinecone(name)
+    if index is None:
+        raise ValueError(f"El índice {name} no existe en Pinecone. Créelo antes de la carga.")
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Carga masiva de vectores en Pinecone.")
+    parser.add_argument("spool_dir", help="Directorio con <índice>/<namespace>.jsonl")
+    parser.add_argument("--run", required=True, help="Nombre de la corrida (para continuar una carga interrumpida)")
+    parser.add_argument("--restart", action="store_true", help="Ignorar el avance guardado de la corrida")
+    parser.add_argument("--progress-db", default=UPSERT_PROGRESS_DB)
+    parser.add_argument("--concurrency", type=int, default=UPSERT_CONCURRENCY)
+    parser.add_argument("--parallel-namespaces", type=int, default=UPSERT_PARALLEL_NAMESPACES)
+    args = parser.parse_args()
+
+    progress = UpsertProgress(args.run, args.progress_db)
+    if args.restart:
+        progress.reset()
+    upserter = BulkUpserter(pinecone_index, progress, concurrency=args.concurrency,
+                            parallel_namespaces=args.parallel_namespaces)
+    stats = upserter.run(spool_jobs(args.spool_dir))
+    print(json.dumps({name: entry.as_dict() for name, entry in stats.items()}, indent=2))
+    if any(entry.status != "done" for entry in stats.values()):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    main()
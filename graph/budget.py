@@ -0,0 +1,68 @@
+"""
+Presupuesto por consulta para el ciclo de regeneración del grafo.
+
+Limita cuántas veces se vuelve a generar (o reparar) una respuesta, cuántos tokens
+se consumen en generación y cuánto tiempo de reloj puede tomar la consulta. Al
+agotarse el presupuesto, el grafo termina con la mejor respuesta obtenida hasta
+ese momento.
+
+Los valores por defecto se pueden ajustar con variables de entorno o pasarse en el
+estado inicial (max_regenerations, token_budget, deadline).
+"""
+
+import os
+import time
+from typing import Any, Dict, Optional
+
+MAX_REGENERATIONS = int(os.environ.get("MAX_REGENERATIONS", 2))
+GENERATION_TOKEN_BUDGET = int(os.environ.get("GENERATION_TOKEN_BUDGET", 60000))
+GENERATION_DEADLINE_SECONDS = float(os.environ.get("GENERATION_DEADLINE_SECONDS", 180))
+
+# Si está activo, una respuesta "not supported" se repara frase por frase en lugar
+# de regenerarse completa
+REPAIR_MODE = os.environ.get("REPAIR_MODE", "1").lower() in ("1", "true", "yes")
+
+# Orden de preferencia para elegir la mejor respuesta obtenida
+GRADE_RANK = {"useful": 2, "not useful": 1, "not supported": 0}
+
+
+def ensure_budget(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Devuelve los campos de presupuesto que faltan en el estado, con sus valores
+    por defecto. El plazo empieza a contar desde la primera llamada.
+    """
+    defaults = {
+        "generation_attempts": 0,
+        "tokens_used": 0,
+        "max_regenerations": MAX_REGENERATIONS,
+        "token_budget": GENERATION_TOKEN_BUDGET,
+        "deadline": time.time() + GENERATION_DEADLINE_SECONDS,
+    }
+    return {key: value for key, value in defaults.items() if state.get(key) is None}
+
+
+def budget_exhausted(state: Dict[str, Any]) -> Optional[str]:
+    """
+    Indica qué límite del presupuesto se agotó ("deadline", "regenerations" o
+    "tokens"), o None si aún queda presupuesto para otra generación.
+    """
+    deadline = state.get("deadline")
+    if deadline is not None and time.time() >= deadline:
+        return "deadline"
+    if state.get("generation_attempts", 0) - 1 >= state.get("max_regenerations", MAX_REGENERATIONS):
+        return "regenerations"
+    if state.get("tokens_used", 0) >= state.get("token_budget", GENERATION_TOKEN_BUDGET):
+        return "tokens"
+    return None
+
+
+def update_best(state: Dict[str, Any], generation: str, grade: Optional[str]) -> Dict[str, Any]:
+    """
+    Actualiza la mejor respuesta si la nueva tiene una calificación igual o mejor
+    (ante empate se prefiere la más reciente).
+    """
+    best_rank = GRADE_RANK.get(state.get("best_grade"), -1)
+    rank = GRADE_RANK.get(grade, -1)
+    if not state.get("best_generation") or rank >= best_rank:
+        return {"best_generation": generation, "best_grade": grade}
+    return {}
@@ -1,18 +1,16 @@
+from functools import lru_cache
+
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.pydantic_v1 import BaseModel, Field
-from langchain_core.runnables import RunnableSequence
+from langchain_core.runnables import Runnable
 from langchain_openai import ChatOpenAI
-import os
 from dotenv import load_dotenv
 
+from graph.chains.openai_client import rate_limited, require_openai_api_key
+
 # Cargar variables de entorno
 load_dotenv()
 
-# Obtener la clave API de OpenAI
-openai_api_key = os.getenv("OPENAI_API_KEY")
-if not openai_api_key:
-    raise ValueError("No se encontró la clave API de OpenAI. Por favor, configúrela en las variables de entorno.")
-
 
 class GradeAnswer(BaseModel):
 
@@ -21,9 +19,6 @@ class GradeAnswer(BaseModel):
     )
 
 
-llm = ChatOpenAI(temperature=0, model="gpt-4o-2024-08-06", api_key=openai_api_key)
-structured_llm_grader = llm.with_structured_output(GradeAnswer)
-
 system = """You are a grader assessing whether an answer addresses / resolves a question \n 
      Give a binary score 'yes' or 'no'. Yes' means that the answer resolves the question."""
 answer_prompt = ChatPromptTemplate.from_messages(
@@ -33,4 +28,19 @@ answer_prompt = ChatPromptTemplate.from_messages(
     ]
 )
 
-answer_grader: RunnableSequence = answer_prompt | structured_llm_grader
+
+@lru_cache(maxsize=None)
+def get_answer_grader() -> Runnable:
+    """
+    Crea el evaluador la primera vez que se usa (y valida entonces la clave de OpenAI).
+    """
+    llm = ChatOpenAI(temperature=0, model="gpt-4o-2024-08-06", api_key=require_openai_api_key(), max_retries=0)
+    structured_llm_grader = llm.with_structured_output(GradeAnswer)
+    return rate_limited(answer_prompt | structured_llm_grader, llm.model_name)
+
+
+def __getattr__(name):
+    # Compatibilidad con `from graph.chains.answer_grader import answer_grader`
+    if name == "answer_grader":
+        return get_answer_grader()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,172 @@
+"""
+Servicio de embeddings por lotes para la ingesta y la expansión de consultas.
+
+get_embedding pide un texto por solicitud, lo que basta para una pregunta. Para
+muchos textos, EmbeddingService:
+
+- empaqueta los textos en solicitudes de hasta EMBEDDING_MAX_INPUTS entradas y
+  EMBEDDING_MAX_REQUEST_TOKENS tokens estimados, repartidos entre las solicitudes
+  concurrentes para que todas trabajen;
+- envía hasta EMBEDDING_CONCURRENCY solicitudes a la vez, cada una por el limitador
+  del modelo y con la política de reintentos de openai_client;
+- pide los vectores en base64 y los decodifica directamente en una matriz NumPy
+  float32 (n_textos x dimensión), sin pasar por listas de Python.
+
+Las solicitudes heredan la prioridad del contexto de quien llama (la ingesta usa
+la prioridad "batch" para no desplazar a las consultas de la aplicación).
+
+Configuración por variables de entorno:
+    EMBEDDING_MAX_INPUTS: textos por solicitud (por defecto 2048, el máximo de la API)
+    EMBEDDING_MAX_REQUEST_TOKENS: tokens estimados por solicitud (por defecto 250000)
+    EMBEDDING_MIN_INPUTS: textos mínimos por solicitud al repartir (por defecto 16)
+    EMBEDDING_CONCURRENCY: solicitudes simultáneas (por defecto 4)
+"""
+
+import base64
+import contextvars
+import json
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from graph.chains.openai_client import MAX_RETRIES, estimate_tokens, get_limiter, get_openai_client
+from graph.rate_limit import RateLimiter, call_with_retry
+from graph.tracing import record_usage, span
+
+EMBEDDING_MAX_INPUTS = int(os.environ.get("EMBEDDING_MAX_INPUTS", 2048))
+EMBEDDING_MAX_REQUEST_TOKENS = int(os.environ.get("EMBEDDING_MAX_REQUEST_TOKENS", 250000))
+EMBEDDING_MIN_INPUTS = int(os.environ.get("EMBEDDING_MIN_INPUTS", 16))
+EMBEDDING_CONCURRENCY = int(os.environ.get("EMBEDDING_CONCURRENCY", 4))
+
+
+def pack_requests(token_counts: Sequence[int], max_inputs: int, max_tokens: int) -> List[Tuple[int, int]]:
+    """
+    Agrupa textos consecutivos en solicitudes sin pasar de `max_inputs` textos ni
+    de `max_tokens` tokens (un texto más largo que el límite va solo).
+
+    Returns:
+        Rangos [inicio, fin) de cada solicitud
+    """
+    ranges = []
+    start, tokens = 0, 0
+    for i, count in enumerate(token_counts):
+        if i > start and (i - start >= max_inputs or tokens + count > max_tokens):
+            ranges.append((start, i))
+            start, tokens = i, 0
+        tokens += count
+    if start < len(token_counts):
+        ranges.append((start, len(token_counts)))
+    return ranges
+
+
+class EmbeddingService:
+    """
+    Embeddings de muchos textos con solicitudes empaquetadas y concurrentes.
+    """
+
+    def __init__(self, model: str, client: Any = None, max_inputs: int = EMBEDDING_MAX_INPUTS,
+                 max_tokens: int = EMBEDDING_MAX_REQUEST_TOKENS, min_inputs: int = EMBEDDING_MIN_INPUTS,
+                 concurrency: int = EMBEDDING_CONCURRENCY, limiter: Optional[RateLimiter] = None):
+        self.model = model
+        self.client = client
+        self.max_inputs = max_inputs
+        self.max_tokens = max_tokens
+        self.min_inputs = min_inputs
+        self.concurrency = concurrency
+        self.limiter = limiter or get_limiter(model)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.stats = {"texts": 0, "requests": 0, "tokens": 0, "seconds": 0.0}
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="embeddings")
+            return self._executor
+
+    def plan(self, texts: Sequence[str]) -> List[Tuple[int, int]]:
+        """
+        Rangos de las solicitudes para `texts`: dentro de los límites de la API y
+        repartidos entre las solicitudes concurrentes.
+        """
+        per_request = max(self.min_inputs, math.ceil(len(texts) / self.concurrency))
+        return pack_requests(
+            [estimate_tokens(text) for text in texts], min(per_request, self.max_inputs), self.max_tokens
+        )
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Embeddings de `texts`, en el mismo orden.
+
+        Returns:
+            Matriz float32 de forma (len(texts), dimensión)
+        """
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        began = time.perf_counter()
+        ranges = self.plan(texts)
+        with span("openai.embedding_batch", model=self.model, inputs=len(texts), requests=len(ranges)):
+            if len(ranges) == 1:
+                parts = [self._request(list(texts))]
+            else:
+                # Cada solicitud corre en el contexto de quien llama (prioridad, traza)
+                futures = [
+                    self._pool().submit(contextvars.copy_context().run, self._request, list(texts[start:end]))
+                    for start, end in ranges
+                ]
+                parts = [future.result() for future in futures]
+        matrix = np.vstack(parts) if len(parts) > 1 else parts[0]
+        with self._lock:
+            self.stats["texts"] += len(texts)
+            self.stats["seconds"] += time.perf_counter() - began
+        return matrix
+
+    def embed_one(self, text: str) -> np.ndarray:
+        return self.embed([text])[0]
+
+    def _request(self, texts: List[str]) -> np.ndarray:
+        client = self.client or get_openai_client()
+        estimated = estimate_tokens(*texts)
+        raw = call_with_retry(
+            lambda: client.embeddings.with_raw_response.create(model=self.model, input=texts, encoding_format="base64"),
+            self.limiter,
+            estimated_tokens=estimated,
+            max_retries=MAX_RETRIES,
+        )
+        payload = json.loads(raw.text)
+        usage: Dict[str, int] = payload.get("usage") or {}
+        record_usage(usage)
+        if usage.get("total_tokens") is not None:
+            self.limiter.adjust(usage["total_tokens"] - estimated)
+
+        data = sorted(payload["data"], key=lambda item: item["index"])
+        matrix = np.vstack([np.frombuffer(base64.b64decode(item["embedding"]), dtype=np.float32) for item in data])
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["tokens"] += usage.get("total_tokens", estimated)
+        return matrix
+
+    def close(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+
+_services: Dict[str, EmbeddingService] = {}
+_services_lock = threading.Lock()
+
+
+def get_embedding_service(model: str) -> EmbeddingService:
+    """
+    Servicio compartido por el proceso para `model`.
+    """
+    with _services_lock:
+        if model not in _services:
+            _services[model] = EmbeddingService(model)
+        return _services[model]
@@ -0,0 +1,121 @@
+"""
+Servidor local que imita el endpoint de embeddings de OpenAI, para probar y medir
+EmbeddingService sin red ni costo.
+
+Responde POST /v1/embeddings con vectores deterministas (derivados del texto) en
+float o base64, con una latencia fija por solicitud más una por texto, y rechaza
+solicitudes que pasen del límite de entradas de la API.
+
+Ejemplo:
+    with FakeOpenAI(latency=0.05) as server:
+        client = OpenAI(api_key="test", base_url=server.url, max_retries=0)
+        EmbeddingService("text-embedding-3-large", client=client).embed(textos)
+"""
+
+import base64
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+import numpy as np
+
+MAX_INPUTS = 2048
+
+
+class FakeOpenAI:
+    """
+    Endpoint de embeddings en memoria servido en 127.0.0.1 en un puerto libre.
+    """
+
+    def __init__(self, dimensions: int = 64, latency: float = 0.0, latency_per_input: float = 0.0):
+        self.dimensions = dimensions
+        self.latency = latency
+        self.latency_per_input = latency_per_input
+        # Número de textos de cada solicitud atendida
+        self.requests: List[int] = []
+        self.max_concurrent = 0
+        self._active = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}/v1"
+
+    def vector(self, text: str) -> np.ndarray:
+        """
+        Vector determinista de `text` (el mismo que devuelve el servidor).
+        """
+        seed = int.from_bytes(hashlib.sha1(text.encode("utf-8")).digest()[:8], "little")
+        return np.random.default_rng(seed).standard_normal(self.dimensions).astype(np.float32)
+
+    def __enter__(self) -> "FakeOpenAI":
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status: int, body: dict):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if not self.path.endswith("/embeddings"):
+                    self._reply(404, {"error": {"message": "Not found"}})
+                    return
+                texts = request.get("input") or []
+                if isinstance(texts, str):
+                    texts = [texts]
+                if len(texts) > MAX_INPUTS:
+                    self._reply(400, {"error": {"message": f"Too many inputs: {len(texts)}"}})
+                    return
+
+                with fake._lock:
+                    fake._active += 1
+                    fake.max_concurrent = max(fake.max_concurrent, fake._active)
+                try:
+                    time.sleep(fake.latency + fake.latency_per_input * len(texts))
+                    data = []
+                    for i, text in enumerate(texts):
+                        vector = fake.vector(text)
+                        if request.get("encoding_format") == "base64":
+                            embedding = base64.b64encode(vector.tobytes()).decode("ascii")
+                        else:
+                            embedding = vector.tolist()
+                        data.append({"object": "embedding", "index": i, "embedding": embedding})
+                    tokens = sum(len(text) // 4 + 1 for text in texts)
+                    with fake._lock:
+                        fake.requests.append(len(texts))
+                finally:
+                    with fake._lock:
+                        fake._active -= 1
+                self._reply(200, {
+                    "object": "list",
+                    "data": data,
+                    "model": request.get("model"),
+                    "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+                })
+
+        return Handler
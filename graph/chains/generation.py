@@ -1,8 +1,27 @@
-from langchain import hub
+from functools import lru_cache
+
 from langchain_core.output_parsers import StrOutputParser
+from langchain_core.runnables import Runnable
 from langchain_openai import ChatOpenAI
 
-llm = ChatOpenAI(temperature=0)
-prompt = hub.pull("rlm/rag-prompt")
+from graph.chains.openai_client import rate_limited
+
+
+@lru_cache(maxsize=None)
+def get_generation_chain() -> Runnable:
+    """
+    Crea la cadena de generación la primera vez que se usa; el prompt se descarga
+    de LangChain Hub en ese momento y no al importar el módulo.
+    """
+    from langchain import hub
+
+    llm = ChatOpenAI(temperature=0, max_retries=0)
+    prompt = hub.pull("rlm/rag-prompt")
+    return rate_limited(prompt | llm | StrOutputParser(), llm.model_name, output_tokens=1000)
+
 
-generation_chain = prompt | llm | StrOutputParser()
+def __getattr__(name):
+    # Compatibilidad con `from graph.chains.generation import generation_chain`
+    if name == "generation_chain":
+        return get_generation_chain()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,20 +1,16 @@
+from functools import lru_cache
+
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.pydantic_v1 import BaseModel, Field
-from langchain_core.runnables import RunnableSequence
+from langchain_core.runnables import Runnable
 from langchain_openai import ChatOpenAI
-import os
 from dotenv import load_dotenv
 
+from graph.chains.openai_client import rate_limited, require_openai_api_key
+
 # Cargar variables de entorno
 load_dotenv()
 
-# Obtener la clave API de OpenAI
-openai_api_key = os.getenv("OPENAI_API_KEY")
-if not openai_api_key:
-    raise ValueError("No se encontró la clave API de OpenAI. Por favor, configúrela en las variables de entorno.")
-
-llm = ChatOpenAI(temperature=0, model="gpt-4o-2024-08-06", api_key=openai_api_key)
-
 
 class GradeHallucinations(BaseModel):
     """Binary score for hallucination present in generation answer."""
@@ -24,8 +20,6 @@ class GradeHallucinations(BaseModel):
     )
 
 
-structured_llm_grader = llm.with_structured_output(GradeHallucinations)
-
 system = """You are a grader assessing whether an LLM generation is grounded in / supported by a set of retrieved facts. \n 
      Give a binary score 'yes' or 'no'. 'Yes' means that the answer is grounded in / supported by the set of facts."""
 hallucination_prompt = ChatPromptTemplate.from_messages(
@@ -35,4 +29,19 @@ hallucination_prompt = ChatPromptTemplate.from_messages(
     ]
 )
 
-hallucination_grader: RunnableSequence = hallucination_prompt | structured_llm_grader
+
+@lru_cache(maxsize=None)
+def get_hallucination_grader() -> Runnable:
+    """
+    Crea el evaluador la primera vez que se usa (y valida entonces la clave de OpenAI).
+    """
+    llm = ChatOpenAI(temperature=0, model="gpt-4o-2024-08-06", api_key=require_openai_api_key(), max_retries=0)
+    structured_llm_grader = llm.with_structured_output(GradeHallucinations)
+    return rate_limited(hallucination_prompt | structured_llm_grader, llm.model_name)
+
+
+def __getattr__(name):
+    # Compatibilidad con `from graph.chains.hallucination_grader import hallucination_grader`
+    if name == "hallucination_grader":
+        return get_hallucination_grader()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
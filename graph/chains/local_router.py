@@ -0,0 +1,161 @@
+"""
+Enrutador local de preguntas: vectorstore o búsqueda web.
+
+En lugar de llamar al LLM en cada invocación del grafo, compara el embedding de la
+pregunta con los centroides de ejemplos etiquetados. Si la diferencia entre las dos
+rutas no alcanza el umbral de confianza, se usa una lista de palabras clave del
+dominio tributario y, como último recurso, el enrutador LLM (question_router).
+
+El embedding de la pregunta (text-embedding-3-large) se obtiene con get_embedding,
+que lo guarda en memoria por pregunta. El nodo retrieve del grafo consulta Chroma con
+otro modelo de embeddings, así que el enrutamiento agrega una llamada de embeddings
+por pregunta nueva; a cambio evita la llamada al LLM cuando hay confianza suficiente.
+"""
+
+import math
+import os
+import re
+import threading
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+
+from graph.chains.openai_client import create_embedding
+from graph.chains.retrieval import EMBEDDING_MODEL, get_embedding
+
+# Diferencia mínima de similitud entre la mejor y la segunda ruta para decidir localmente
+ROUTER_CONFIDENCE_MARGIN = float(os.environ.get("ROUTER_CONFIDENCE_MARGIN", 0.04))
+
+ROUTE_EXEMPLARS: Dict[str, List[str]] = {
+    "vectorstore": [
+        "¿Cuál es la tarifa del impuesto de renta para personas jurídicas?",
+        "¿Qué dice el artículo 240 del Estatuto Tributario?",
+        "¿Cuándo se causa el impuesto de timbre en un contrato?",
+        "¿Qué pagos están sujetos a retención en la fuente?",
+        "¿Cuál es la base gravable del IVA en la prestación de servicios?",
+        "¿Quiénes son responsables del impuesto al consumo?",
+        "¿Cómo se declara el ICA en Bogotá?",
+        "¿Qué concepto de la DIAN aplica a los dividendos de sociedades extranjeras?",
+        "¿Qué dijo el Consejo de Estado sobre la deducción de intereses?",
+        "¿Cuáles son los requisitos para solicitar la devolución de saldos a favor?",
+        "¿Qué cambió con la Ley 2277 de 2022 en ganancias ocasionales?",
+        "¿Cómo se liquida la sanción por extemporaneidad?",
+        "¿Qué obligaciones cambiarias tiene una inversión extranjera?",
+        "¿Qué tributos aduaneros se pagan en una importación temporal?",
+        "What is the income tax rate for companies in Colombia?",
+    ],
+    "websearch": [
+        "¿Cómo hago una pizza casera?",
+        "¿Quién ganó el partido de fútbol de ayer?",
+        "¿Qué clima hará mañana en Bogotá?",
+        "¿Cuál es la capital de Australia?",
+        "Recomiéndame una película para el fin de semana",
+        "¿Cómo instalo Python en Windows?",
+        "¿Cuál es la receta del ajiaco santafereño?",
+        "¿Qué noticias hay hoy sobre tecnología?",
+        "how to make pizza",
+        "What is the best smartphone this year?",
+    ],
+}
+
+# Raíces de términos del dominio que indican una consulta para la base de conocimiento
+VECTORSTORE_KEYWORDS = [
+    "impuesto", "tribut", "renta", "retencion", "timbre", "dian", "estatuto",
+    "decreto", "articulo", "concepto", "sentencia", "consejo de estado",
+    "declaracion", "sancion", "deduccion", "exencion", "exento", "gravable", "tarifa",
+    "contribuyente", "aduan", "cambiari", "parafiscal", "dividendo",
+    "ganancia ocasional", "facturacion", "regimen simple",
+]
+
+# Siglas y palabras cortas que solo cuentan como palabra completa
+VECTORSTORE_TERMS = ["iva", "ica", "dur", "uvt", "ley", "tax"]
+
+_centroids: Optional[Dict[str, List[float]]] = None
+_centroids_lock = threading.Lock()
+
+
+def _strip_accents(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text.lower())
+    return "".join(char for char in text if not unicodedata.combining(char))
+
+
+def _normalize(vector: List[float]) -> List[float]:
+    norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+    return [value / norm for value in vector]
+
+
+def _cosine(a: List[float], b: List[float]) -> float:
+    # Los centroides ya están normalizados; basta con normalizar la consulta
+    return sum(x * y for x, y in zip(_normalize(a), b))
+
+
+def get_centroids() -> Dict[str, List[float]]:
+    """
+    Calcula (una sola vez por proceso) el centroide normalizado de cada ruta con
+    una única llamada de embeddings para todos los ejemplos.
+    """
+    global _centroids
+    with _centroids_lock:
+        if _centroids is None:
+            labels = []
+            texts = []
+            for label, exemplars in ROUTE_EXEMPLARS.items():
+                labels.extend([label] * len(exemplars))
+                texts.extend(exemplars)
+
+            response = create_embedding(model=EMBEDDING_MODEL, input=texts)
+            sums: Dict[str, List[float]] = {}
+            for label, item in zip(labels, response.data):
+                vector = _normalize(item.embedding)
+                if label not in sums:
+                    sums[label] = vector
+                else:
+                    sums[label] = [x + y for x, y in zip(sums[label], vector)]
+            _centroids = {label: _normalize(vector) for label, vector in sums.items()}
+        return _centroids
+
+
+def keyword_route(question: str) -> Optional[str]:
+    """
+    Devuelve "vectorstore" si la pregunta contiene términos del dominio tributario.
+    """
+    text = re.sub(r"[^\w\s]", " ", _strip_accents(question))
+    if any(keyword in text for keyword in VECTORSTORE_KEYWORDS):
+        return "vectorstore"
+    if set(text.split()) & set(VECTORSTORE_TERMS):
+        return "vectorstore"
+    return None
+
+
+def embedding_route(question: str) -> Tuple[str, float]:
+    """
+    Ruta más similar por embeddings y margen de confianza sobre la segunda.
+    """
+    query_embedding = get_embedding(question)
+    scores = sorted(
+        ((_cosine(query_embedding, centroid), label) for label, centroid in get_centroids().items()),
+        reverse=True,
+    )
+    best_score, best_label = scores[0]
+    margin = best_score - scores[1][0] if len(scores) > 1 else best_score
+    return best_label, margin
+
+
+def route_locally(question: str) -> Tuple[Optional[str], str]:
+    """
+    Intenta decidir la ruta sin llamar al LLM.
+
+    Returns:
+        Tupla (ruta o None si no hay confianza suficiente, método usado)
+    """
+    try:
+        label, margin = embedding_route(question)
+        if margin >= ROUTER_CONFIDENCE_MARGIN:
+            return label, f"embeddings (margen {margin:.3f})"
+        print(f"local_router: Margen insuficiente ({margin:.3f}) para '{label}'")
+    except Exception as e:
+        print(f"local_router: Error al calcular embeddings para enrutar: {str(e)}")
+
+    label = keyword_route(question)
+    if label:
+        return label, "palabras clave"
+    return None, "sin confianza"
@@ -0,0 +1,168 @@
+"""
+Capa única de acceso a OpenAI para todo el proceso.
+
+Todas las llamadas (embeddings, reranking, generación, evaluadores y enrutador de
+LangChain) pasan por aquí para compartir un solo cliente, los límites de
+solicitudes/tokens por minuto de cada modelo y la política de reintentos.
+
+Configuración por variables de entorno:
+    OPENAI_RPM: solicitudes por minuto por modelo (por defecto 500)
+    OPENAI_TPM: tokens por minuto por modelo (por defecto 300000)
+    OPENAI_MAX_RETRIES: reintentos ante errores transitorios (por defecto 5)
+"""
+
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+from langchain_core.runnables import Runnable, RunnableLambda
+from openai import OpenAI
+
+from graph.rate_limit import RateLimiter, call_with_retry, metrics
+from graph.tracing import record_usage, span
+
+# Cargar variables de entorno
+load_dotenv()
+
+DEFAULT_RPM = float(os.environ.get("OPENAI_RPM", 500))
+DEFAULT_TPM = float(os.environ.get("OPENAI_TPM", 300000))
+MAX_RETRIES = int(os.environ.get("OPENAI_MAX_RETRIES", 5))
+
+# Aproximación de tokens por carácter para estimar el consumo antes de la llamada
+CHARS_PER_TOKEN = 4
+
+_client: Optional[OpenAI] = None
+_limiters: Dict[str, RateLimiter] = {}
+_lock = threading.Lock()
+
+
+def require_openai_api_key() -> str:
+    """
+    Devuelve la clave de OpenAI o falla con un mensaje claro si no está configurada.
+    """
+    openai_api_key = os.getenv("OPENAI_API_KEY")
+    if not openai_api_key:
+        raise ValueError("No se encontró la clave API de OpenAI. Por favor, configúrela en las variables de entorno.")
+    return openai_api_key
+
+
+def get_openai_client() -> OpenAI:
+    """
+    Devuelve el cliente de OpenAI compartido por el proceso.
+
+    Los reintentos del SDK se desactivan porque los maneja call_with_retry.
+    """
+    global _client
+    with _lock:
+        if _client is None:
+            _client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"), max_retries=0)
+        return _client
+
+
+def get_limiter(model: str) -> RateLimiter:
+    """
+    Devuelve el limitador del modelo (OpenAI aplica los límites por modelo).
+    """
+    with _lock:
+        if model not in _limiters:
+            _limiters[model] = RateLimiter(model, DEFAULT_RPM, DEFAULT_TPM)
+        return _limiters[model]
+
+
+def estimate_tokens(*texts: Any) -> int:
+    """
+    Estimación rápida de tokens a partir de la longitud de los textos.
+    """
+    return sum(len(str(text)) for text in texts if text) // CHARS_PER_TOKEN + 1
+
+
+def _adjust_with_usage(limiter: RateLimiter, response: Any, estimated: int):
+    usage = getattr(response, "usage", None)
+    record_usage(usage)
+    total = getattr(usage, "total_tokens", None)
+    if total is not None:
+        limiter.adjust(total - estimated)
+
+
+def create_chat_completion(model: str, messages: List[Dict[str, str]], max_tokens: Optional[int] = None, **kwargs):
+    """
+    Equivalente a client.chat.completions.create con límites y reintentos.
+    """
+    limiter = get_limiter(model)
+    # Prompt más una reserva para la salida (la generación estructurada ronda los 2.000 tokens)
+    estimated = estimate_tokens(*[message.get("content") for message in messages]) + (max_tokens or 2000)
+    if max_tokens is not None:
+        kwargs["max_tokens"] = max_tokens
+
+    with span("openai.chat_completion", model=model):
+        response = call_with_retry(
+            lambda: get_openai_client().chat.completions.create(model=model, messages=messages, **kwargs),
+            limiter,
+            estimated_tokens=estimated,
+            max_retries=MAX_RETRIES,
+        )
+        _adjust_with_usage(limiter, response, estimated)
+    return response
+
+
+def create_embedding(model: str, input: List[str], **kwargs):
+    """
+    Equivalente a client.embeddings.create con límites y reintentos.
+    """
+    limiter = get_limiter(model)
+    estimated = estimate_tokens(*input)
+
+    with span("openai.embedding", model=model, inputs=len(input)):
+        response = call_with_retry(
+            lambda: get_openai_client().embeddings.create(model=model, input=input, **kwargs),
+            limiter,
+            estimated_tokens=estimated,
+            max_retries=MAX_RETRIES,
+        )
+        _adjust_with_usage(limiter, response, estimated)
+    return response
+
+
+def rate_limited(runnable: Runnable, model: str, output_tokens: int = 200) -> Runnable:
+    """
+    Envuelve una cadena de LangChain para que cada invocación pase por el limitador
+    del modelo y por la política de reintentos compartida.
+
+    El modelo de la cadena debe crearse con max_retries=0 para no duplicar reintentos.
+    """
+    limiter = get_limiter(model)
+
+    def _invoke(inputs: Dict[str, Any]):
+        estimated = estimate_tokens(*inputs.values()) + output_tokens
+        # LangChain no expone `usage` en la salida estructurada; se registra la estimación
+        with span("openai.chain", model=model, estimated_tokens=estimated):
+            return call_with_retry(
+                lambda: runnable.invoke(inputs),
+                limiter,
+                estimated_tokens=estimated,
+                max_retries=MAX_RETRIES,
+            )
+
+    return RunnableLambda(_invoke)
+
+
+def get_metrics() -> Dict[str, Dict[str, Any]]:
+    """
+    Métricas de espera en cola, reintentos y errores por modelo.
+    """
+    return metrics.snapshot()
+
+
+def format_metrics() -> str:
+    """
+    Resumen legible de las métricas para imprimir en consola o en la interfaz.
+    """
+    lines = []
+    for model, entry in sorted(get_metrics().items()):
+        lines.append(
+            f"{model}: {entry['requests']} solicitudes, {entry['retries']} reintentos "
+            f"({entry['rate_limit_errors']} por 429), {entry['failures']} fallos, "
+            f"espera en cola prom. {entry['queue_wait_avg']:.2f}s / máx. {entry['queue_wait_max']:.2f}s"
+        )
+    return "\n".join(lines) if lines else "Sin llamadas a OpenAI registradas."
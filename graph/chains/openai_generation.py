@@ -1,16 +1,15 @@
 from typing import List, Dict, Any
-import os
 import re
-from openai import OpenAI
 from dotenv import load_dotenv
 from langchain_core.documents import Document
 
+from graph.chains.openai_client import create_chat_completion
+from graph.singleflight import coalesce, normalize_question
+from graph.tracing import traced
+
 # Cargar variables de entorno
 load_dotenv()
 
-# Inicializar el cliente de OpenAI
-client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
-
 def format_documents_for_openai(documents: List[Document]) -> str:
     """
     Formatea los documentos para OpenAI.
@@ -33,10 +32,23 @@ def format_documents_for_openai(documents: List[Document]) -> str:
     
     return formatted_docs
 
+def _documents_key(documents: List[Document]) -> tuple:
+    """
+    Identifica un conjunto de documentos para agrupar generaciones idénticas en curso.
+    """
+    return tuple(
+        (doc.metadata.get('source'), doc.metadata.get('page'), hash(doc.page_content))
+        for doc in documents
+    )
+
+@traced()
 def generate_with_openai(question: str, documents: List[Document]) -> Dict[str, Any]:
     """
     Genera una respuesta detallada y estructurada usando OpenAI GPT-4o-2024-08-06 con citas numeradas.
     
+    Si otra sesión ya está generando la respuesta para la misma pregunta (normalizada)
+    y los mismos documentos, se comparte ese resultado.
+    
     Args:
         question: La pregunta del usuario
         documents: Lista de documentos recuperados para responder a la pregunta
@@ -44,6 +56,10 @@ def generate_with_openai(question: str, documents: List[Document]) -> Dict[str,
     Returns:
         Dict con el texto generado, las citas extraídas y el mensaje completo de la API
     """
+    key = ("generate_with_openai", normalize_question(question), _documents_key(documents))
+    return coalesce(key, lambda: _generate_with_openai(question, documents))
+
+def _generate_with_openai(question: str, documents: List[Document]) -> Dict[str, Any]:
     # Formatear documentos para OpenAI
     formatted_docs = format_documents_for_openai(documents)
     
@@ -153,7 +169,7 @@ IMPORTANTE:
     
     try:
         # Llamar a la API de OpenAI
-        response = client.chat.completions.create(
+        response = create_chat_completion(
             model="gpt-4o-2024-08-06",
             messages=[
                 {"role": "system", "content": system_message},
@@ -308,11 +324,19 @@ def extract_citations_from_text(text, documents):
     
     return citations
 
+@traced()
 def generate_simple_response(question: str, documents: List[Document]) -> Dict[str, Any]:
     """
     Genera una respuesta simplificada usando OpenAI sin estructura formal.
     Ideal para la página General que consulta múltiples índices.
+    
+    Las generaciones idénticas en curso (misma pregunta normalizada y mismos
+    documentos) se comparten entre sesiones.
     """
+    key = ("generate_simple_response", normalize_question(question), _documents_key(documents))
+    return coalesce(key, lambda: _generate_simple_response(question, documents))
+
+def _generate_simple_response(question: str, documents: List[Document]) -> Dict[str, Any]:
     # Formatear documentos para OpenAI
     formatted_docs = format_documents_for_openai(documents)
     
@@ -372,7 +396,7 @@ INSTRUCCIONES ADICIONALES:
     
     try:
         # Llamar a la API de OpenAI
-        response = client.chat.completions.create(
+        response = create_chat_completion(
             model="gpt-4o-2024-08-06",
             messages=[
                 {"role": "system", "content": system_message},
@@ -0,0 +1,77 @@
+from functools import lru_cache
+from typing import List, Tuple
+
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.pydantic_v1 import BaseModel, Field
+from langchain_core.runnables import Runnable
+from langchain_openai import ChatOpenAI
+
+from graph.chains.openai_client import rate_limited
+
+
+class SentenceRepair(BaseModel):
+    """A sentence of the generation that is not supported by the facts."""
+
+    original: str = Field(
+        description="The unsupported sentence, copied exactly as it appears in the generation"
+    )
+    replacement: str = Field(
+        description="A rewritten sentence supported by the facts, or an empty string to remove it"
+    )
+
+
+class GenerationRepairs(BaseModel):
+    """Unsupported sentences of an LLM generation with grounded replacements."""
+
+    repairs: List[SentenceRepair] = Field(
+        description="Only the sentences that are not grounded in the facts"
+    )
+
+
+system = """You are reviewing an LLM generation against a set of retrieved facts. \n 
+     Identify ONLY the sentences that are not grounded in / supported by the facts. \n
+     For each one, copy the sentence exactly and write a replacement that is supported by the facts,
+     keeping the same language, tone and citation format ([n]). If no supported replacement exists,
+     use an empty string to remove the sentence. Do not touch sentences that are supported."""
+repair_prompt = ChatPromptTemplate.from_messages(
+    [
+        ("system", system),
+        ("human", "Set of facts: \n\n {documents} \n\n LLM generation: {generation}"),
+    ]
+)
+
+
+
+@lru_cache(maxsize=None)
+def get_repair_chain() -> Runnable:
+    """
+    Crea la cadena de reparación la primera vez que se usa.
+    """
+    llm = ChatOpenAI(temperature=0, model="gpt-4o-2024-08-06", max_retries=0)
+    structured_llm_repair = llm.with_structured_output(GenerationRepairs)
+    return rate_limited(repair_prompt | structured_llm_repair, llm.model_name, output_tokens=800)
+
+
+def __getattr__(name):
+    # Compatibilidad con `from graph.chains.repair import repair_chain`
+    if name == "repair_chain":
+        return get_repair_chain()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def repair_generation(generation: str, documents) -> Tuple[str, int]:
+    """
+    Reemplaza solo las frases no fundamentadas de la generación.
+
+    Returns:
+        Tupla (texto reparado, número de frases reemplazadas)
+    """
+    result = get_repair_chain().invoke({"documents": documents, "generation": generation})
+
+    repaired = generation
+    applied = 0
+    for item in result.repairs:
+        if item.original and item.original in repaired:
+            repaired = repaired.replace(item.original, item.replacement, 1)
+            applied += 1
+    return repaired, applied
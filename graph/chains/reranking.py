@@ -3,18 +3,18 @@ Módulo para implementar reranking de documentos recuperados.
 Esto mejora la relevancia de los documentos antes de generar respuestas.
 """
 
-import os
 from typing import List, Dict, Any
 from dotenv import load_dotenv
-from openai import OpenAI
 from langchain_core.documents import Document
 
+from graph.chains.openai_client import create_chat_completion
+from graph.singleflight import coalesce, normalize_question
+from graph.tracing import set_attribute, traced
+
 # Cargar variables de entorno
 load_dotenv()
 
-# Inicializar cliente de OpenAI
-client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
-
+@traced()
 def rerank_documents(query: str, documents: List[Document], top_k: int = 5) -> List[Document]:
     """
     Reordena los documentos según su relevancia para la consulta utilizando OpenAI.
@@ -34,6 +34,8 @@ def rerank_documents(query: str, documents: List[Document], top_k: int = 5) -> L
         return documents
     
     print(f"Reranking {len(documents)} documentos...")
+    set_attribute("documents", len(documents))
+    set_attribute("top_k", top_k)
     
     # Preparar los documentos para evaluación
     doc_texts = []
@@ -63,7 +65,7 @@ Proporciona tu evaluación en formato JSON con la siguiente estructura:
     
     try:
         # Llamar a la API de OpenAI
-        response = client.chat.completions.create(
+        response = create_chat_completion(
             model="gpt-4o-2024-08-06",
             messages=[
                 {"role": "system", "content": system_message},
@@ -112,6 +114,9 @@ def retrieve_with_reranking(query: str, retriever_func, top_k: int = 5, **kwargs
     """
     Recupera documentos y aplica reranking para mejorar la relevancia.
     
+    Si otra sesión está procesando la misma consulta (normalizada) con la misma
+    función de recuperación, se espera su resultado en lugar de repetir el trabajo.
+    
     Args:
         query: La consulta del usuario
         retriever_func: Función de recuperación a utilizar
@@ -121,13 +126,15 @@ def retrieve_with_reranking(query: str, retriever_func, top_k: int = 5, **kwargs
     Returns:
         Lista de documentos más relevantes después del reranking
     """
-    # Recuperar más documentos de los necesarios para tener un mejor pool para reranking
-    initial_docs = retriever_func(query, top_k=top_k*2, **kwargs)
-    
-    # Aplicar reranking
-    reranked_docs = rerank_documents(query, initial_docs, top_k=top_k)
+    def _retrieve_and_rerank():
+        # Recuperar más documentos de los necesarios para tener un mejor pool para reranking
+        initial_docs = retriever_func(query, top_k=top_k*2, **kwargs)
+        
+        # Aplicar reranking
+        return rerank_documents(query, initial_docs, top_k=top_k)
     
-    return reranked_docs 
+    key = ("retrieve_with_reranking", retriever_func.__name__, normalize_question(query), top_k, tuple(sorted(kwargs.items())))
+    return coalesce(key, _retrieve_and_rerank)
 
 def retrieve_with_multi_index_reranking(query: str, top_k: int = 10):
     """
@@ -144,6 +151,10 @@ def retrieve_with_multi_index_reranking(query: str, top_k: int = 10):
     Returns:
         Lista de documentos más relevantes después del reranking
     """
+    key = ("retrieve_with_multi_index_reranking", normalize_question(query), top_k)
+    return coalesce(key, lambda: _retrieve_with_multi_index_reranking(query, top_k))
+
+def _retrieve_with_multi_index_reranking(query: str, top_k: int):
     # Importar aquí para evitar dependencias circulares
     from graph.chains.retrieval import query_all_indices
     
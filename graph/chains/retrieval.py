@@ -1,21 +1,42 @@
 import os
-from typing import List
+import threading
+import time
+from functools import lru_cache
+from typing import List, Tuple
 from dotenv import load_dotenv
 import pinecone
-from openai import OpenAI
 from langchain_core.documents import Document
-from langchain_chroma import Chroma
-from langchain_openai import OpenAIEmbeddings
+
+from graph.chains.openai_client import create_embedding
+from graph.tracing import set_attribute, traced
 
 # Cargar variables de entorno
 load_dotenv()
 
 # Configuración para Chroma (IVA)
-chroma_retriever = Chroma(
-    collection_name="legal-docs-chroma",
-    persist_directory="./.chroma",
-    embedding_function=OpenAIEmbeddings(),
-).as_retriever()
+CHROMA_COLLECTION_NAME = "legal-docs-chroma"
+CHROMA_PERSIST_DIRECTORY = "./.chroma"
+
+@lru_cache(maxsize=None)
+def get_chroma_retriever():
+    """
+    Abre la colección de Chroma la primera vez que se consulta. Es la única
+    instancia del proceso (ingestion.py y las páginas la reutilizan).
+    """
+    from langchain_chroma import Chroma
+    from langchain_openai import OpenAIEmbeddings
+
+    return Chroma(
+        collection_name=CHROMA_COLLECTION_NAME,
+        persist_directory=CHROMA_PERSIST_DIRECTORY,
+        embedding_function=OpenAIEmbeddings(),
+    ).as_retriever()
+
+def __getattr__(name):
+    # Compatibilidad con `from graph.chains.retrieval import chroma_retriever`
+    if name == "chroma_retriever":
+        return get_chroma_retriever()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Configuración para Pinecone (común)
 PINECONE_API_KEY = os.environ.get("PINECONE_API_KEY")
@@ -23,6 +44,8 @@ PINECONE_ENVIRONMENT = os.environ.get("PINECONE_ENVIRONMENT", "us-east-1")
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
 EMBEDDING_MODEL = "text-embedding-3-large"
 TOP_K = 5  # Número de resultados a recuperar
+# Segundos durante los que se reutiliza la lista de índices de Pinecone
+PINECONE_INDEX_CACHE_TTL = float(os.environ.get("PINECONE_INDEX_CACHE_TTL", 300))
 
 # Configuración específica para Renta
 RENTA_INDEX_NAME = "renta"
@@ -98,48 +121,89 @@ ICA_GAITAN_INDEX_NAME = "icagaitan"
 ICA_GAITAN_NAMESPACE = "icagaitan"
 ICA_GAITAN_TOP_K = 10
 
-# Inicializar cliente de OpenAI
-client = OpenAI(api_key=OPENAI_API_KEY)
-
+@traced()
 def get_embedding(text: str) -> List[float]:
     """
     Obtiene el embedding para un texto usando OpenAI.
+    
+    Los embeddings de consultas recientes se guardan en memoria, de modo que el
+    enrutador y la recuperación no calculan dos veces el de la misma pregunta.
     """
-    response = client.embeddings.create(
+    return list(_cached_embedding(text))
+
+@lru_cache(maxsize=1024)
+def _cached_embedding(text: str) -> Tuple[float, ...]:
+    response = create_embedding(
         input=[text],
         model=EMBEDDING_MODEL
     )
-    return response.data[0].embedding
+    return tuple(response.data[0].embedding)
+
+_pinecone_client = None
+_pinecone_indexes = {}
+_index_names = (0.0, [])
+_pinecone_lock = threading.Lock()
+
+def get_pinecone_client():
+    """
+    Devuelve el cliente de Pinecone compartido por el proceso.
+    """
+    global _pinecone_client
+    with _pinecone_lock:
+        if _pinecone_client is None:
+            print(f"get_pinecone_client: Inicializando Pinecone con API_KEY={PINECONE_API_KEY[:4]}... y ENVIRONMENT={PINECONE_ENVIRONMENT}")
+            _pinecone_client = pinecone.Pinecone(api_key=PINECONE_API_KEY)
+        return _pinecone_client
+
+def list_index_names(max_age: float = PINECONE_INDEX_CACHE_TTL) -> List[str]:
+    """
+    Lista los índices de Pinecone, reutilizando la respuesta durante `max_age` segundos.
+    """
+    global _index_names
+    checked_at, names = _index_names
+    if time.time() - checked_at < max_age:
+        return names
+    names = [index.name for index in get_pinecone_client().list_indexes()]
+    print(f"list_index_names: Índices existentes: {names}")
+    _index_names = (time.time(), names)
+    return names
 
 def initialize_pinecone(index_name):
     """
     Inicializa la conexión con Pinecone para un índice específico.
+    
+    El cliente, la lista de índices y el objeto Index se reutilizan entre consultas.
     """
     try:
-        print(f"initialize_pinecone: Inicializando Pinecone con API_KEY={PINECONE_API_KEY[:4]}... y ENVIRONMENT={PINECONE_ENVIRONMENT}")
-        pc = pinecone.Pinecone(api_key=PINECONE_API_KEY)
+        index = _pinecone_indexes.get(index_name)
+        if index is not None:
+            return index
         
         # Verificar si el índice existe
-        existing_indexes = [index.name for index in pc.list_indexes()]
-        print(f"initialize_pinecone: Índices existentes: {existing_indexes}")
-        
-        if index_name not in existing_indexes:
+        if index_name not in list_index_names():
             print(f"initialize_pinecone: El índice {index_name} no existe.")
             return None
         
         print(f"initialize_pinecone: Conectando al índice {index_name}")
-        return pc.Index(index_name)
+        index = get_pinecone_client().Index(index_name)
+        with _pinecone_lock:
+            _pinecone_indexes[index_name] = index
+        return index
     except Exception as e:
         print(f"Error al inicializar Pinecone: {str(e)}")
         import traceback
         traceback.print_exc()
         return None
 
+@traced()
 def query_pinecone(query: str, index_name=RENTA_INDEX_NAME, namespace=RENTA_NAMESPACE, top_k: int = TOP_K):
     """
     Consulta Pinecone para obtener documentos relevantes.
     """
     print(f"query_pinecone: Consultando Pinecone para: '{query}' en índice {index_name}, namespace {namespace}")
+    set_attribute("index", index_name)
+    set_attribute("namespace", namespace)
+    set_attribute("top_k", top_k)
     # Inicializar Pinecone
     index = initialize_pinecone(index_name)
     if not index:
@@ -193,12 +257,15 @@ def query_pinecone(query: str, index_name=RENTA_INDEX_NAME, namespace=RENTA_NAME
                 metadata={
                     'source': source,
                     'score': match.score,
-                    'page': match.metadata.get('page', 0)
+                    'page': match.metadata.get('page', 0),
+                    # Ubicación en el documento (Libro > Título > Capítulo > Art.), si la ingesta la registró
+                    **({'jerarquia': match.metadata['jerarquia']} if match.metadata.get('jerarquia') else {})
                 }
             )
             documents.append(doc)
         
         print(f"query_pinecone: Documentos convertidos: {len(documents)}")
+        set_attribute("documents", len(documents))
         return documents
     except Exception as e:
         print(f"Error al consultar Pinecone: {str(e)}")
@@ -450,7 +517,7 @@ class MultiRetriever:
         
         # Usar Chroma para otros temas (por defecto IVA)
         print(f"MultiRetriever: Usando Chroma para consultas de '{topic if topic else 'IVA'}'")
-        docs = chroma_retriever.invoke(query)
+        docs = get_chroma_retriever().invoke(query)
         print(f"MultiRetriever: Recuperados {len(docs)} documentos de Chroma")
         return docs
 
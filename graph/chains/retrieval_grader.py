@@ -1,9 +1,22 @@
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import List
+
+from langchain_core.documents import Document
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.pydantic_v1 import BaseModel, Field
+from langchain_core.runnables import Runnable
 from langchain_openai import ChatOpenAI
 
-llm = ChatOpenAI(temperature=0)
+from graph.chains.openai_client import rate_limited
+from graph.tracing import traced
 
+# Modo de evaluación de documentos: "sequential" (uno por uno), "concurrent"
+# (una llamada por documento en paralelo) o "batch" (una sola llamada para todos)
+GRADING_MODE = os.environ.get("GRADING_MODE", "concurrent")
+GRADING_MAX_WORKERS = int(os.environ.get("GRADING_MAX_WORKERS", 4))
 
 class GradeDocuments(BaseModel):
     """Binary score for relevance check on retrieved documents."""
@@ -13,7 +26,13 @@ class GradeDocuments(BaseModel):
     )
 
 
-structured_llm_grader = llm.with_structured_output(GradeDocuments)
+class GradeDocumentsBatch(BaseModel):
+    """Binary relevance scores for a numbered list of retrieved documents."""
+
+    binary_scores: List[str] = Field(
+        description="One 'yes' or 'no' per document, in the same order as the documents"
+    )
+
 
 system = """You are a grader assessing relevance of a retrieved document to a user question. \n 
     If the document contains keyword(s) or semantic meaning related to the question, grade it as relevant. \n
@@ -25,4 +44,98 @@ grade_prompt = ChatPromptTemplate.from_messages(
     ]
 )
 
-retrieval_grader = grade_prompt | structured_llm_grader
+batch_system = """You are a grader assessing relevance of each retrieved document to a user question. \n 
+    If a document contains keyword(s) or semantic meaning related to the question, grade it as relevant. \n
+    Return exactly one binary score 'yes' or 'no' per document, in the same order as the documents."""
+batch_grade_prompt = ChatPromptTemplate.from_messages(
+    [
+        ("system", batch_system),
+        ("human", "Retrieved documents: \n\n {documents} \n\n User question: {question}"),
+    ]
+)
+
+
+
+@lru_cache(maxsize=None)
+def _get_llm() -> ChatOpenAI:
+    return ChatOpenAI(temperature=0, max_retries=0)
+
+
+@lru_cache(maxsize=None)
+def get_retrieval_grader() -> Runnable:
+    """
+    Crea el evaluador de relevancia (un documento por llamada) en el primer uso.
+    """
+    llm = _get_llm()
+    return rate_limited(grade_prompt | llm.with_structured_output(GradeDocuments), llm.model_name)
+
+
+@lru_cache(maxsize=None)
+def get_batch_retrieval_grader() -> Runnable:
+    """
+    Crea el evaluador de relevancia por lotes (todos los documentos en una llamada).
+    """
+    llm = _get_llm()
+    return rate_limited(
+        batch_grade_prompt | llm.with_structured_output(GradeDocumentsBatch), llm.model_name, output_tokens=20
+    )
+
+
+def __getattr__(name):
+    # Compatibilidad con `from graph.chains.retrieval_grader import retrieval_grader`
+    if name == "retrieval_grader":
+        return get_retrieval_grader()
+    if name == "batch_retrieval_grader":
+        return get_batch_retrieval_grader()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _grade_one(question: str, document: Document) -> str:
+    score = get_retrieval_grader().invoke({"question": question, "document": document.page_content})
+    return score.binary_score
+
+
+def _grade_batch(question: str, documents: List[Document]) -> List[str]:
+    numbered = "\n\n".join(
+        f"Document {i+1}:\n{doc.page_content}" for i, doc in enumerate(documents)
+    )
+    result = get_batch_retrieval_grader().invoke({"question": question, "documents": numbered})
+    return result.binary_scores
+
+
+@traced()
+def grade_relevance(question: str, documents: List[Document], mode: str = None) -> List[str]:
+    """
+    Evalúa la relevancia de cada documento para la pregunta.
+
+    Args:
+        question: La pregunta del usuario
+        documents: Documentos a evaluar
+        mode: "sequential", "concurrent" o "batch" (por defecto GRADING_MODE)
+
+    Returns:
+        Lista con 'yes' o 'no' para cada documento, en el mismo orden
+    """
+    mode = mode or GRADING_MODE
+    if not documents:
+        return []
+
+    if mode == "batch":
+        grades = _grade_batch(question, documents)
+        if len(grades) == len(documents):
+            return grades
+        print(f"grade_relevance: El evaluador por lotes devolvió {len(grades)} notas para "
+              f"{len(documents)} documentos, se evalúa documento por documento")
+        mode = "concurrent"
+
+    if mode == "concurrent":
+        workers = min(GRADING_MAX_WORKERS, len(documents))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # Copiar el contexto para conservar la prioridad del limitador en cada hilo
+            futures = [
+                executor.submit(contextvars.copy_context().run, _grade_one, question, doc)
+                for doc in documents
+            ]
+            return [future.result() for future in futures]
+
+    return [_grade_one(question, doc) for doc in documents]
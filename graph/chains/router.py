@@ -1,9 +1,13 @@
+from functools import lru_cache
 from typing import Literal
 
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.pydantic_v1 import BaseModel, Field
+from langchain_core.runnables import Runnable
 from langchain_openai import ChatOpenAI
 
+from graph.chains.openai_client import rate_limited
+
 
 class RouteQuery(BaseModel):
     """Route a user query to the most relevant datasource."""
@@ -14,9 +18,6 @@ class RouteQuery(BaseModel):
     )
 
 
-llm = ChatOpenAI(temperature=0)
-structured_llm_router = llm.with_structured_output(RouteQuery)
-
 system = """You are an expert at routing a user question to a vectorstore or web search.
 The vectorstore contains legal documents related to laws, regulations, and legal procedures.
 Use the vectorstore for questions on legal topics. For all else, use web-search."""
@@ -27,4 +28,20 @@ route_prompt = ChatPromptTemplate.from_messages(
     ]
 )
 
-question_router = route_prompt | structured_llm_router
+
+
+@lru_cache(maxsize=None)
+def get_question_router() -> Runnable:
+    """
+    Crea el enrutador LLM la primera vez que se usa.
+    """
+    llm = ChatOpenAI(temperature=0, max_retries=0)
+    structured_llm_router = llm.with_structured_output(RouteQuery)
+    return rate_limited(route_prompt | structured_llm_router, llm.model_name)
+
+
+def __getattr__(name):
+    # Compatibilidad con `from graph.chains.router import question_router`
+    if name == "question_router":
+        return get_question_router()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
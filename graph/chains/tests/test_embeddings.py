@@ -0,0 +1,31 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+openai = pytest.importorskip("openai")
+
+from graph.chains.embeddings import EmbeddingService, pack_requests
+from graph.chains.fake_openai import FakeOpenAI
+from graph.rate_limit import PRIORITY_BATCH, RateLimiter, request_priority
+
+
+def test_pack_requests_respects_input_and_token_limits() -> None:
+    assert pack_requests([1] * 10, max_inputs=4, max_tokens=100) == [(0, 4), (4, 8), (8, 10)]
+    assert pack_requests([40, 40, 40, 200, 10], max_inputs=10, max_tokens=100) == [(0, 2), (2, 3), (3, 4), (4, 5)]
+    assert pack_requests([], max_inputs=4, max_tokens=100) == []
+
+
+def test_embed_returns_float32_matrix_in_order() -> None:
+    texts = [f"texto {i}" for i in range(100)]
+    with FakeOpenAI(dimensions=8, latency=0.05) as server:
+        client = openai.OpenAI(api_key="test", base_url=server.url, max_retries=0)
+        service = EmbeddingService("modelo", client=client, min_inputs=10, concurrency=4,
+                                   limiter=RateLimiter("test-embeddings", 60000, 10_000_000))
+        with request_priority(PRIORITY_BATCH):
+            matrix = service.embed(texts)
+        service.close()
+
+    assert matrix.dtype == np.float32 and matrix.shape == (100, 8)
+    assert np.array_equal(matrix[37], server.vector("texto 37"))
+    assert server.requests == [25, 25, 25, 25]
+    assert server.max_concurrent > 1
+    assert service.stats["requests"] == 4
@@ -0,0 +1,66 @@
+import importlib
+import threading
+
+import pytest
+from langchain_core.documents import Document
+
+from graph.chains import retrieval_grader
+from graph.chains.retrieval_grader import grade_relevance
+
+# graph.nodes.grade_documents es también el nombre del nodo que exporta graph.nodes
+grade_documents = importlib.import_module("graph.nodes.grade_documents")
+
+DOCUMENTS = [Document(page_content=text) for text in ("tarifa renta", "receta ajiaco", "renta exenta")]
+
+
+@pytest.fixture
+def graders(monkeypatch):
+    calls = {"one": [], "batch": 0, "threads": set()}
+
+    def grade_one(question, document):
+        calls["one"].append(document.page_content)
+        calls["threads"].add(threading.get_ident())
+        return "yes" if "renta" in document.page_content else "no"
+
+    def grade_batch(question, documents):
+        calls["batch"] += 1
+        return calls.get("batch_grades") or [grade_one(question, doc) for doc in documents]
+
+    monkeypatch.setattr(retrieval_grader, "_grade_one", grade_one)
+    monkeypatch.setattr(retrieval_grader, "_grade_batch", grade_batch)
+    return calls
+
+
+@pytest.mark.parametrize("mode", ["sequential", "concurrent", "batch"])
+def test_every_mode_returns_grades_in_order(graders, mode) -> None:
+    assert grade_relevance("¿Tarifa de renta?", DOCUMENTS, mode=mode) == ["yes", "no", "yes"]
+    assert grade_relevance("¿Tarifa de renta?", [], mode=mode) == []
+
+
+def test_sequential_and_batch_calls(graders) -> None:
+    grade_relevance("¿Tarifa?", DOCUMENTS, mode="sequential")
+    assert graders["one"] == ["tarifa renta", "receta ajiaco", "renta exenta"]
+    assert graders["threads"] == {threading.get_ident()}
+
+    graders["one"].clear()
+    graders["batch_grades"] = ["yes", "no", "no"]
+    assert grade_relevance("¿Tarifa?", DOCUMENTS, mode="batch") == ["yes", "no", "no"]
+    assert graders["batch"] == 1 and graders["one"] == []
+
+
+def test_batch_falls_back_to_concurrent_on_wrong_count(graders) -> None:
+    graders["batch_grades"] = ["yes", "no"]
+    assert grade_relevance("¿Tarifa?", DOCUMENTS, mode="batch") == ["yes", "no", "yes"]
+    assert graders["batch"] == 1
+    assert sorted(graders["one"]) == sorted(doc.page_content for doc in DOCUMENTS)
+    assert threading.get_ident() not in graders["threads"]
+
+
+@pytest.mark.parametrize("mode", ["sequential", "concurrent", "batch"])
+def test_grade_documents_node_filters_in_every_mode(graders, monkeypatch, mode) -> None:
+    monkeypatch.setattr(retrieval_grader, "GRADING_MODE", mode)
+    monkeypatch.setattr(grade_documents, "SPECULATIVE_WEB_SEARCH", False)
+
+    result = grade_documents.grade_documents({"question": "¿Tarifa de renta?", "documents": list(DOCUMENTS)})
+    assert [doc.page_content for doc in result["documents"]] == ["tarifa renta", "renta exenta"]
+    assert result["web_search"] is True
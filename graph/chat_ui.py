@@ -0,0 +1,215 @@
+"""
+Ayudas de interfaz para el historial de chat de las páginas de Streamlit.
+
+Cada mensaje del historial se dibuja en su propio fragmento (st.fragment), de modo
+que sus controles (mostrar fuentes, ver más) solo vuelven a ejecutar ese mensaje.
+El HTML con las citas se calcula una vez por mensaje y se guarda en él, las fuentes
+se muestran por páginas y solo los mensajes más recientes se dibujan completos.
+
+Las consultas se envían a la cola de trabajos (graph.jobs) y la página consulta su
+estado cada JOB_POLL_INTERVAL segundos desde un fragmento; el id del trabajo se
+guarda también en la URL para recoger la respuesta tras recargar la página.
+
+Configuración por variables de entorno:
+    HISTORY_PAGE_SIZE: mensajes recientes que se dibujan (por defecto 20)
+    SOURCES_PAGE_SIZE: fuentes que se muestran por página (por defecto 4)
+    JOB_POLL_INTERVAL: segundos entre consultas del estado de un trabajo (por defecto 1)
+"""
+
+import os
+import uuid
+from typing import Any, Callable, Dict, List, Tuple
+
+import streamlit as st
+from langchain_core.documents import Document
+
+from graph.conversation import chunk_cache, compact_history, rehydrate_documents
+from graph.jobs import CANCELLED, DONE, QUEUED, Job, JobLimitError, get_job_queue, run_topic_query
+
+HISTORY_PAGE_SIZE = int(os.environ.get("HISTORY_PAGE_SIZE", 20))
+SOURCES_PAGE_SIZE = int(os.environ.get("SOURCES_PAGE_SIZE", 4))
+JOB_POLL_INTERVAL = float(os.environ.get("JOB_POLL_INTERVAL", 1))
+
+
+def prepare_history(messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Compacta el historial de la sesión, aplica su tope de memoria y muestra el uso
+    en la barra lateral.
+    """
+    stats = compact_history(messages)
+    cache = chunk_cache.snapshot()
+    st.sidebar.caption(
+        f"Historial: {stats['messages']} mensajes, {stats['bytes'] / 1024:.0f} KB "
+        f"de {stats['max_bytes'] / 1024:.0f} KB · fragmentos en caché: {cache['chunks']} "
+        f"({cache['bytes'] / 1024 / 1024:.1f} MB)"
+    )
+    if stats["trimmed"]:
+        st.sidebar.caption(f"Se descartaron {stats['trimmed']} mensajes antiguos por el tope de memoria.")
+    return stats
+
+
+def cached_html(message: Dict[str, Any], formatter: Callable[[str, List[Dict[str, Any]]], str]) -> str:
+    """
+    Devuelve el texto del mensaje con las citas en HTML, calculado una sola vez.
+    """
+    if "html" not in message:
+        message["html"] = formatter(message["content"], message["citations"])
+    return message["html"]
+
+
+def visible_history(messages: List[Dict[str, Any]], key: str) -> List[Dict[str, Any]]:
+    """
+    Devuelve los mensajes que se deben dibujar: los HISTORY_PAGE_SIZE más recientes,
+    ampliables con un botón para ver los anteriores.
+    """
+    state_key = f"historial-visible-{key}"
+    limit = st.session_state.get(state_key, HISTORY_PAGE_SIZE)
+    hidden = len(messages) - limit
+    if hidden > 0:
+        if st.button(f"Mostrar {min(hidden, HISTORY_PAGE_SIZE)} mensajes anteriores", key=f"{state_key}-boton"):
+            st.session_state[state_key] = limit + HISTORY_PAGE_SIZE
+            st.rerun()
+        return messages[-limit:]
+    return messages
+
+
+def lazy_sources(message: Dict[str, Any]) -> List[Tuple[int, Document]]:
+    """
+    Devuelve (posición, documento) de las fuentes del mensaje solo si el usuario
+    activa "Mostrar fuentes", de SOURCES_PAGE_SIZE en SOURCES_PAGE_SIZE; mientras
+    tanto no se recupera ni se dibuja el texto de los fragmentos.
+
+    Debe llamarse dentro del fragmento del mensaje para que los controles no
+    vuelvan a ejecutar toda la página.
+    """
+    message_key = message.get("id", id(message))
+    count = len(message.get("sources") or message.get("documents") or [])
+    if not st.toggle(f"Mostrar {count} fuentes", key=f"fuentes-{message_key}"):
+        return []
+
+    page_key = f"fuentes-pagina-{message_key}"
+    shown = st.session_state.get(page_key, SOURCES_PAGE_SIZE)
+    documents = rehydrate_documents(message)
+    if shown < len(documents):
+        def show_more():
+            st.session_state[page_key] = shown + SOURCES_PAGE_SIZE
+
+        st.button(
+            f"Ver {min(SOURCES_PAGE_SIZE, len(documents) - shown)} fuentes más",
+            key=f"{page_key}-boton",
+            on_click=show_more,
+        )
+    return list(enumerate(documents[:shown]))
+
+
+def session_user() -> str:
+    """
+    Identificador del usuario para los límites de la cola de trabajos. Se guarda en
+    la URL para conservarlo si el usuario recarga la página.
+    """
+    user = st.query_params.get("usuario") or st.session_state.get("usuario") or uuid.uuid4().hex[:12]
+    st.session_state["usuario"] = user
+    if st.query_params.get("usuario") != user:
+        st.query_params["usuario"] = user
+    return user
+
+
+def submit_query(messages: List[Dict[str, Any]], key: str, topic: str, query: str):
+    """
+    Agrega la consulta al historial y la envía a la cola de trabajos del tema, junto
+    con la pregunta anterior para reconocer las preguntas de seguimiento.
+    """
+    previous_question = next(
+        (message["content"] for message in reversed(messages) if message["role"] == "user"), None
+    )
+    messages.append({"role": "user", "content": query})
+    try:
+        job = get_job_queue().submit(
+            session_user(), run_topic_query, query, topic, previous_question=previous_question, label=topic
+        )
+    except JobLimitError as e:
+        messages.append({"role": "assistant", "content": f"No se pudo enviar la consulta: {e}"})
+        st.rerun()
+    st.session_state[f"trabajo-{key}"] = job.id
+    st.query_params["consulta"] = job.id
+    st.rerun()
+
+
+def _job_flow(job: Job) -> str:
+    steps = [f"🔄 Consulta sobre {job.label} en cola de procesamiento", *job.progress]
+    if job.status == DONE and job.result.get("followup"):
+        steps.append(f"🔗 Interpretada como: {job.result['question']}")
+    if job.status == DONE:
+        timings = job.result.get("timings", {})
+        steps.append(f"✨ Respuesta generada en {timings.get('total', job.elapsed()):.1f} s")
+    return "\n".join(f"- {step}" for step in steps)
+
+
+def _job_message(job: Job) -> Dict[str, Any]:
+    if job.status == DONE:
+        return {
+            "role": "assistant",
+            "content": job.result["text"],
+            "documents": job.result["documents"],
+            "citations": job.result["citations"],
+            "indices_used": job.result.get("indices_used", []),
+            "flow": _job_flow(job),
+        }
+    if job.status == CANCELLED:
+        content = "Consulta cancelada."
+    else:
+        content = f"Lo siento, ocurrió un error al procesar tu consulta: {job.error}"
+    return {"role": "assistant", "content": content, "flow": _job_flow(job)}
+
+
+def _forget_job(key: str):
+    st.session_state.pop(f"trabajo-{key}", None)
+    if "consulta" in st.query_params:
+        del st.query_params["consulta"]
+
+
+def pending_query(messages: List[Dict[str, Any]], key: str, topic: str):
+    """
+    Muestra la consulta en curso de la sesión (posición en la cola, progreso y botón
+    para cancelar) y, al terminar, agrega la respuesta al historial.
+    """
+    job_id = st.session_state.get(f"trabajo-{key}") or st.query_params.get("consulta")
+    if not job_id:
+        return
+    queue = get_job_queue()
+    job = queue.get(job_id)
+    if job is None:
+        # Trabajo ya vencido (o de antes de reiniciar el servidor)
+        _forget_job(key)
+        return
+    # El id de la URL puede ser de una consulta de otra página o de otro usuario
+    if job.label != topic or job.user != session_user():
+        return
+
+    @st.fragment(run_every=JOB_POLL_INTERVAL)
+    def mostrar_trabajo():
+        job = queue.get(job_id)
+        if job is None:
+            # El trabajo venció mientras la página lo esperaba
+            _forget_job(key)
+            st.rerun(scope="app")
+        if job.finished:
+            # Tras recargar la página el historial de la sesión ya no tiene la pregunta
+            if not messages or messages[-1].get("content") != job.args[0]:
+                messages.append({"role": "user", "content": job.args[0]})
+            messages.append(_job_message(job))
+            _forget_job(key)
+            st.rerun(scope="app")
+
+        with st.chat_message("assistant"):
+            if job.status == QUEUED:
+                position = queue.position(job.id)
+                ahead = f"{position} consultas antes que la suya" if position else "es la siguiente"
+                st.markdown(f"**En cola:** {ahead}.")
+            else:
+                st.markdown(f"**Procesando** ({job.elapsed():.0f} s):\n{_job_flow(job)}")
+            if st.button("Cancelar consulta", key=f"cancelar-{job.id}"):
+                queue.cancel(job.id)
+
+    mostrar_trabajo()
+
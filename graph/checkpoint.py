@@ -0,0 +1,324 @@
+"""
+Puntos de control por nodo para el grafo de LangGraph.
+
+Cada nodo envuelto con `checkpointed` guarda su salida bajo la clave
+(request_id, nodo, visita). Si el mismo request_id se vuelve a invocar (por ejemplo,
+al reintentar después de un error transitorio), los nodos que ya terminaron
+devuelven su salida guardada sin repetir embeddings, recuperación ni evaluaciones,
+y la ejecución continúa desde el primer nodo sin punto de control.
+
+La decisión del enrutador de entrada (`checkpointed_route`) también se guarda, de
+modo que al reanudar no se repite la llamada al LLM del enrutador y la consulta
+sigue por la misma rama.
+
+El número de visita distingue las entradas repetidas al mismo nodo dentro de una
+consulta (por ejemplo, GENERATE después de "not supported"), de modo que una nueva
+visita nunca reutiliza la salida de la anterior.
+
+Configuración por variables de entorno:
+    CHECKPOINT_STORE: "memory" (por defecto) o "sqlite"
+    CHECKPOINT_DB: ruta de la base SQLite (por defecto .checkpoints.sqlite)
+    CHECKPOINT_MAX_AGE_HOURS: retención de los puntos de control (por defecto 24)
+    CHECKPOINT_MAX_REQUESTS: máximo de consultas conservadas (por defecto 500)
+
+Para inspeccionarlos:
+    python -m graph.checkpoint                # lista las consultas guardadas
+    python -m graph.checkpoint <request_id>   # lista los nodos de una consulta
+"""
+
+import os
+import pickle
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+CHECKPOINT_STORE = os.environ.get("CHECKPOINT_STORE", "memory")
+CHECKPOINT_DB = os.environ.get("CHECKPOINT_DB", ".checkpoints.sqlite")
+CHECKPOINT_MAX_AGE_HOURS = float(os.environ.get("CHECKPOINT_MAX_AGE_HOURS", 24))
+CHECKPOINT_MAX_REQUESTS = int(os.environ.get("CHECKPOINT_MAX_REQUESTS", 500))
+
+# Cada cuántos guardados se aplica la política de retención
+PURGE_EVERY = 50
+
+# Campos que no se restauran al reanudar: el plazo se vuelve a calcular
+VOLATILE_KEYS = {"deadline"}
+
+
+def new_request_id() -> str:
+    """
+    Genera un identificador para una consulta nueva.
+    """
+    return uuid.uuid4().hex
+
+
+class MemoryCheckpointStore:
+    """
+    Puntos de control en memoria del proceso (se pierden al reiniciar).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data: Dict[tuple, Dict[str, Any]] = {}
+
+    def save(self, request_id: str, node: str, visit: int, output: Dict[str, Any]):
+        with self._lock:
+            self._data[(request_id, node, visit)] = {
+                "output": pickle.dumps(output),
+                "created_at": time.time(),
+            }
+
+    def load(self, request_id: str, node: str, visit: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._data.get((request_id, node, visit))
+        return pickle.loads(entry["output"]) if entry else None
+
+    def list(self, request_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            items = list(self._data.items())
+        rows = [
+            {
+                "request_id": key[0],
+                "node": key[1],
+                "visit": key[2],
+                "created_at": entry["created_at"],
+                "size": len(entry["output"]),
+            }
+            for key, entry in items
+            if request_id is None or key[0] == request_id
+        ]
+        return sorted(rows, key=lambda row: row["created_at"])
+
+    def delete(self, request_id: str):
+        with self._lock:
+            for key in [key for key in self._data if key[0] == request_id]:
+                del self._data[key]
+
+    def purge(self, max_age_hours: float, max_requests: int) -> int:
+        cutoff = time.time() - max_age_hours * 3600
+        with self._lock:
+            expired = [key for key, entry in self._data.items() if entry["created_at"] < cutoff]
+            for key in expired:
+                del self._data[key]
+
+            # Conservar solo las consultas más recientes
+            latest: Dict[str, float] = {}
+            for key, entry in self._data.items():
+                latest[key[0]] = max(latest.get(key[0], 0), entry["created_at"])
+            old_requests = sorted(latest, key=latest.get, reverse=True)[max_requests:]
+            removed = [key for key in self._data if key[0] in set(old_requests)]
+            for key in removed:
+                del self._data[key]
+        return len(expired) + len(removed)
+
+
+class SqliteCheckpointStore:
+    """
+    Puntos de control persistentes en SQLite, compartidos entre procesos.
+    """
+
+    def __init__(self, path: str = CHECKPOINT_DB):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS checkpoints (
+                    request_id TEXT NOT NULL,
+                    node TEXT NOT NULL,
+                    visit INTEGER NOT NULL,
+                    output BLOB NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (request_id, node, visit)
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_checkpoints_created ON checkpoints (created_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # Una conexión por hilo: los nodos pueden ejecutarse en hilos distintos
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def save(self, request_id: str, node: str, visit: int, output: Dict[str, Any]):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?)",
+                (request_id, node, visit, pickle.dumps(output), time.time()),
+            )
+
+    def load(self, request_id: str, node: str, visit: int) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute(
+            "SELECT output FROM checkpoints WHERE request_id = ? AND node = ? AND visit = ?",
+            (request_id, node, visit),
+        ).fetchone()
+        return pickle.loads(row[0]) if row else None
+
+    def list(self, request_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        query = "SELECT request_id, node, visit, created_at, length(output) FROM checkpoints"
+        params = ()
+        if request_id is not None:
+            query += " WHERE request_id = ?"
+            params = (request_id,)
+        rows = self._connect().execute(query + " ORDER BY created_at", params).fetchall()
+        return [
+            {"request_id": r[0], "node": r[1], "visit": r[2], "created_at": r[3], "size": r[4]}
+            for r in rows
+        ]
+
+    def delete(self, request_id: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM checkpoints WHERE request_id = ?", (request_id,))
+
+    def purge(self, max_age_hours: float, max_requests: int) -> int:
+        cutoff = time.time() - max_age_hours * 3600
+        with self._connect() as conn:
+            expired = conn.execute("DELETE FROM checkpoints WHERE created_at < ?", (cutoff,)).rowcount
+            removed = conn.execute(
+                """
+                DELETE FROM checkpoints WHERE request_id NOT IN (
+                    SELECT request_id FROM checkpoints
+                    GROUP BY request_id ORDER BY MAX(created_at) DESC LIMIT ?
+                )
+                """,
+                (max_requests,),
+            ).rowcount
+        return expired + removed
+
+
+_store = None
+_store_lock = threading.Lock()
+_saves = 0
+
+
+def get_checkpoint_store():
+    """
+    Devuelve el almacén configurado en CHECKPOINT_STORE (creado una sola vez).
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SqliteCheckpointStore(CHECKPOINT_DB) if CHECKPOINT_STORE == "sqlite" else MemoryCheckpointStore()
+        return _store
+
+
+def set_checkpoint_store(store):
+    """
+    Reemplaza el almacén de puntos de control (útil en pruebas).
+    """
+    global _store
+    with _store_lock:
+        _store = store
+
+
+def _maybe_purge(store):
+    global _saves
+    with _store_lock:
+        _saves += 1
+        due = _saves % PURGE_EVERY == 0
+    if due:
+        removed = store.purge(CHECKPOINT_MAX_AGE_HOURS, CHECKPOINT_MAX_REQUESTS)
+        if removed:
+            print(f"checkpoint: {removed} puntos de control eliminados por la política de retención")
+
+
+def checkpointed(node_name: str, node: Callable[[Dict[str, Any]], Dict[str, Any]]):
+    """
+    Envuelve un nodo para guardar su salida y reutilizarla al reanudar la consulta.
+
+    Solo actúa cuando el estado trae un `request_id`; sin él el nodo se ejecuta igual
+    que antes.
+    """
+
+    def wrapper(state: Dict[str, Any]) -> Dict[str, Any]:
+        request_id = state.get("request_id")
+        if not request_id:
+            return node(state)
+
+        visits = dict(state.get("node_visits") or {})
+        visit = visits.get(node_name, 0) + 1
+        visits[node_name] = visit
+
+        store = get_checkpoint_store()
+        saved = store.load(request_id, node_name, visit)
+        if saved is not None:
+            print(f"checkpoint: Reutilizando {node_name} (visita {visit}) de la consulta {request_id}")
+            output = {key: value for key, value in saved.items() if key not in VOLATILE_KEYS}
+            return {**output, "node_visits": visits}
+
+        output = node(state)
+        store.save(request_id, node_name, visit, output)
+        _maybe_purge(store)
+        return {**output, "node_visits": visits}
+
+    wrapper.__name__ = getattr(node, "__name__", node_name)
+    return wrapper
+
+
+def checkpointed_route(name: str, route: Callable[[Dict[str, Any]], str]):
+    """
+    Envuelve una función de enrutamiento (la entrada condicional del grafo) para
+    guardar su decisión y repetirla al reanudar la consulta.
+
+    La entrada del grafo se evalúa una sola vez por invocación, así que la decisión
+    se guarda siempre como la visita 1.
+    """
+
+    def wrapper(state: Dict[str, Any]) -> str:
+        request_id = state.get("request_id")
+        if not request_id:
+            return route(state)
+
+        store = get_checkpoint_store()
+        saved = store.load(request_id, name, 1)
+        if saved is not None:
+            print(f"checkpoint: Reutilizando {name} de la consulta {request_id}")
+            return saved["route"]
+
+        decision = route(state)
+        store.save(request_id, name, 1, {"route": decision})
+        _maybe_purge(store)
+        return decision
+
+    wrapper.__name__ = getattr(route, "__name__", name)
+    return wrapper
+
+
+def list_checkpoints(request_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Lista los puntos de control guardados (de todas las consultas o de una).
+    """
+    return get_checkpoint_store().list(request_id)
+
+
+def main():
+    request_id = sys.argv[1] if len(sys.argv) > 1 else None
+    rows = list_checkpoints(request_id)
+    if not rows:
+        print("No hay puntos de control guardados.")
+        return
+
+    if request_id:
+        for row in rows:
+            created = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(row["created_at"]))
+            print(f"{created}  {row['node']:<18} visita {row['visit']}  {row['size']} bytes")
+        return
+
+    summary: Dict[str, Dict[str, Any]] = {}
+    for row in rows:
+        entry = summary.setdefault(row["request_id"], {"nodes": [], "last": 0})
+        entry["nodes"].append(row["node"])
+        entry["last"] = max(entry["last"], row["created_at"])
+    for rid, entry in sorted(summary.items(), key=lambda item: item[1]["last"]):
+        last = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(entry["last"]))
+        print(f"{rid}  {last}  {len(entry['nodes'])} nodos: {' -> '.join(entry['nodes'])}")
+
+
+if __name__ == "__main__":
+    main()
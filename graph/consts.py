@@ -2,3 +2,6 @@ RETRIEVE = "retrieve"
 GRADE_DOCUMENTS = "grade_documents"
 GENERATE = "generate"
 WEBSEARCH = "websearch"
+GRADE_GENERATION = "grade_generation"
+REPAIR = "repair"
+FINALIZE = "finalize"
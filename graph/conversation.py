@@ -0,0 +1,173 @@
+"""
+Historial de conversación compacto para las páginas de Streamlit.
+
+En lugar de guardar en st.session_state la lista completa de Documents de cada
+respuesta, los mensajes guardan solo referencias (id del fragmento, puntuación,
+fuente y página). El texto de los fragmentos vive en una caché compartida por todas
+las sesiones, sin duplicados y con un tamaño máximo; se recupera solo cuando el
+usuario pide ver las fuentes.
+
+Cada sesión tiene además un tope de memoria para su historial: al superarlo se
+descartan los turnos más antiguos.
+
+Configuración por variables de entorno:
+    CHUNK_CACHE_MAX_BYTES: tamaño máximo de la caché de fragmentos (por defecto 64 MB)
+    SESSION_HISTORY_MAX_BYTES: tope del historial por sesión (por defecto 512 KB)
+"""
+
+import hashlib
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from langchain_core.documents import Document
+
+CHUNK_CACHE_MAX_BYTES = int(os.environ.get("CHUNK_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+SESSION_HISTORY_MAX_BYTES = int(os.environ.get("SESSION_HISTORY_MAX_BYTES", 512 * 1024))
+
+# Texto que se muestra si el fragmento ya salió de la caché
+EVICTED_TEXT = "(El texto de esta fuente ya no está disponible en memoria; vuelve a hacer la consulta para verlo.)"
+
+
+def chunk_id(doc: Document) -> str:
+    """
+    Identificador estable de un fragmento a partir de su fuente, página y texto.
+    """
+    digest = hashlib.sha1()
+    digest.update(str(doc.metadata.get("source", "")).encode("utf-8"))
+    digest.update(str(doc.metadata.get("page", "")).encode("utf-8"))
+    digest.update(doc.page_content.encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+class ChunkCache:
+    """
+    Caché LRU de fragmentos compartida entre sesiones, limitada por bytes.
+    """
+
+    def __init__(self, max_bytes: int = CHUNK_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._chunks: "OrderedDict[str, tuple]" = OrderedDict()
+        self.bytes = 0
+        self.stats = {"stored": 0, "deduplicated": 0, "hits": 0, "misses": 0, "evicted": 0}
+
+    @staticmethod
+    def _size(content: str, metadata: Dict[str, Any]) -> int:
+        return len(content.encode("utf-8")) + len(json.dumps(metadata, default=str))
+
+    def put(self, doc: Document) -> str:
+        key = chunk_id(doc)
+        # La puntuación depende de la consulta: se guarda en la referencia, no aquí
+        metadata = {k: v for k, v in doc.metadata.items() if k != "score"}
+        with self._lock:
+            if key in self._chunks:
+                self._chunks.move_to_end(key)
+                self.stats["deduplicated"] += 1
+                return key
+            size = self._size(doc.page_content, metadata)
+            self._chunks[key] = (doc.page_content, metadata, size)
+            self.bytes += size
+            self.stats["stored"] += 1
+            while self.bytes > self.max_bytes and len(self._chunks) > 1:
+                _, (_, _, evicted_size) = self._chunks.popitem(last=False)
+                self.bytes -= evicted_size
+                self.stats["evicted"] += 1
+        return key
+
+    def get(self, key: str) -> Optional[Document]:
+        with self._lock:
+            entry = self._chunks.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self._chunks.move_to_end(key)
+            self.stats["hits"] += 1
+            content, metadata, _ = entry
+        return Document(page_content=content, metadata=dict(metadata))
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.stats, "chunks": len(self._chunks), "bytes": self.bytes, "max_bytes": self.max_bytes}
+
+
+# Caché compartida por todas las sesiones del proceso
+chunk_cache = ChunkCache()
+
+
+def compact_message(message: Dict[str, Any], cache: ChunkCache = chunk_cache) -> Dict[str, Any]:
+    """
+    Sustituye la lista de Documents de un mensaje por referencias a la caché.
+    """
+    compact = {key: value for key, value in message.items() if key != "documents"}
+    compact.setdefault("id", uuid.uuid4().hex[:12])
+    if "documents" in message:
+        compact["sources"] = [
+            {
+                "chunk": cache.put(doc),
+                "score": doc.metadata.get("score"),
+                "source": doc.metadata.get("source"),
+                "page": doc.metadata.get("page"),
+                "source_index": doc.metadata.get("source_index"),
+            }
+            for doc in message["documents"] or []
+        ]
+    return compact
+
+
+def message_size(message: Dict[str, Any]) -> int:
+    """
+    Tamaño aproximado en bytes de un mensaje compacto.
+    """
+    return len(json.dumps(message, ensure_ascii=False, default=str).encode("utf-8"))
+
+
+def compact_history(messages: List[Dict[str, Any]], max_bytes: int = SESSION_HISTORY_MAX_BYTES,
+                    cache: ChunkCache = chunk_cache) -> Dict[str, Any]:
+    """
+    Compacta en su lugar los mensajes que aún guardan Documents y aplica el tope de
+    memoria de la sesión, descartando los turnos más antiguos.
+
+    Returns:
+        Estadísticas del historial: mensajes, bytes, tope y mensajes descartados
+    """
+    for i, message in enumerate(messages):
+        if "documents" in message or "id" not in message:
+            messages[i] = compact_message(message, cache)
+
+    sizes = [message_size(message) for message in messages]
+    total = sum(sizes)
+    trimmed = 0
+    # Conservar siempre el último turno aunque por sí solo supere el tope
+    while total > max_bytes and len(messages) > 2:
+        total -= sizes.pop(0)
+        messages.pop(0)
+        trimmed += 1
+    if trimmed:
+        print(f"compact_history: {trimmed} mensajes antiguos descartados (tope {max_bytes} bytes)")
+
+    return {"messages": len(messages), "bytes": total, "max_bytes": max_bytes, "trimmed": trimmed}
+
+
+def has_sources(message: Dict[str, Any]) -> bool:
+    return bool(message.get("sources") or message.get("documents"))
+
+
+def rehydrate_documents(message: Dict[str, Any], cache: ChunkCache = chunk_cache) -> List[Document]:
+    """
+    Reconstruye los Documents de un mensaje a partir de sus referencias.
+    """
+    if "documents" in message:
+        return message["documents"]
+
+    documents = []
+    for ref in message.get("sources", []):
+        doc = cache.get(ref["chunk"]) or Document(page_content=EVICTED_TEXT, metadata={})
+        for key in ("source", "page", "score", "source_index"):
+            if ref.get(key) is not None:
+                doc.metadata[key] = ref[key]
+        documents.append(doc)
+    return documents
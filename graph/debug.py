@@ -0,0 +1,12 @@
+# Variable global para controlar la depuración
+DEBUG = False
+
+
+def set_debug(debug_mode):
+    global DEBUG
+    DEBUG = debug_mode
+
+
+def debug_print(message):
+    if DEBUG:
+        print(message)
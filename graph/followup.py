@@ -0,0 +1,131 @@
+"""
+Contexto de conversación para preguntas de seguimiento.
+
+Después de cada respuesta se guarda el conjunto de fragmentos ya reordenados
+(reranking) de ese turno. Si la siguiente pregunta es un seguimiento ("¿Y si es
+persona natural?"), se reescribe junto con la pregunta anterior y se parte de esos
+fragmentos: solo se recuperan unos pocos nuevos con la pregunta reescrita y el
+reranking se hace sobre ese conjunto, más pequeño que el de una consulta nueva.
+
+La detección es heurística (sin llamadas al modelo): una pregunta corta que empieza
+con un conector ("y", "entonces", "pero", "en ese caso"...) o que se refiere a lo
+anterior ("eso", "dicho", "lo mismo"...) se trata como seguimiento. Los comienzos
+que también abren preguntas independientes ("aplica", "si es", "igualmente",
+"el mismo contribuyente") no cuentan: una consulta nueva tratada como seguimiento
+se respondería casi solo con los fragmentos del turno anterior.
+
+Configuración por variables de entorno:
+    FOLLOWUP_ENABLED: activa la reutilización del contexto (por defecto true)
+    FOLLOWUP_MAX_WORDS: palabras máximas de una pregunta de seguimiento (por defecto 15)
+    FOLLOWUP_EXTRA_K: fragmentos nuevos que se recuperan en un seguimiento (por defecto 4)
+    FOLLOWUP_CONTEXT_TTL: segundos que se conserva el contexto de un turno (por defecto 1800)
+    FOLLOWUP_CONTEXT_SIZE: conversaciones cuyo contexto se conserva (por defecto 500)
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, List, Optional
+
+from graph.singleflight import normalize_question
+
+FOLLOWUP_ENABLED = os.environ.get("FOLLOWUP_ENABLED", "true").lower() not in ("0", "false", "no")
+FOLLOWUP_MAX_WORDS = int(os.environ.get("FOLLOWUP_MAX_WORDS", 15))
+FOLLOWUP_EXTRA_K = int(os.environ.get("FOLLOWUP_EXTRA_K", 4))
+FOLLOWUP_CONTEXT_TTL = float(os.environ.get("FOLLOWUP_CONTEXT_TTL", 1800))
+FOLLOWUP_CONTEXT_SIZE = int(os.environ.get("FOLLOWUP_CONTEXT_SIZE", 500))
+
+# Comienzos típicos de una pregunta de seguimiento (normalizados: sin tildes ni signos)
+FOLLOWUP_PREFIXES = (
+    "y ", "e ", "entonces", "pero ", "ademas", "tambien", "en ese caso", "en tal caso", "en el mismo caso",
+    "que pasa si", "que pasaria si", "y si", "lo mismo", "y para", "y en ", "y cuando",
+    "y cual", "y como", "y que", "o si",
+)
+
+# Palabras que remiten a la respuesta anterior
+# ("esta"/"este" quedan fuera: sin tildes se confunden con el verbo "está"; "mismo" y
+# sus variantes, porque "el mismo contribuyente" también abre preguntas nuevas)
+ANAPHORA = {
+    "eso", "esto", "ese", "esa", "esos", "esas", "ello", "dicho", "dicha", "dichos", "dichas", "anterior",
+    "mencionado", "mencionada", "aquel", "aquella",
+}
+
+
+def is_followup(question: str, previous_question: Optional[str]) -> bool:
+    """
+    Indica si `question` parece un seguimiento de `previous_question`.
+    """
+    if not previous_question:
+        return False
+    text = normalize_question(question)
+    words = text.split()
+    if not words or len(words) > FOLLOWUP_MAX_WORDS:
+        return False
+    if text == normalize_question(previous_question):
+        return False
+    return text.startswith(FOLLOWUP_PREFIXES) or any(word in ANAPHORA for word in words)
+
+
+def rewrite_followup(question: str, previous_question: str) -> str:
+    """
+    Une la pregunta de seguimiento con la anterior para que se entienda sola (sirve
+    para la recuperación, el reranking y la generación).
+    """
+    previous = previous_question.strip().rstrip("?").lstrip("¿").strip()
+    return f"{previous}. Pregunta de seguimiento sobre lo anterior: {question.strip()}"
+
+
+class TurnContext:
+    """
+    Lo que se reutiliza de un turno: la pregunta (original y la usada para responder)
+    y los fragmentos después del reranking.
+    """
+
+    def __init__(self, topic: str, question: str, effective_question: str, documents: List[Any]):
+        self.topic = topic
+        self.question = question
+        self.effective_question = effective_question
+        self.documents = list(documents)
+        self.created_at = time.time()
+
+
+class ConversationContextCache:
+    """
+    Contexto del último turno de cada conversación, con vencimiento y tamaño máximo.
+    """
+
+    def __init__(self, max_size: int = FOLLOWUP_CONTEXT_SIZE, ttl: float = FOLLOWUP_CONTEXT_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._contexts: "OrderedDict[Hashable, TurnContext]" = OrderedDict()
+        self.stats = {"followups": 0, "fresh": 0}
+
+    def get(self, key: Hashable, topic: str, previous_question: Optional[str]) -> Optional[TurnContext]:
+        """
+        Contexto del turno anterior, solo si corresponde al mismo tema y a la última
+        pregunta del historial (si el usuario limpió la conversación, no se usa).
+        """
+        with self._lock:
+            context = self._contexts.get(key)
+            if context is None:
+                return None
+            if time.time() - context.created_at > self.ttl:
+                del self._contexts[key]
+                return None
+            self._contexts.move_to_end(key)
+        if context.topic != topic or context.question != previous_question:
+            return None
+        return context
+
+    def put(self, key: Hashable, context: TurnContext):
+        with self._lock:
+            self._contexts[key] = context
+            self._contexts.move_to_end(key)
+            while len(self._contexts) > self.max_size:
+                self._contexts.popitem(last=False)
+
+
+# Contexto compartido por todas las sesiones del proceso
+conversation_contexts = ConversationContextCache()
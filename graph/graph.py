@@ -2,26 +2,34 @@ from dotenv import load_dotenv
 
 from langgraph.graph import END, StateGraph
 
-from graph.chains.answer_grader import answer_grader
-from graph.chains.hallucination_grader import hallucination_grader
-from graph.chains.router import question_router, RouteQuery
-from graph.consts import RETRIEVE, GRADE_DOCUMENTS, GENERATE, WEBSEARCH
-from graph.nodes import generate, grade_documents, retrieve, web_search
+from graph.budget import REPAIR_MODE
+from graph.checkpoint import checkpointed, checkpointed_route, new_request_id
+from graph.chains.local_router import route_locally
+from graph.chains.router import get_question_router, RouteQuery
+from graph.consts import (
+    RETRIEVE,
+    GRADE_DOCUMENTS,
+    GENERATE,
+    WEBSEARCH,
+    GRADE_GENERATION,
+    REPAIR,
+    FINALIZE,
+)
+from graph.debug import debug_print
+from graph.nodes import (
+    finalize,
+    generate,
+    grade_documents,
+    grade_generation,
+    repair,
+    retrieve,
+    web_search,
+)
 from graph.state import GraphState
+from graph.tracing import span, trace_request, traced
 
 load_dotenv()
 
-# Variable global para controlar la depuración
-DEBUG = False
-
-def set_debug(debug_mode):
-    global DEBUG
-    DEBUG = debug_mode
-
-def debug_print(message):
-    if DEBUG:
-        print(message)
-
 def decide_to_generate(state):
     debug_print("---ASSESS GRADED DOCUMENTS---")
 
@@ -35,47 +43,29 @@ def decide_to_generate(state):
         return GENERATE
 
 
-def grade_generation_grounded_in_documents_and_question(state: GraphState) -> str:
-    debug_print("---CHECK HALLUCINATIONS---")
-    question = state["question"]
-    documents = state["documents"]
-    generation = state["generation"]
-
-    # Verificar si hay citas en el estado
-    if "citations" in state and state["citations"]:
-        print(f"grade_generation: Se encontraron {len(state['citations'])} citas en el estado")
-        # Imprimir las primeras citas para depuración
-        for i, citation in enumerate(state['citations'][:2]):
-            print(f"grade_generation: Cita {i+1}: {citation.get('document_title', 'Sin título')}")
-    else:
-        print("grade_generation: NO SE ENCONTRARON CITAS EN EL ESTADO")
-    
-    # Verificar si la respuesta tiene la estructura esperada
-    if "has_structure" in state and state["has_structure"]:
-        print("grade_generation: La respuesta tiene la estructura esperada")
-    else:
-        print("grade_generation: La respuesta NO tiene la estructura esperada")
-
-    # Imprimir las primeras 100 caracteres de la respuesta para depuración
-    print(f"grade_generation: Primeros 100 caracteres de la respuesta: {generation[:100]}...")
-
-    score = hallucination_grader.invoke(
-        {"documents": documents, "generation": generation}
-    )
-
-    if hallucination_grade := score.binary_score:
-        debug_print("---DECISION: GENERATION IS GROUNDED IN DOCUMENTS---")
-        debug_print("---GRADE GENERATION vs QUESTION---")
-        score = answer_grader.invoke({"question": question, "generation": generation})
-        if answer_grade := score.binary_score:
-            debug_print("---DECISION: GENERATION ADDRESSES QUESTION---")
-            return "useful"
-        else:
-            debug_print("---DECISION: GENERATION DOES NOT ADDRESS QUESTION---")
-            return "not useful"
-    else:
-        debug_print("---DECISION: GENERATION IS NOT GROUNDED IN DOCUMENTS, RE-TRY---")
-        return "not supported"
+def decide_after_grading(state: GraphState) -> str:
+    """
+    Usa la calificación del nodo grade_generation; si la respuesta no es útil y ya
+    no queda presupuesto, termina con la mejor respuesta obtenida.
+    """
+    grade = state.get("generation_grade")
+    if grade != "useful" and state.get("budget_exhausted"):
+        debug_print(f"---DECISION: BUDGET EXHAUSTED ({state['budget_exhausted']})---")
+        return "budget exhausted"
+    return grade
+
+
+def after_grading_routes(repair_mode: bool = REPAIR_MODE) -> dict:
+    """
+    Destino de cada resultado de decide_after_grading. Con repair_mode, una
+    respuesta "not supported" se repara frase por frase en lugar de regenerarse.
+    """
+    return {
+        "not supported": REPAIR if repair_mode else GENERATE,
+        "useful": END,
+        "not useful": WEBSEARCH,
+        "budget exhausted": FINALIZE,
+    }
 
 
 def route_question(state: GraphState) -> str:
@@ -91,8 +81,19 @@ def route_question(state: GraphState) -> str:
             debug_print("---ROUTE QUESTION TO RAG (RENTA)---")
             return RETRIEVE
     
+    # Enrutamiento local (embeddings y palabras clave); el LLM solo se usa
+    # cuando la decisión local no alcanza el umbral de confianza
+    datasource, method = route_locally(question)
+    if datasource is not None:
+        debug_print(f"---LOCAL ROUTER: {datasource} ({method})---")
+        if datasource == WEBSEARCH:
+            debug_print("---ROUTE QUESTION TO WEB SEARCH---")
+            return WEBSEARCH
+        debug_print("---ROUTE QUESTION TO RAG---")
+        return RETRIEVE
+
     # Comportamiento normal para otros casos
-    source: RouteQuery = question_router.invoke({"question": question})
+    source: RouteQuery = get_question_router().invoke({"question": question})
     if source.datasource == WEBSEARCH:
         debug_print("---ROUTE QUESTION TO WEB SEARCH---")
         return WEBSEARCH
@@ -101,15 +102,25 @@ def route_question(state: GraphState) -> str:
         return RETRIEVE
 
 
+def _node(name: str, func):
+    """
+    Registra un nodo con su span de trazas y su punto de control.
+    """
+    return traced(f"node.{name}")(checkpointed(name, func))
+
+
 workflow = StateGraph(GraphState)
 
-workflow.add_node(RETRIEVE, retrieve)
-workflow.add_node(GRADE_DOCUMENTS, grade_documents)
-workflow.add_node(GENERATE, generate)
-workflow.add_node(WEBSEARCH, web_search)
+workflow.add_node(RETRIEVE, _node(RETRIEVE, retrieve))
+workflow.add_node(GRADE_DOCUMENTS, _node(GRADE_DOCUMENTS, grade_documents))
+workflow.add_node(GENERATE, _node(GENERATE, generate))
+workflow.add_node(WEBSEARCH, _node(WEBSEARCH, web_search))
+workflow.add_node(GRADE_GENERATION, _node(GRADE_GENERATION, grade_generation))
+workflow.add_node(REPAIR, _node(REPAIR, repair))
+workflow.add_node(FINALIZE, _node(FINALIZE, finalize))
 
 workflow.set_conditional_entry_point(
-    route_question,
+    checkpointed_route("route_question", route_question),
     {
         WEBSEARCH: WEBSEARCH,
         RETRIEVE: RETRIEVE,
@@ -125,18 +136,31 @@ workflow.add_conditional_edges(
     },
 )
 
-workflow.add_conditional_edges(
-    GENERATE,
-    grade_generation_grounded_in_documents_and_question,
-    {
-        "not supported": GENERATE,
-        "useful": END,
-        "not useful": WEBSEARCH,
-    },
-)
+workflow.add_edge(GENERATE, GRADE_GENERATION)
+workflow.add_edge(REPAIR, GRADE_GENERATION)
+workflow.add_conditional_edges(GRADE_GENERATION, decide_after_grading, after_grading_routes())
 workflow.add_edge(WEBSEARCH, GENERATE)
-workflow.add_edge(GENERATE, END)
+workflow.add_edge(FINALIZE, END)
 
 app = workflow.compile()
 
-# app.get_graph().draw_mermaid_png(output_file_path="graph.png")
\ No newline at end of file
+
+def invoke_with_resume(state: GraphState, request_id: str = None, max_attempts: int = 2) -> GraphState:
+    """
+    Invoca el grafo con puntos de control por nodo. Si una ejecución falla, el
+    reintento con el mismo request_id reutiliza la decisión del enrutador y los
+    nodos ya completados (recuperación, evaluación de documentos, generación) y
+    continúa desde el primero que no terminó.
+    """
+    request_id = request_id or state.get("request_id") or new_request_id()
+    with trace_request(request_id):
+        for attempt in range(1, max_attempts + 1):
+            try:
+                with span("graph.invoke", attempt=attempt):
+                    return app.invoke({**state, "request_id": request_id, "node_visits": {}})
+            except Exception as e:
+                if attempt == max_attempts:
+                    raise
+                print(f"invoke_with_resume: Error en el intento {attempt} ({e}); reanudando la consulta {request_id}")
+
+# app.get_graph().draw_mermaid_png(output_file_path="graph.png")
@@ -0,0 +1,292 @@
+"""
+Cola de trabajos en segundo plano para las consultas de las páginas.
+
+Las páginas no ejecutan la recuperación, el reranking y la generación dentro del
+script de Streamlit: envían un trabajo a esta cola y consultan su estado en cada
+ejecución del script. Un grupo de hilos atiende la cola, de modo que una llamada
+lenta o bloqueada ocupa un hilo de la cola y no el del servidor, y el trabajo
+sigue en curso aunque el usuario recargue la página o cambie de página.
+
+- Cada usuario tiene un límite de trabajos en ejecución simultánea; los demás
+  esperan en la cola sin bloquear a otros usuarios.
+- position() indica cuántos trabajos hay antes en la cola.
+- cancel() retira un trabajo en espera o marca como cancelado uno en curso; el
+  trabajo en curso se detiene en la siguiente etapa: report() lanza JobCancelled
+  si el trabajo fue cancelado o superó JOB_TIMEOUT. Su lugar en el límite por
+  usuario se libera cuando el hilo realmente termina, no al cancelarlo.
+- Los trabajos terminados se conservan JOB_RESULT_TTL segundos para recoger el
+  resultado tras una reconexión.
+
+Configuración por variables de entorno:
+    JOB_WORKERS: hilos que ejecutan trabajos (por defecto 4)
+    JOB_MAX_RUNNING_PER_USER: trabajos en ejecución por usuario (por defecto 1)
+    JOB_MAX_QUEUED_PER_USER: trabajos en espera por usuario (por defecto 5)
+    JOB_TIMEOUT: segundos tras los que un trabajo en curso se da por fallido (por defecto 300)
+    JOB_RESULT_TTL: segundos que se conserva un trabajo terminado (por defecto 3600)
+"""
+
+import contextvars
+import os
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 4))
+JOB_MAX_RUNNING_PER_USER = int(os.environ.get("JOB_MAX_RUNNING_PER_USER", 1))
+JOB_MAX_QUEUED_PER_USER = int(os.environ.get("JOB_MAX_QUEUED_PER_USER", 5))
+JOB_TIMEOUT = float(os.environ.get("JOB_TIMEOUT", 300))
+JOB_RESULT_TTL = float(os.environ.get("JOB_RESULT_TTL", 3600))
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    """
+    El trabajo fue cancelado por el usuario.
+    """
+
+
+class JobLimitError(Exception):
+    """
+    El usuario ya tiene el máximo de trabajos en espera.
+    """
+
+
+class Job:
+    """
+    Un trabajo de la cola con su estado, progreso y resultado.
+    """
+
+    def __init__(self, user: str, func: Callable[..., Any], args: tuple, kwargs: Dict[str, Any], label: str):
+        self.id = uuid.uuid4().hex[:16]
+        self.user = user
+        self.label = label
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.status = QUEUED
+        self.progress: List[str] = []
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._cancel = threading.Event()
+        # El trabajo hereda el contexto de quien lo envía (prioridad, traza)
+        self.context = contextvars.copy_context()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def report(self, step: str):
+        """
+        Registra una etapa del progreso (se muestra en la página mientras espera).
+
+        Es también un punto de cancelación: el flujo lo llama entre etapas.
+        """
+        self.raise_if_cancelled()
+        self.progress.append(step)
+
+    def raise_if_cancelled(self):
+        """
+        Punto de cancelación entre etapas del trabajo.
+        """
+        if self.cancelled:
+            raise JobCancelled(self.id)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED
+
+    def elapsed(self) -> float:
+        start = self.started_at or self.created_at
+        return (self.finished_at or time.time()) - start
+
+
+class JobQueue:
+    """
+    Cola FIFO con un grupo de hilos y límite de trabajos simultáneos por usuario.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, max_running_per_user: int = JOB_MAX_RUNNING_PER_USER,
+                 max_queued_per_user: int = JOB_MAX_QUEUED_PER_USER, timeout: float = JOB_TIMEOUT,
+                 result_ttl: float = JOB_RESULT_TTL):
+        self.workers = workers
+        self.max_running_per_user = max_running_per_user
+        self.max_queued_per_user = max_queued_per_user
+        self.timeout = timeout
+        self.result_ttl = result_ttl
+        self._cond = threading.Condition()
+        self._queue: Deque[Job] = deque()
+        self._jobs: Dict[str, Job] = {}
+        self._running: Counter = Counter()
+        self._threads: List[threading.Thread] = []
+        self.stats = {"submitted": 0, "done": 0, "failed": 0, "cancelled": 0, "timed_out": 0}
+
+    def _start(self):
+        # Los hilos se crean con el primer trabajo
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._worker, name=f"job-worker-{len(self._threads)}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, user: str, func: Callable[..., Any], *args, label: str = "", **kwargs) -> Job:
+        """
+        Encola `func(job, *args, **kwargs)` a nombre de `user`.
+
+        Raises:
+            JobLimitError: si el usuario ya tiene JOB_MAX_QUEUED_PER_USER trabajos en espera
+        """
+        job = Job(user, func, args, kwargs, label)
+        with self._cond:
+            waiting = sum(1 for queued in self._queue if queued.user == user)
+            if waiting >= self.max_queued_per_user:
+                raise JobLimitError(f"Ya tiene {waiting} consultas en espera; espere a que terminen.")
+            self._purge()
+            self._jobs[job.id] = job
+            self._queue.append(job)
+            self.stats["submitted"] += 1
+            self._start()
+            self._cond.notify()
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is not None and job.status == RUNNING and job.elapsed() > self.timeout:
+                # La llamada sigue ocupando su hilo, pero la página deja de esperarla
+                self._finish(job, FAILED, error=f"La consulta superó el tiempo máximo de {self.timeout:.0f} s.")
+                job._cancel.set()
+                self.stats["timed_out"] += 1
+            return job
+
+    def position(self, job_id: str) -> Optional[int]:
+        """
+        Trabajos que hay antes en la cola (0 si es el siguiente); None si ya no está en espera.
+        """
+        with self._cond:
+            for i, job in enumerate(self._queue):
+                if job.id == job_id:
+                    return i
+        return None
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancela un trabajo en espera o en curso.
+
+        Returns:
+            False si el trabajo no existe o ya había terminado
+        """
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished:
+                return False
+            job._cancel.set()
+            if job.status == QUEUED:
+                self._queue.remove(job)
+            self._finish(job, CANCELLED)
+            self._cond.notify_all()
+            return True
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                **self.stats,
+                "queued": len(self._queue),
+                "running": sum(self._running.values()),
+                "workers": len(self._threads),
+            }
+
+    def _finish(self, job: Job, status: str, result: Any = None, error: Optional[str] = None):
+        # Se llama con self._cond tomado; el primer estado final es el que cuenta.
+        # El lugar en _running lo libera _worker cuando la función retorna
+        if job.finished:
+            return
+        job.status = status
+        job.result = result
+        job.error = error
+        job.finished_at = time.time()
+        self.stats["done" if status == DONE else status] += 1
+
+    def _purge(self):
+        limit = time.time() - self.result_ttl
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.finished and job.finished_at < limit]:
+            del self._jobs[job_id]
+
+    def _next(self) -> Optional[Job]:
+        for job in self._queue:
+            if self._running[job.user] < self.max_running_per_user:
+                return job
+        return None
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                job = self._next()
+                while job is None:
+                    self._cond.wait()
+                    job = self._next()
+                self._queue.remove(job)
+                job.status = RUNNING
+                job.started_at = time.time()
+                self._running[job.user] += 1
+
+            status, result, error = DONE, None, None
+            try:
+                result = job.context.run(job.func, job, *job.args, **job.kwargs)
+            except JobCancelled:
+                status = CANCELLED
+            except Exception as e:
+                print(f"JobQueue._worker: Error en el trabajo {job.id} ({job.label}): {e}")
+                status, error = FAILED, str(e)
+
+            with self._cond:
+                self._running[job.user] -= 1
+                self._finish(job, status, result, error)
+                self._cond.notify_all()
+
+
+_queue: Optional[JobQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """
+    Cola compartida por todas las sesiones del proceso.
+    """
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue()
+        return _queue
+
+
+def run_topic_query(job: Job, question: str, topic: str, previous_question: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Trabajo que ejecuta el flujo de consulta de un tema (ver pipeline.answer_query).
+    La conversación se identifica por el usuario y el tema del trabajo.
+    """
+    from graph.pipeline import answer_query
+
+    while True:
+        job.raise_if_cancelled()
+        try:
+            result = answer_query(
+                question, topic, progress=job.report, conversation=(job.user, topic), previous_question=previous_question
+            )
+            break
+        except JobCancelled as e:
+            # Si se unió a la misma consulta de otro trabajo y ese fue cancelado, la ejecuta por su cuenta
+            if job.cancelled or e.args[:1] == (job.id,):
+                raise
+    job.raise_if_cancelled()
+    return result
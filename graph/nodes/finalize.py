@@ -0,0 +1,13 @@
+from typing import Any, Dict
+
+from graph.state import GraphState
+
+
+def finalize(state: GraphState) -> Dict[str, Any]:
+    """
+    Ends a request whose budget ran out, returning the best generation so far.
+    """
+    print(f"---BUDGET EXHAUSTED: {state.get('budget_exhausted')}---")
+    best = state.get("best_generation") or state.get("generation", "")
+    print(f"---RETURNING BEST GENERATION SO FAR (grade: {state.get('best_grade')})---")
+    return {"generation": best}
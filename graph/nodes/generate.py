@@ -1,6 +1,8 @@
 from typing import Any, Dict
 
-from graph.chains.generation import generation_chain
+from graph.budget import ensure_budget
+from graph.chains.generation import get_generation_chain
+from graph.chains.openai_client import estimate_tokens
 from graph.state import GraphState
 
 
@@ -8,6 +10,15 @@ def generate(state: GraphState) -> Dict[str, Any]:
     print("---GENERATE---")
     question = state["question"]
     documents = state["documents"]
+    budget = ensure_budget(state)
 
-    generation = generation_chain.invoke({"context": documents, "question": question})
-    return {"documents": documents, "question": question, "generation": generation}
+    generation = get_generation_chain().invoke({"context": documents, "question": question})
+    tokens = estimate_tokens(question, documents, generation)
+    return {
+        **budget,
+        "documents": documents,
+        "question": question,
+        "generation": generation,
+        "generation_attempts": state.get("generation_attempts", 0) + 1,
+        "tokens_used": state.get("tokens_used", 0) + tokens,
+    }
@@ -1,6 +1,8 @@
+import time
 from typing import Any, Dict
 
-from graph.chains.retrieval_grader import retrieval_grader
+from graph.chains.retrieval_grader import GRADING_MODE, grade_relevance
+from graph.nodes.web_search import SPECULATIVE_WEB_SEARCH, finish_speculative_search, start_speculative_search
 from graph.state import GraphState
 
 
@@ -9,6 +11,12 @@ def grade_documents(state: GraphState) -> Dict[str, Any]:
     Determines whether the retrieved documents are relevant to the question
     If any document is not relevant, we will set a flag to run web search
 
+    The grading strategy (sequential, concurrent or a single batch call) is
+    selected with the GRADING_MODE environment variable. With SPECULATIVE_WEB_SEARCH
+    (off by default) the Tavily search starts at the same time as grading; if every
+    document is relevant its result is discarded (it stays in the web search cache)
+    and the wasted call is counted as a miss.
+
     Args:
         state (dict): The current graph state
 
@@ -20,13 +28,13 @@ def grade_documents(state: GraphState) -> Dict[str, Any]:
     question = state["question"]
     documents = state["documents"]
 
+    start_time = time.perf_counter()
+    speculative = start_speculative_search(question) if SPECULATIVE_WEB_SEARCH else None
+    grades = grade_relevance(question, documents)
+
     filtered_docs = []
     web_search = False
-    for d in documents:
-        score = retrieval_grader.invoke(
-            {"question": question, "document": d.page_content}
-        )
-        grade = score.binary_score
+    for d, grade in zip(documents, grades):
         if grade.lower() == "yes":
             print("---GRADE: DOCUMENT RELEVANT---")
             filtered_docs.append(d)
@@ -34,4 +42,11 @@ def grade_documents(state: GraphState) -> Dict[str, Any]:
             print("---GRADE: DOCUMENT NOT RELEVANT---")
             web_search = True
             continue
+
+    if speculative is not None:
+        # Si aún no empezó se cancela; si ya está en curso, solo alimenta la caché
+        finish_speculative_search(speculative, web_search)
+
+    elapsed = time.perf_counter() - start_time
+    print(f"---GRADE DOCUMENTS: {len(documents)} documents in {elapsed:.2f}s (mode={GRADING_MODE})---")
     return {"documents": filtered_docs, "question": question, "web_search": web_search}
@@ -0,0 +1,94 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict
+
+from graph.budget import budget_exhausted, update_best
+from graph.chains.answer_grader import get_answer_grader
+from graph.chains.hallucination_grader import get_hallucination_grader
+from graph.debug import debug_print
+from graph.state import GraphState
+
+# Pool compartido para lanzar en paralelo los evaluadores de la generación.
+# No se usa un pool por llamada porque al cerrarlo habría que esperar al
+# evaluador de respuesta aunque su resultado ya no se necesite.
+grader_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="graders")
+
+
+def grade_generation_grounded_in_documents_and_question(state: GraphState) -> str:
+    debug_print("---CHECK HALLUCINATIONS---")
+    question = state["question"]
+    documents = state["documents"]
+    generation = state["generation"]
+
+    # Verificar si hay citas en el estado
+    if "citations" in state and state["citations"]:
+        print(f"grade_generation: Se encontraron {len(state['citations'])} citas en el estado")
+        # Imprimir las primeras citas para depuración
+        for i, citation in enumerate(state['citations'][:2]):
+            print(f"grade_generation: Cita {i+1}: {citation.get('document_title', 'Sin título')}")
+    else:
+        print("grade_generation: NO SE ENCONTRARON CITAS EN EL ESTADO")
+    
+    # Verificar si la respuesta tiene la estructura esperada
+    if "has_structure" in state and state["has_structure"]:
+        print("grade_generation: La respuesta tiene la estructura esperada")
+    else:
+        print("grade_generation: La respuesta NO tiene la estructura esperada")
+
+    # Imprimir las primeras 100 caracteres de la respuesta para depuración
+    print(f"grade_generation: Primeros 100 caracteres de la respuesta: {generation[:100]}...")
+
+    # Lanzar ambos evaluadores a la vez; el de respuesta solo se usa si la
+    # generación está fundamentada en los documentos
+    hallucination_future = grader_executor.submit(
+        contextvars.copy_context().run,
+        get_hallucination_grader().invoke,
+        {"documents": documents, "generation": generation},
+    )
+    answer_future = grader_executor.submit(
+        contextvars.copy_context().run,
+        get_answer_grader().invoke,
+        {"question": question, "generation": generation},
+    )
+
+    score = hallucination_future.result()
+
+    if score.binary_score:
+        debug_print("---DECISION: GENERATION IS GROUNDED IN DOCUMENTS---")
+        debug_print("---GRADE GENERATION vs QUESTION---")
+        score = answer_future.result()
+        if score.binary_score:
+            debug_print("---DECISION: GENERATION ADDRESSES QUESTION---")
+            return "useful"
+        else:
+            debug_print("---DECISION: GENERATION DOES NOT ADDRESS QUESTION---")
+            return "not useful"
+    else:
+        # Cancelar el evaluador de respuesta si aún no empezó; si ya está en curso,
+        # su resultado simplemente se ignora
+        answer_future.cancel()
+        debug_print("---DECISION: GENERATION IS NOT GROUNDED IN DOCUMENTS, RE-TRY---")
+        return "not supported"
+
+
+def grade_generation(state: GraphState) -> Dict[str, Any]:
+    """
+    Grades the current generation, keeps track of the best generation so far and
+    checks the request budget (regenerations, tokens and deadline).
+    """
+    generation = state["generation"]
+
+    # Si ya se venció el plazo no vale la pena gastar llamadas en evaluar
+    exhausted = budget_exhausted(state)
+    if exhausted == "deadline":
+        return {
+            "generation_grade": None,
+            "budget_exhausted": exhausted,
+            **update_best(state, generation, None),
+        }
+
+    grade = grade_generation_grounded_in_documents_and_question(state)
+    updates = {"generation_grade": grade, **update_best(state, generation, grade)}
+    if grade != "useful":
+        updates["budget_exhausted"] = budget_exhausted(state)
+    return updates
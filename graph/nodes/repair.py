@@ -0,0 +1,30 @@
+from typing import Any, Dict
+
+from graph.chains.openai_client import estimate_tokens
+from graph.chains.repair import repair_generation
+from graph.nodes.generate import generate
+from graph.state import GraphState
+
+
+def repair(state: GraphState) -> Dict[str, Any]:
+    """
+    Repairs a generation that is not grounded in the documents by rewriting only
+    the unsupported sentences. Falls back to a full regeneration when the grader
+    cannot point to specific sentences.
+    """
+    print("---REPAIR GENERATION---")
+    documents = state["documents"]
+    generation = state["generation"]
+
+    repaired, applied = repair_generation(generation, documents)
+    if not applied:
+        print("---REPAIR: NO UNSUPPORTED SENTENCES IDENTIFIED, REGENERATING---")
+        return generate(state)
+
+    print(f"---REPAIR: {applied} SENTENCES REPLACED---")
+    tokens = estimate_tokens(documents, generation, repaired)
+    return {
+        "generation": repaired,
+        "generation_attempts": state.get("generation_attempts", 0) + 1,
+        "tokens_used": state.get("tokens_used", 0) + tokens,
+    }
@@ -1,11 +1,129 @@
-from typing import Any, Dict
+import contextvars
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Dict, List
 
 from langchain.schema import Document
-from langchain_community.tools.tavily_search import TavilySearchResults
 
+from graph.singleflight import SingleFlight, normalize_question
 from graph.state import GraphState
+from graph.tracing import set_attribute, traced
 
-web_search_tool = TavilySearchResults(k=3)
+# Búsqueda especulativa: Tavily se lanza a la vez que la evaluación de documentos.
+# Desactivada por defecto: casi nunca se alcanza a cancelar, así que cada consulta
+# paga una llamada a Tavily aunque no se use (ver speculative_stats)
+SPECULATIVE_WEB_SEARCH = os.environ.get("SPECULATIVE_WEB_SEARCH", "false").lower() in ("1", "true", "yes")
+WEB_SEARCH_CACHE_TTL = float(os.environ.get("WEB_SEARCH_CACHE_TTL", 3600))
+WEB_SEARCH_CACHE_SIZE = int(os.environ.get("WEB_SEARCH_CACHE_SIZE", 256))
+
+
+@lru_cache(maxsize=None)
+def get_web_search_tool():
+    """
+    Crea la herramienta de Tavily la primera vez que se necesita una búsqueda web.
+    """
+    from langchain_community.tools.tavily_search import TavilySearchResults
+
+    return TavilySearchResults(k=3)
+
+
+def __getattr__(name):
+    # Compatibilidad con `from graph.nodes.web_search import web_search_tool`
+    if name == "web_search_tool":
+        return get_web_search_tool()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+_cache: "OrderedDict[str, tuple]" = OrderedDict()
+_cache_lock = threading.Lock()
+# Una búsqueda especulativa en curso y el nodo web_search comparten la misma llamada
+_search_flight = SingleFlight("web_search")
+search_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="web-search")
+# Resultado de las búsquedas especulativas: usadas, desperdiciadas (ya en curso) y canceladas a tiempo
+speculative_stats = {"hit": 0, "miss": 0, "cancelled": 0}
+_stats_lock = threading.Lock()
+
+
+def _cache_get(key: str):
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is None:
+            return None
+        stored_at, results = entry
+        if time.time() - stored_at > WEB_SEARCH_CACHE_TTL:
+            del _cache[key]
+            return None
+        _cache.move_to_end(key)
+        return results
+
+
+def _cache_put(key: str, results: List[Dict[str, Any]]):
+    with _cache_lock:
+        _cache[key] = (time.time(), results)
+        _cache.move_to_end(key)
+        while len(_cache) > WEB_SEARCH_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+@traced("tavily_search")
+def search_web(question: str) -> List[Dict[str, Any]]:
+    """
+    Busca en Tavily con caché por pregunta normalizada.
+
+    Si ya hay una búsqueda en curso para la misma pregunta (por ejemplo, la
+    especulativa lanzada desde grade_documents), espera su resultado en lugar de
+    repetir la llamada.
+    """
+    key = normalize_question(question)
+    cached = _cache_get(key)
+    if cached is not None:
+        set_attribute("cache_hit", True)
+        return list(cached)
+
+    def _search():
+        results = get_web_search_tool().invoke({"query": question})
+        _cache_put(key, results)
+        return results
+
+    results, _ = _search_flight.do(key, _search)
+    return list(results)
+
+
+def start_speculative_search(question: str) -> Future:
+    """
+    Lanza la búsqueda web en segundo plano; el resultado queda en la caché aunque
+    finalmente no se use.
+    """
+    return search_executor.submit(contextvars.copy_context().run, search_web, question)
+
+
+def finish_speculative_search(future: Future, needed: bool) -> str:
+    """
+    Cierra una búsqueda especulativa según si la evaluación pidió buscar en la web.
+
+    Si no hacía falta se intenta cancelar; si ya estaba en curso, la llamada a
+    Tavily se pagó sin usarse. El resultado queda en speculative_stats y en la
+    traza para medir el costo antes de activarla.
+
+    Returns:
+        "hit", "miss" o "cancelled"
+    """
+    if needed:
+        outcome = "hit"
+    elif future.cancel():
+        outcome = "cancelled"
+    else:
+        outcome = "miss"
+    with _stats_lock:
+        speculative_stats[outcome] += 1
+        totals = ", ".join(f"{name}={count}" for name, count in speculative_stats.items())
+    set_attribute("speculative_search", outcome)
+    print(f"---SPECULATIVE WEB SEARCH: {outcome} ({totals})---")
+    return outcome
 
 
 def web_search(state: GraphState) -> Dict[str, Any]:
@@ -13,7 +131,7 @@ def web_search(state: GraphState) -> Dict[str, Any]:
     question = state["question"]
     documents = state["documents"]
 
-    docs = web_search_tool.invoke({"query": question})
+    docs = search_web(question)
     web_results = "\n".join([d["content"] for d in docs])
     web_results = Document(page_content=web_results)
     if documents is not None:
@@ -0,0 +1,228 @@
+"""
+Flujo de consulta reutilizable: recuperación -> reranking -> generación.
+
+Las páginas (incluida la Consulta General) envían sus consultas a la cola de
+trabajos (graph.jobs), que ejecuta este flujo fuera del script de Streamlit. La
+misma función se usa en el procesamiento por lotes de `batch_queries.py`.
+"""
+
+import time
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from langchain_core.documents import Document
+
+from graph.chains.openai_generation import generate_simple_response, generate_with_openai
+from graph.chains.reranking import rerank_documents
+from graph.chains.retrieval import (
+    query_aduanas,
+    query_all_indices,
+    query_analisis_ley_2277,
+    query_cambiario,
+    query_dur,
+    query_estatuto,
+    query_ica,
+    query_ica_gaitan,
+    query_iva,
+    query_ipoconsumo,
+    query_ley_crecimiento,
+    query_renta,
+    query_retencion,
+    query_temas_clave,
+    query_timbre,
+)
+from graph.followup import (
+    FOLLOWUP_ENABLED,
+    FOLLOWUP_EXTRA_K,
+    TurnContext,
+    conversation_contexts,
+    is_followup,
+    rewrite_followup,
+)
+from graph.singleflight import coalesce, normalize_question
+from graph.tracing import set_attribute, span
+
+# Configuración por tema, con los mismos valores que usa cada página:
+# - query_func: función de recuperación del índice correspondiente
+# - rerank_top_k: documentos que se conservan después del reranking
+# - generator: "structured" (generate_with_openai) o "simple" (generate_simple_response)
+TOPIC_CONFIGS: Dict[str, Dict[str, Any]] = {
+    "Renta": {"query_func": query_renta, "rerank_top_k": 12, "generator": "structured"},
+    "Timbre": {"query_func": query_timbre, "rerank_top_k": 8, "generator": "structured"},
+    "Retención": {"query_func": query_retencion, "rerank_top_k": 8, "generator": "structured"},
+    "IVA": {"query_func": query_iva, "rerank_top_k": 8, "generator": "structured"},
+    "ICA": {"query_func": query_ica, "rerank_top_k": 8, "generator": "structured"},
+    "Impuesto al Consumo": {"query_func": query_ipoconsumo, "rerank_top_k": 8, "generator": "structured"},
+    "Aduanas": {"query_func": query_aduanas, "rerank_top_k": 8, "generator": "structured"},
+    "Cambiario": {"query_func": query_cambiario, "rerank_top_k": 8, "generator": "structured"},
+    "Estatuto Tributario": {"query_func": query_estatuto, "rerank_top_k": 10, "generator": "simple"},
+    "DUR": {"query_func": query_dur, "rerank_top_k": 10, "generator": "simple"},
+    "Análisis Ley 2277": {"query_func": query_analisis_ley_2277, "rerank_top_k": 10, "generator": "simple"},
+    "Temas Clave": {"query_func": query_temas_clave, "rerank_top_k": 10, "generator": "simple"},
+    "Ley Crecimiento": {"query_func": query_ley_crecimiento, "rerank_top_k": 10, "generator": "simple"},
+    "ICA GAITÁN": {"query_func": query_ica_gaitan, "rerank_top_k": 10, "generator": "simple"},
+    "General": {"query_func": query_all_indices, "rerank_top_k": 12, "generator": "simple"},
+}
+
+NO_DOCUMENTS_MESSAGE = (
+    "Lo siento, no encontré información relevante sobre tu consulta en la base de "
+    "conocimiento de {topic}. Por favor, intenta reformular tu pregunta."
+)
+
+
+def resolve_topic(topic: str) -> str:
+    """
+    Devuelve el nombre canónico de un tema, sin distinguir mayúsculas ni espacios.
+
+    Raises:
+        ValueError: si el tema no está configurado
+    """
+    if topic is None:
+        raise ValueError("Se requiere un tema para la consulta.")
+
+    normalized = topic.strip().lower()
+    for name in TOPIC_CONFIGS:
+        if name.lower() == normalized:
+            return name
+    raise ValueError(
+        f"Tema desconocido: '{topic}'. Temas disponibles: {', '.join(TOPIC_CONFIGS)}"
+    )
+
+
+def answer_query(question: str, topic: str, progress: Optional[Callable[[str], None]] = None,
+                 conversation: Optional[Hashable] = None, previous_question: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Ejecuta el flujo completo de una consulta para un tema.
+
+    Las consultas concurrentes con el mismo tema y la misma pregunta normalizada se
+    agrupan: solo una ejecuta el flujo y las demás reciben su resultado.
+
+    Args:
+        question: La consulta del usuario
+        topic: Nombre del tema (ver TOPIC_CONFIGS)
+        progress: Función opcional que recibe la descripción de cada etapa (solo la
+            llama la consulta que ejecuta el flujo, no las que se unen a ella)
+        conversation: Clave de la conversación (usuario y tema); si se indica, se
+            guarda el contexto de este turno y se reutiliza en los seguimientos
+        previous_question: Última pregunta del historial de la conversación
+
+    Returns:
+        Dict con el texto generado, las citas, los documentos utilizados, los
+        tiempos de cada etapa en segundos, un indicador de error de generación y
+        la pregunta con la que se respondió ("question", reescrita si fue un seguimiento)
+    """
+    topic = resolve_topic(topic)
+    progress = progress or _no_progress
+    with span("answer_query", topic=topic):
+        previous = None
+        if conversation is not None and FOLLOWUP_ENABLED:
+            previous = conversation_contexts.get(conversation, topic, previous_question)
+        if previous is not None and is_followup(question, previous.question):
+            conversation_contexts.stats["followups"] += 1
+            result = _answer_followup(question, topic, previous, progress)
+        else:
+            conversation_contexts.stats["fresh"] += 1
+            key = ("answer_query", topic, normalize_question(question))
+            result = coalesce(key, lambda: _answer_query(question, topic, progress))
+
+        if conversation is not None and result["documents"]:
+            conversation_contexts.put(
+                conversation, TurnContext(topic, question, result["question"], result["documents"])
+            )
+        return result
+
+
+def _no_progress(step: str):
+    pass
+
+
+def _answer_query(question: str, topic: str, progress: Callable[[str], None]) -> Dict[str, Any]:
+    config = TOPIC_CONFIGS[topic]
+    top_k = config["rerank_top_k"]
+    timings = {}
+
+    start_time = time.perf_counter()
+
+    # Recuperar el doble de documentos para tener un mejor pool para reranking
+    progress(f"🔍 Buscando en la base de conocimiento de {topic}...")
+    stage_start = time.perf_counter()
+    initial_docs: List[Document] = config["query_func"](question, top_k=top_k * 2)
+    timings["retrieval"] = time.perf_counter() - stage_start
+
+    progress(f"🔄 Aplicando reranking a {len(initial_docs)} documentos...")
+    stage_start = time.perf_counter()
+    documents = rerank_documents(question, initial_docs, top_k=top_k)
+    timings["rerank"] = time.perf_counter() - stage_start
+
+    return _generate(question, topic, documents, timings, start_time, progress)
+
+
+def _answer_followup(question: str, topic: str, previous: TurnContext,
+                     progress: Callable[[str], None]) -> Dict[str, Any]:
+    """
+    Responde un seguimiento partiendo de los fragmentos del turno anterior: se
+    recuperan solo FOLLOWUP_EXTRA_K fragmentos nuevos con la pregunta reescrita y el
+    reranking se hace sobre ese conjunto en lugar de sobre 2 * top_k recuperados.
+    """
+    from graph.conversation import chunk_id
+
+    config = TOPIC_CONFIGS[topic]
+    top_k = config["rerank_top_k"]
+    timings = {}
+    start_time = time.perf_counter()
+
+    rewritten = rewrite_followup(question, previous.effective_question)
+    progress(f"🔗 Pregunta de seguimiento: se parte de los {len(previous.documents)} documentos de la respuesta anterior")
+    set_attribute("followup", True)
+
+    stage_start = time.perf_counter()
+    new_docs: List[Document] = config["query_func"](rewritten, top_k=FOLLOWUP_EXTRA_K) if FOLLOWUP_EXTRA_K else []
+    known = {chunk_id(doc) for doc in previous.documents}
+    added = [doc for doc in new_docs if chunk_id(doc) not in known]
+    timings["retrieval"] = time.perf_counter() - stage_start
+
+    pool = previous.documents + added
+    progress(f"🔄 Aplicando reranking a {len(pool)} documentos ({len(added)} nuevos)...")
+    stage_start = time.perf_counter()
+    documents = rerank_documents(rewritten, pool, top_k=top_k)
+    timings["rerank"] = time.perf_counter() - stage_start
+
+    result = _generate(rewritten, topic, documents, timings, start_time, progress)
+    result["followup"] = True
+    return result
+
+
+def _generate(question: str, topic: str, documents: List[Document], timings: Dict[str, float],
+              start_time: float, progress: Callable[[str], None]) -> Dict[str, Any]:
+    config = TOPIC_CONFIGS[topic]
+    if not documents:
+        timings["generation"] = 0.0
+        timings["total"] = time.perf_counter() - start_time
+        return {
+            "text": NO_DOCUMENTS_MESSAGE.format(topic=topic),
+            "citations": [],
+            "documents": [],
+            "timings": timings,
+            "question": question,
+            "error": None,
+        }
+
+    progress(f"✍️ Generando respuesta con {len(documents)} documentos relevantes...")
+    stage_start = time.perf_counter()
+    if config["generator"] == "simple":
+        response = generate_simple_response(question, documents)
+    else:
+        response = generate_with_openai(question, documents)
+    timings["generation"] = time.perf_counter() - stage_start
+    timings["total"] = time.perf_counter() - start_time
+
+    return {
+        "text": response["text"],
+        "citations": response.get("citations", []),
+        "documents": documents,
+        "timings": timings,
+        "question": question,
+        # Índices de origen de las citas (solo generate_simple_response los informa)
+        "indices_used": response.get("indices_used", []),
+        # Las funciones de generación capturan sus excepciones y devuelven raw_message=None
+        "error": None if response.get("raw_message") is not None else response["text"],
+    }
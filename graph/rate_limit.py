@@ -0,0 +1,292 @@
+"""
+Limitador de tasa compartido por todo el proceso.
+
+Implementa cubetas de tokens (token buckets) para solicitudes y tokens por minuto,
+una cola de espera con prioridades (las consultas interactivas pasan antes que las
+de lotes), backoff exponencial con jitter que respeta Retry-After y métricas de
+tiempo en cola y reintentos.
+
+No depende del SDK de OpenAI: la clasificación de errores reintentables se hace a
+partir del código de estado y del nombre de la excepción.
+"""
+
+import contextlib
+import contextvars
+import heapq
+import itertools
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BATCH = "batch"
+
+# Menor valor = mayor prioridad en la cola
+PRIORITY_ORDER = {PRIORITY_INTERACTIVE: 0, PRIORITY_BATCH: 1}
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+RETRYABLE_ERROR_NAMES = {"APIConnectionError", "APITimeoutError", "RateLimitError", "InternalServerError"}
+
+_current_priority: contextvars.ContextVar = contextvars.ContextVar(
+    "request_priority", default=PRIORITY_INTERACTIVE
+)
+
+
+def get_request_priority() -> str:
+    """
+    Devuelve la clase de prioridad del contexto actual.
+    """
+    return _current_priority.get()
+
+
+@contextlib.contextmanager
+def request_priority(priority: str):
+    """
+    Ejecuta un bloque con la clase de prioridad indicada.
+
+    Los hilos de un ThreadPoolExecutor no heredan el contexto, por lo que el bloque
+    debe abrirse dentro de la función que ejecuta cada worker.
+    """
+    if priority not in PRIORITY_ORDER:
+        raise ValueError(f"Prioridad desconocida: {priority}")
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+class TokenBucket:
+    """
+    Cubeta que se rellena de forma continua hasta `capacity` unidades por minuto.
+    """
+
+    def __init__(self, capacity_per_minute: float):
+        self.capacity = float(capacity_per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated = now
+
+    def time_until(self, amount: float) -> float:
+        """
+        Segundos que faltan para disponer de `amount` unidades (0 si ya hay).
+        """
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """
+    Limita solicitudes y tokens por minuto, atendiendo primero a las prioridades altas.
+    """
+
+    def __init__(self, name: str, requests_per_minute: float, tokens_per_minute: float):
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self._condition = threading.Condition()
+        self._waiters = []
+        self._sequence = itertools.count()
+
+    def acquire(self, estimated_tokens: int = 0, priority: Optional[str] = None) -> float:
+        """
+        Bloquea hasta que haya capacidad para una solicitud de `estimated_tokens`.
+
+        Returns:
+            Segundos que la solicitud esperó en cola
+        """
+        priority = priority or get_request_priority()
+        entry = (PRIORITY_ORDER.get(priority, len(PRIORITY_ORDER)), next(self._sequence))
+        start = time.monotonic()
+
+        with self._condition:
+            heapq.heappush(self._waiters, entry)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self.requests.refill(now)
+                    self.tokens.refill(now)
+                    if self._waiters[0] == entry:
+                        wait = max(self.requests.time_until(1), self.tokens.time_until(estimated_tokens))
+                        if wait <= 0:
+                            self.requests.tokens -= 1
+                            self.tokens.tokens -= min(estimated_tokens, self.tokens.capacity)
+                            break
+                    else:
+                        wait = None
+                    self._condition.wait(timeout=wait)
+            finally:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                self._condition.notify_all()
+
+        waited = time.monotonic() - start
+        metrics.record_wait(self.name, priority, waited)
+        return waited
+
+    def adjust(self, token_delta: int):
+        """
+        Corrige el consumo de tokens con el uso real reportado por la API.
+
+        Un delta positivo (se usaron más tokens de los estimados) puede dejar la
+        cubeta en negativo, lo que retrasa las siguientes solicitudes.
+        """
+        if not token_delta:
+            return
+        with self._condition:
+            self.tokens.tokens = min(self.tokens.capacity, self.tokens.tokens - token_delta)
+            self._condition.notify_all()
+
+
+class RateLimitMetrics:
+    """
+    Contadores de espera en cola, reintentos y errores por limitador y prioridad.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data: Dict[str, Dict[str, Any]] = {}
+
+    def _entry(self, name: str) -> Dict[str, Any]:
+        if name not in self._data:
+            self._data[name] = {
+                "requests": 0,
+                "retries": 0,
+                "rate_limit_errors": 0,
+                "failures": 0,
+                "queue_wait_total": 0.0,
+                "queue_wait_max": 0.0,
+                "by_priority": {},
+            }
+        return self._data[name]
+
+    def record_wait(self, name: str, priority: str, waited: float):
+        with self._lock:
+            entry = self._entry(name)
+            entry["requests"] += 1
+            entry["queue_wait_total"] += waited
+            entry["queue_wait_max"] = max(entry["queue_wait_max"], waited)
+            by_priority = entry["by_priority"].setdefault(priority, {"requests": 0, "queue_wait_total": 0.0})
+            by_priority["requests"] += 1
+            by_priority["queue_wait_total"] += waited
+
+    def record_retry(self, name: str, status_code: Optional[int]):
+        with self._lock:
+            entry = self._entry(name)
+            entry["retries"] += 1
+            if status_code == 429:
+                entry["rate_limit_errors"] += 1
+
+    def record_failure(self, name: str):
+        with self._lock:
+            self._entry(name)["failures"] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Copia de las métricas actuales, con la espera promedio calculada.
+        """
+        with self._lock:
+            result = {}
+            for name, entry in self._data.items():
+                copy = dict(entry)
+                copy["by_priority"] = {k: dict(v) for k, v in entry["by_priority"].items()}
+                copy["queue_wait_avg"] = entry["queue_wait_total"] / entry["requests"] if entry["requests"] else 0.0
+                result[name] = copy
+            return result
+
+    def reset(self):
+        with self._lock:
+            self._data = {}
+
+
+metrics = RateLimitMetrics()
+
+
+def get_status_code(error: Exception) -> Optional[int]:
+    """
+    Extrae el código HTTP de una excepción del SDK (si lo tiene).
+    """
+    status = getattr(error, "status_code", None)
+    if status is None:
+        response = getattr(error, "response", None)
+        status = getattr(response, "status_code", None)
+    return status
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    Indica si un error es transitorio y vale la pena reintentar.
+    """
+    if type(error).__name__ in RETRYABLE_ERROR_NAMES:
+        return True
+    return get_status_code(error) in RETRYABLE_STATUS_CODES
+
+
+def get_retry_after(error: Exception) -> Optional[float]:
+    """
+    Lee las cabeceras retry-after-ms / retry-after de la respuesta de error.
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000.0
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        return None
+    return None
+
+
+def backoff_delay(attempt: int, base: float = 1.0, maximum: float = 60.0, retry_after: Optional[float] = None) -> float:
+    """
+    Espera antes del reintento `attempt` (empezando en 0): backoff exponencial con
+    jitter completo, nunca menor que el Retry-After indicado por el servidor.
+    """
+    delay = random.uniform(0, min(maximum, base * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return min(delay, maximum)
+
+
+def call_with_retry(
+    func: Callable[[], Any],
+    limiter: RateLimiter,
+    estimated_tokens: int = 0,
+    max_retries: int = 5,
+    base_delay: float = 1.0,
+    max_delay: float = 60.0,
+    sleep: Callable[[float], None] = time.sleep,
+) -> Any:
+    """
+    Ejecuta `func` respetando el limitador y reintentando los errores transitorios.
+
+    Cada intento (incluidos los reintentos) vuelve a pasar por el limitador.
+    """
+    attempt = 0
+    while True:
+        limiter.acquire(estimated_tokens)
+        try:
+            return func()
+        except Exception as e:
+            if not is_retryable(e) or attempt >= max_retries:
+                metrics.record_failure(limiter.name)
+                raise
+            status_code = get_status_code(e)
+            metrics.record_retry(limiter.name, status_code)
+            delay = backoff_delay(attempt, base=base_delay, maximum=max_delay, retry_after=get_retry_after(e))
+            print(f"rate_limit: {limiter.name} error transitorio ({type(e).__name__}, status={status_code}), "
+                  f"reintento {attempt+1}/{max_retries} en {delay:.1f}s")
+            sleep(delay)
+            attempt += 1
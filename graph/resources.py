@@ -0,0 +1,76 @@
+"""
+Recursos compartidos por las páginas de Streamlit.
+
+Streamlit vuelve a ejecutar el script de la página con cada mensaje o clic. Los
+clientes (Pinecone, OpenAI) se crean una sola vez por proceso del servidor con
+st.cache_resource, y el estado de los índices de Pinecone se consulta como máximo
+una vez por intervalo con st.cache_data en lugar de llamar a list_indexes() en cada
+rerun.
+
+Las páginas no usan el grafo de LangGraph ni el retriever de Chroma: las consultas
+pasan por la cola de trabajos (graph.jobs) y graph.pipeline, que consultan
+Pinecone con los clientes de este módulo.
+
+Configuración por variables de entorno:
+    INDEX_HEALTH_TTL: segundos entre comprobaciones de los índices (por defecto 300)
+"""
+
+import os
+import time
+from typing import Any, Dict
+
+import streamlit as st
+
+INDEX_HEALTH_TTL = int(os.environ.get("INDEX_HEALTH_TTL", 300))
+
+
+@st.cache_resource(show_spinner=False)
+def get_pinecone_client():
+    """
+    Cliente de Pinecone del proceso (el mismo que usa graph.chains.retrieval).
+    """
+    from graph.chains.retrieval import get_pinecone_client as _get_pinecone_client
+
+    return _get_pinecone_client()
+
+
+@st.cache_resource(show_spinner=False)
+def get_openai_client():
+    """
+    Cliente de OpenAI del proceso, con los límites de tasa compartidos.
+    """
+    from graph.chains.openai_client import get_openai_client as _get_openai_client
+
+    return _get_openai_client()
+
+
+@st.cache_data(ttl=INDEX_HEALTH_TTL, show_spinner=False)
+def get_index_health() -> Dict[str, Any]:
+    """
+    Estado de Pinecone: índices disponibles y momento de la comprobación.
+
+    Se guarda en caché durante INDEX_HEALTH_TTL segundos para todas las sesiones.
+    Los errores de conexión no se guardan: se propagan y el siguiente rerun vuelve
+    a intentarlo.
+    """
+    from graph.chains.retrieval import list_index_names
+
+    return {"indexes": list_index_names(max_age=0), "checked_at": time.time()}
+
+
+def index_available(index_name: str) -> bool:
+    """
+    Indica si el índice existe según el último estado guardado en caché.
+    """
+    return index_name in get_index_health()["indexes"]
+
+
+def load_resources():
+    """
+    Crea (o recupera de la caché) los clientes que usan todas las páginas. Debe
+    llamarse después de st.set_page_config.
+    """
+    # Sin API key las páginas muestran su propia advertencia
+    if os.environ.get("PINECONE_API_KEY"):
+        get_pinecone_client()
+    get_openai_client()
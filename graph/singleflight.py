@@ -0,0 +1,102 @@
+"""
+Agrupación de consultas idénticas en curso (patrón "singleflight").
+
+Cuando varias sesiones de Streamlit hacen la misma pregunta al mismo tiempo, solo la
+primera ejecuta el trabajo (embedding, reranking, generación); las demás esperan y
+reciben el mismo resultado. No es una caché: en cuanto la llamada termina, la clave
+se libera y la siguiente consulta vuelve a ejecutarse.
+"""
+
+import copy
+import re
+import threading
+import unicodedata
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+
+def normalize_question(question: str) -> str:
+    """
+    Normaliza una pregunta para comparar consultas casi idénticas: minúsculas, sin
+    tildes, sin signos de puntuación y con los espacios colapsados.
+    """
+    text = unicodedata.normalize("NFKD", question or "")
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    text = re.sub(r"[^\w\s]", " ", text.lower())
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+
+class SingleFlight:
+    """
+    Ejecuta como máximo una llamada en curso por clave y comparte su resultado.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.stats = {"executed": 0, "shared": 0}
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Ejecuta `func` o se une a la ejecución en curso con la misma clave.
+
+        Returns:
+            Tupla (resultado, compartido). Si la llamada original lanza una excepción,
+            se propaga a todas las sesiones que esperaban.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self.stats["executed"] += 1
+            else:
+                call.followers += 1
+                self.stats["shared"] += 1
+
+        if not leader:
+            print(f"singleflight: {self.name} se une a una consulta idéntica en curso")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            # Copia superficial para que cada sesión pueda modificar su lista/dict
+            return copy.copy(call.result), True
+
+        try:
+            call.result = func()
+            return call.result, False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self) -> int:
+        """
+        Número de claves con una llamada en curso.
+        """
+        with self._lock:
+            return len(self._calls)
+
+
+# Instancia compartida por el flujo de consulta (recuperación, reranking y generación)
+pipeline_flight = SingleFlight("pipeline")
+
+
+def coalesce(key: Hashable, func: Callable[[], Any]) -> Any:
+    """
+    Atajo para pipeline_flight.do que devuelve solo el resultado.
+    """
+    result, _ = pipeline_flight.do(key, func)
+    return result
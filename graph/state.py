@@ -12,6 +12,17 @@ class GraphState(TypedDict, total=False):
         documents: list of documents
         citations: optional list of citations from Claude
         topic: optional topic for the query (e.g., "IVA", "Renta")
+        generation_grade: grade of the current generation ("useful", "not useful", "not supported")
+        generation_attempts: number of generations/repairs made for this request
+        max_regenerations: maximum number of regenerations after the first generation
+        tokens_used: estimated tokens spent on generation
+        token_budget: maximum estimated tokens for generation
+        deadline: wall-clock deadline (epoch seconds) for the request
+        best_generation: best generation so far, returned when the budget runs out
+        best_grade: grade of best_generation
+        budget_exhausted: which budget ran out ("deadline", "regenerations", "tokens")
+        request_id: id under which node checkpoints are saved (see graph/checkpoint.py)
+        node_visits: number of times each node has run in this invocation
     """
 
     question: str
@@ -20,3 +31,14 @@ class GraphState(TypedDict, total=False):
     documents: List[str]
     citations: Optional[List[Dict[str, Any]]]
     topic: Optional[str]
+    generation_grade: Optional[str]
+    generation_attempts: int
+    max_regenerations: int
+    tokens_used: int
+    token_budget: int
+    deadline: float
+    best_generation: str
+    best_grade: Optional[str]
+    budget_exhausted: Optional[str]
+    request_id: Optional[str]
+    node_visits: Dict[str, int]
@@ -0,0 +1,40 @@
+import time
+
+from graph.budget import budget_exhausted, ensure_budget, update_best
+
+
+def state(**overrides):
+    values = {"generation_attempts": 1, "tokens_used": 0, "max_regenerations": 2, "token_budget": 1000,
+              "deadline": time.time() + 60}
+    values.update(overrides)
+    return values
+
+
+def test_budget_exhausted_by_each_limit() -> None:
+    assert budget_exhausted(state()) is None
+    assert budget_exhausted(state(generation_attempts=2)) is None
+    assert budget_exhausted(state(generation_attempts=3)) == "regenerations"
+    assert budget_exhausted(state(tokens_used=1000)) == "tokens"
+    assert budget_exhausted(state(deadline=time.time() - 1)) == "deadline"
+    # El plazo se revisa primero aunque también se hayan agotado los demás
+    assert budget_exhausted(state(deadline=time.time() - 1, generation_attempts=5, tokens_used=5000)) == "deadline"
+
+
+def test_ensure_budget_only_fills_missing_fields() -> None:
+    filled = ensure_budget({"max_regenerations": 0, "tokens_used": 10})
+    assert set(filled) == {"generation_attempts", "token_budget", "deadline"}
+    assert filled["deadline"] > time.time()
+    assert ensure_budget(state()) == {}
+
+
+def test_update_best_keeps_the_better_grade() -> None:
+    assert update_best({}, "primera", "not supported") == {"best_generation": "primera", "best_grade": "not supported"}
+
+    best = {"best_generation": "útil", "best_grade": "useful"}
+    assert update_best(best, "peor", "not useful") == {}
+    assert update_best(best, "sin calificar", None) == {}
+    # Ante empate gana la más reciente
+    assert update_best(best, "nueva", "useful") == {"best_generation": "nueva", "best_grade": "useful"}
+
+    worse = {"best_generation": "sin fundamento", "best_grade": "not supported"}
+    assert update_best(worse, "mejor", "not useful") == {"best_generation": "mejor", "best_grade": "not useful"}
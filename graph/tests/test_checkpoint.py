@@ -0,0 +1,64 @@
+import time
+
+from graph.checkpoint import (
+    MemoryCheckpointStore,
+    SqliteCheckpointStore,
+    checkpointed,
+    checkpointed_route,
+    set_checkpoint_store,
+)
+
+
+def test_resumed_run_reuses_completed_nodes() -> None:
+    set_checkpoint_store(MemoryCheckpointStore())
+    calls = []
+
+    def retrieve(state):
+        calls.append("retrieve")
+        return {"documents": ["doc"], "deadline": time.time()}
+
+    node = checkpointed("retrieve", retrieve)
+    state = {"question": "q", "request_id": "r1", "node_visits": {}}
+
+    first = node(state)
+    second = node(state)
+
+    assert calls == ["retrieve"]
+    assert second["documents"] == ["doc"]
+    assert "deadline" not in second
+    assert first["node_visits"] == {"retrieve": 1}
+
+    # Una nueva visita al mismo nodo no reutiliza la anterior
+    node({**state, "node_visits": first["node_visits"]})
+    assert calls == ["retrieve", "retrieve"]
+
+
+def test_sqlite_store_retention(tmp_path) -> None:
+    store = SqliteCheckpointStore(str(tmp_path / "checkpoints.sqlite"))
+    for i in range(3):
+        store.save(f"r{i}", "retrieve", 1, {"documents": [i]})
+
+    assert store.load("r1", "retrieve", 1) == {"documents": [1]}
+    assert store.purge(max_age_hours=24, max_requests=2) == 1
+    assert {row["request_id"] for row in store.list()} == {"r1", "r2"}
+
+
+def test_resumed_run_reuses_route_decision() -> None:
+    set_checkpoint_store(MemoryCheckpointStore())
+    calls = []
+
+    def route(state):
+        calls.append(state["question"])
+        return "retrieve"
+
+    router = checkpointed_route("route_question", route)
+    state = {"question": "q", "request_id": "r1", "node_visits": {}}
+
+    assert router(state) == "retrieve"
+    assert router(state) == "retrieve"
+    assert calls == ["q"]
+
+    # Sin request_id no se guarda nada
+    router({"question": "otra"})
+    router({"question": "otra"})
+    assert calls == ["q", "otra", "otra"]
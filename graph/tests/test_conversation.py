@@ -0,0 +1,33 @@
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from langchain_core.documents import Document
+
+from graph.conversation import ChunkCache, compact_history, rehydrate_documents
+
+
+def test_history_keeps_references_and_rehydrates() -> None:
+    cache = ChunkCache(max_bytes=10_000)
+    doc = Document(page_content="Artículo 240 del Estatuto", metadata={"source": "et.pdf", "page": 3, "score": 0.9})
+    messages = [
+        {"role": "user", "content": "tarifa"},
+        {"role": "assistant", "content": "35%", "documents": [doc, doc]},
+    ]
+
+    compact_history(messages, cache=cache)
+
+    assert "documents" not in messages[1]
+    assert cache.snapshot()["chunks"] == 1
+    restored = rehydrate_documents(messages[1], cache=cache)
+    assert restored[0].page_content == doc.page_content
+    assert restored[0].metadata["score"] == 0.9
+
+
+def test_history_cap_drops_oldest_turns() -> None:
+    messages = [{"role": "user", "content": "x" * 400} for _ in range(10)]
+
+    stats = compact_history(messages, max_bytes=1_000, cache=ChunkCache())
+
+    assert stats["bytes"] <= 1_000
+    assert stats["trimmed"] == 10 - len(messages)
@@ -0,0 +1,37 @@
+from graph.followup import ConversationContextCache, TurnContext, is_followup, rewrite_followup
+
+PREVIOUS = "¿Cuál es la tarifa del impuesto de renta para sociedades?"
+
+
+def test_detects_followups() -> None:
+    assert is_followup("¿Y si es persona natural?", PREVIOUS)
+    assert is_followup("¿Eso aplica para las ZESE?", PREVIOUS)
+    assert is_followup("En ese caso, ¿cuál es el plazo?", PREVIOUS)
+    assert is_followup("¿Lo mismo para las sucursales?", PREVIOUS)
+
+    assert not is_followup("¿Está gravada con IVA la venta de software?", PREVIOUS)
+    assert not is_followup("¿Aplica retención en la fuente a los dividendos?", PREVIOUS)
+    assert not is_followup("Si es persona natural no residente, ¿cuál es la tarifa de renta?", PREVIOUS)
+    assert not is_followup("¿Igualmente se grava el IVA en los servicios digitales?", PREVIOUS)
+    assert not is_followup("¿El mismo contribuyente puede descontar el IVA?", PREVIOUS)
+    assert not is_followup("¿Y si es persona natural?", None)
+    assert not is_followup(PREVIOUS, PREVIOUS)
+
+
+def test_rewrite_keeps_previous_question() -> None:
+    rewritten = rewrite_followup("¿Y si es persona natural?", PREVIOUS)
+    assert rewritten.startswith("Cuál es la tarifa del impuesto de renta para sociedades.")
+    assert rewritten.endswith("¿Y si es persona natural?")
+
+
+def test_context_only_matches_same_topic_and_last_question() -> None:
+    cache = ConversationContextCache(max_size=1)
+    cache.put(("ana", "Renta"), TurnContext("Renta", PREVIOUS, PREVIOUS, ["doc"]))
+
+    assert cache.get(("ana", "Renta"), "Renta", PREVIOUS).documents == ["doc"]
+    # Conversación limpiada u otra pregunta anterior: no se reutiliza
+    assert cache.get(("ana", "Renta"), "Renta", None) is None
+    assert cache.get(("ana", "Renta"), "IVA", PREVIOUS) is None
+
+    cache.put(("luis", "Renta"), TurnContext("Renta", PREVIOUS, PREVIOUS, []))
+    assert cache.get(("ana", "Renta"), "Renta", PREVIOUS) is None
@@ -0,0 +1,62 @@
+import importlib
+import time
+from types import SimpleNamespace
+
+from graph import graph as graph_module
+from graph.consts import FINALIZE, GENERATE, REPAIR, WEBSEARCH
+
+# graph.nodes.grade_generation es también el nombre del nodo que exporta graph.nodes
+grade_generation = importlib.import_module("graph.nodes.grade_generation")
+
+
+def test_decide_after_grading_returns_every_route() -> None:
+    decide = graph_module.decide_after_grading
+    assert decide({"generation_grade": "useful", "budget_exhausted": "tokens"}) == "useful"
+    assert decide({"generation_grade": "not useful"}) == "not useful"
+    assert decide({"generation_grade": "not supported", "budget_exhausted": None}) == "not supported"
+    assert decide({"generation_grade": "not supported", "budget_exhausted": "regenerations"}) == "budget exhausted"
+    # Plazo vencido antes de evaluar: no hay calificación
+    assert decide({"generation_grade": None, "budget_exhausted": "deadline"}) == "budget exhausted"
+
+
+def test_after_grading_routes_follow_repair_mode() -> None:
+    routes = graph_module.after_grading_routes(repair_mode=True)
+    assert routes["not supported"] == REPAIR
+    assert routes["not useful"] == WEBSEARCH
+    assert routes["budget exhausted"] == FINALIZE
+    assert graph_module.after_grading_routes(repair_mode=False)["not supported"] == GENERATE
+
+
+def test_grade_generation_skips_graders_after_deadline(monkeypatch) -> None:
+    def graders(state):
+        raise AssertionError("no debe evaluar con el plazo vencido")
+
+    monkeypatch.setattr(grade_generation, "grade_generation_grounded_in_documents_and_question", graders)
+    updates = grade_generation.grade_generation({"generation": "respuesta", "deadline": time.time() - 1})
+    assert updates == {"generation_grade": None, "budget_exhausted": "deadline",
+                       "best_generation": "respuesta", "best_grade": None}
+
+
+def test_grade_generation_tracks_best_and_budget(monkeypatch) -> None:
+    monkeypatch.setattr(grade_generation, "grade_generation_grounded_in_documents_and_question",
+                        lambda state: "not supported")
+    base = {"generation": "segunda", "deadline": time.time() + 60, "max_regenerations": 1, "token_budget": 1000,
+            "tokens_used": 0, "best_generation": "primera", "best_grade": "not useful"}
+
+    updates = grade_generation.grade_generation({**base, "generation_attempts": 2})
+    assert updates == {"generation_grade": "not supported", "budget_exhausted": "regenerations"}
+
+    updates = grade_generation.grade_generation({**base, "generation_attempts": 1, "best_generation": None})
+    assert updates["budget_exhausted"] is None and updates["best_generation"] == "segunda"
+
+
+def test_grader_results_map_to_grades(monkeypatch) -> None:
+    def grader(score):
+        return lambda: SimpleNamespace(invoke=lambda inputs: SimpleNamespace(binary_score=score))
+
+    state = {"question": "¿Tarifa?", "documents": [], "generation": "La tarifa es 35%."}
+    for grounded, answers, expected in [(True, True, "useful"), (True, False, "not useful"),
+                                        (False, True, "not supported")]:
+        monkeypatch.setattr(grade_generation, "get_hallucination_grader", grader(grounded))
+        monkeypatch.setattr(grade_generation, "get_answer_grader", grader(answers))
+        assert grade_generation.grade_generation_grounded_in_documents_and_question(state) == expected
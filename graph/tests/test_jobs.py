@@ -0,0 +1,110 @@
+import threading
+import time
+
+import pytest
+
+from graph.jobs import CANCELLED, DONE, FAILED, QUEUED, JobLimitError, JobQueue
+
+
+def wait_for(job, timeout: float = 2) -> None:
+    deadline = time.time() + timeout
+    while not job.finished and time.time() < deadline:
+        time.sleep(0.01)
+
+
+def test_per_user_limit_and_queue_position() -> None:
+    queue = JobQueue(workers=2, max_running_per_user=1, max_queued_per_user=2)
+    release = threading.Event()
+
+    def blocked(job, value):
+        job.report(f"procesando {value}")
+        release.wait(timeout=2)
+        return value
+
+    first = queue.submit("ana", blocked, 1)
+    second = queue.submit("ana", blocked, 2)
+    other = queue.submit("luis", blocked, 3)
+    time.sleep(0.1)
+
+    # Ana solo puede tener una consulta en ejecución; la de Luis no espera por ella
+    assert second.status == QUEUED and queue.position(second.id) == 0
+    assert other.status != QUEUED
+    fourth = queue.submit("ana", blocked, 4)
+    with pytest.raises(JobLimitError):
+        queue.submit("ana", blocked, 5)
+
+    release.set()
+    for job in (first, second, other, fourth):
+        wait_for(job)
+    assert [job.result for job in (first, second, other, fourth)] == [1, 2, 3, 4]
+    assert first.status == DONE and first.progress == ["procesando 1"]
+
+
+def test_cancel_queued_and_running_jobs() -> None:
+    queue = JobQueue(workers=1, max_running_per_user=1)
+    started = threading.Event()
+    stop = threading.Event()
+
+    def stages(job):
+        started.set()
+        stop.wait(timeout=2)
+        job.raise_if_cancelled()
+        return "no debería terminar"
+
+    running = queue.submit("ana", stages)
+    started.wait(timeout=2)
+    queued = queue.submit("luis", stages)
+
+    assert queue.cancel(queued.id) and queued.status == CANCELLED
+    assert queue.cancel(running.id) and running.status == CANCELLED
+    stop.set()
+    time.sleep(0.1)
+    assert running.result is None and not queue.cancel(running.id)
+
+
+def test_failures_and_timeouts() -> None:
+    queue = JobQueue(workers=2, timeout=0.05)
+
+    def failing(job):
+        raise RuntimeError("falló la generación")
+
+    def stuck(job):
+        time.sleep(0.3)
+
+    failed = queue.submit("ana", failing)
+    wait_for(failed)
+    assert failed.status == FAILED and "falló" in failed.error
+
+    slow = queue.submit("luis", stuck)
+    time.sleep(0.1)
+    assert queue.get(slow.id).status == FAILED
+    assert queue.snapshot()["timed_out"] == 1
+
+
+def test_cancelled_job_keeps_user_slot_until_it_returns() -> None:
+    queue = JobQueue(workers=2, max_running_per_user=1)
+    started = threading.Event()
+    stop = threading.Event()
+    stages = []
+
+    def pipeline(job):
+        started.set()
+        stop.wait(timeout=2)
+        job.report("reranking")
+        stages.append("reranking")
+        return "respuesta"
+
+    running = queue.submit("ana", pipeline)
+    started.wait(timeout=2)
+    assert queue.cancel(running.id)
+
+    # Hasta que el hilo retorna, Ana no puede ocupar otro hilo
+    second = queue.submit("ana", lambda job: "otra")
+    time.sleep(0.1)
+    assert second.status == QUEUED and queue.snapshot()["running"] == 1
+
+    stop.set()
+    wait_for(second)
+    # El trabajo cancelado se detuvo en la siguiente etapa
+    assert stages == [] and running.status == CANCELLED
+    assert second.result == "otra"
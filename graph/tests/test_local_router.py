@@ -0,0 +1,46 @@
+from graph import graph as graph_module
+from graph.chains import local_router
+from graph.chains.local_router import ROUTER_CONFIDENCE_MARGIN, keyword_route, route_locally
+
+
+def test_keyword_route() -> None:
+    assert keyword_route("¿Cuál es la TARIFA de retención en la fuente?") == "vectorstore"
+    assert keyword_route("¿Qué dice el Artículo 240?") == "vectorstore"
+    assert keyword_route("¿Cómo se liquida el IVA?") == "vectorstore"
+    # Las siglas cortas solo cuentan como palabra completa
+    assert keyword_route("¿Cuál es la receta del ajiaco santafereño?") is None
+    assert keyword_route("¿Qué película me recomiendas?") is None
+
+
+def test_route_locally_uses_margin_then_keywords(monkeypatch) -> None:
+    monkeypatch.setattr(local_router, "embedding_route", lambda question: ("websearch", ROUTER_CONFIDENCE_MARGIN))
+    assert route_locally("¿Cómo hago una pizza?")[0] == "websearch"
+
+    # Sin margen suficiente deciden las palabras clave
+    monkeypatch.setattr(local_router, "embedding_route", lambda question: ("websearch", ROUTER_CONFIDENCE_MARGIN / 2))
+    assert route_locally("¿Cuál es la tarifa de renta?") == ("vectorstore", "palabras clave")
+    assert route_locally("¿Cómo hago una pizza?") == (None, "sin confianza")
+
+    def failing(question):
+        raise RuntimeError("sin red")
+
+    monkeypatch.setattr(local_router, "embedding_route", failing)
+    assert route_locally("¿Cuándo se causa el timbre?") == ("vectorstore", "palabras clave")
+
+
+def test_route_question_falls_back_to_llm_router(monkeypatch) -> None:
+    calls = []
+
+    class Router:
+        def invoke(self, inputs):
+            calls.append(inputs["question"])
+            return graph_module.RouteQuery(datasource="websearch")
+
+    monkeypatch.setattr(graph_module, "get_question_router", lambda: Router())
+    monkeypatch.setattr(graph_module, "route_locally", lambda question: ("vectorstore", "palabras clave"))
+    assert graph_module.route_question({"question": "¿Qué es el ICA?"}) == graph_module.RETRIEVE
+    assert calls == []
+
+    monkeypatch.setattr(graph_module, "route_locally", lambda question: (None, "sin confianza"))
+    assert graph_module.route_question({"question": "¿Cómo hago una pizza?"}) == graph_module.WEBSEARCH
+    assert calls == ["¿Cómo hago una pizza?"]
@@ -0,0 +1,91 @@
+import threading
+import time
+
+import pytest
+
+from graph.rate_limit import (
+    PRIORITY_BATCH,
+    PRIORITY_INTERACTIVE,
+    RateLimiter,
+    backoff_delay,
+    call_with_retry,
+    metrics,
+    request_priority,
+    get_request_priority,
+)
+
+
+class FakeResponse:
+    def __init__(self, headers):
+        self.headers = headers
+        self.status_code = 429
+
+
+class FakeRateLimitError(Exception):
+    def __init__(self, retry_after=None):
+        super().__init__("rate limited")
+        self.status_code = 429
+        self.response = FakeResponse({"retry-after": str(retry_after)} if retry_after else {})
+
+
+def test_backoff_honors_retry_after() -> None:
+    assert backoff_delay(0, base=0.1, retry_after=3) >= 3
+    assert backoff_delay(10, base=1.0, maximum=5.0) <= 5.0
+
+
+def test_call_with_retry_retries_transient_errors() -> None:
+    metrics.reset()
+    limiter = RateLimiter("test-retry", requests_per_minute=6000, tokens_per_minute=1_000_000)
+    calls = []
+    sleeps = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise FakeRateLimitError(retry_after=2)
+        return "ok"
+
+    assert call_with_retry(flaky, limiter, estimated_tokens=10, sleep=sleeps.append) == "ok"
+    assert len(calls) == 3
+    assert all(delay >= 2 for delay in sleeps)
+    snapshot = metrics.snapshot()["test-retry"]
+    assert snapshot["retries"] == 2
+    assert snapshot["rate_limit_errors"] == 2
+
+
+def test_call_with_retry_does_not_retry_other_errors() -> None:
+    limiter = RateLimiter("test-fail", requests_per_minute=6000, tokens_per_minute=1_000_000)
+
+    def broken():
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        call_with_retry(broken, limiter, sleep=lambda _: None)
+
+
+def test_request_priority_context() -> None:
+    assert get_request_priority() == PRIORITY_INTERACTIVE
+    with request_priority(PRIORITY_BATCH):
+        assert get_request_priority() == PRIORITY_BATCH
+    assert get_request_priority() == PRIORITY_INTERACTIVE
+
+
+def test_interactive_requests_go_before_batch() -> None:
+    # 60 solicitudes por minuto = una por segundo; se agota la cubeta para forzar la cola
+    limiter = RateLimiter("test-priority", requests_per_minute=600, tokens_per_minute=1_000_000)
+    limiter.requests.tokens = 0
+    order = []
+
+    def worker(priority, label):
+        limiter.acquire(priority=priority)
+        order.append(label)
+
+    batch = threading.Thread(target=worker, args=(PRIORITY_BATCH, "batch"))
+    batch.start()
+    time.sleep(0.02)
+    interactive = threading.Thread(target=worker, args=(PRIORITY_INTERACTIVE, "interactive"))
+    interactive.start()
+    batch.join(timeout=5)
+    interactive.join(timeout=5)
+
+    assert order == ["interactive", "batch"]
@@ -0,0 +1,52 @@
+import threading
+import time
+
+import pytest
+
+from graph.singleflight import SingleFlight, normalize_question
+
+
+def test_normalize_question() -> None:
+    assert normalize_question("¿Cuál es la TARIFA  de renta?") == normalize_question("cual es la tarifa de renta")
+
+
+def test_concurrent_calls_share_one_execution() -> None:
+    flight = SingleFlight("test")
+    executions = []
+    results = []
+    started = threading.Event()
+
+    def slow():
+        executions.append(1)
+        started.set()
+        time.sleep(0.1)
+        return ["doc"]
+
+    def worker():
+        results.append(flight.do("clave", slow))
+
+    leader = threading.Thread(target=worker)
+    leader.start()
+    started.wait(timeout=2)
+    followers = [threading.Thread(target=worker) for _ in range(3)]
+    for thread in followers:
+        thread.start()
+    for thread in [leader] + followers:
+        thread.join(timeout=2)
+
+    assert len(executions) == 1
+    assert [result for result, _ in results] == [["doc"]] * 4
+    assert sorted(shared for _, shared in results) == [False, True, True, True]
+    assert flight.in_flight() == 0
+
+
+def test_errors_propagate_and_key_is_released() -> None:
+    flight = SingleFlight("test")
+
+    def broken():
+        raise RuntimeError("fallo")
+
+    with pytest.raises(RuntimeError):
+        flight.do("clave", broken)
+
+    assert flight.do("clave", lambda: 42) == (42, False)
@@ -0,0 +1,73 @@
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+
+from graph import tracing
+
+
+class ListExporter:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span)
+
+
+def test_nested_spans_share_request_and_usage(monkeypatch) -> None:
+    monkeypatch.setattr(tracing, "TRACE_ENABLED", True)
+    exporter = ListExporter()
+    tracing.set_exporters([exporter])
+
+    @tracing.traced()
+    def rerank():
+        tracing.record_usage({"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15})
+
+    with tracing.trace_request("req-1"):
+        with tracing.span("answer_query") as root:
+            rerank()
+            # Los hilos que copian el contexto quedan bajo el span padre
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                executor.submit(contextvars.copy_context().run, rerank).result()
+
+    child, threaded, parent = exporter.spans
+    assert parent is root and parent.parent_id is None
+    assert {child.parent_id, threaded.parent_id} == {root.span_id}
+    assert {span.request_id for span in exporter.spans} == {"req-1"}
+    assert child.attributes["total_tokens"] == 15
+
+
+def test_failed_span_records_error(monkeypatch) -> None:
+    monkeypatch.setattr(tracing, "TRACE_ENABLED", True)
+    exporter = ListExporter()
+    tracing.set_exporters([exporter])
+
+    try:
+        with tracing.span("query_pinecone"):
+            raise RuntimeError("timeout")
+    except RuntimeError:
+        pass
+
+    assert exporter.spans[0].status == "error"
+    assert "timeout" in exporter.spans[0].error
+
+
+def test_jsonl_sink_rotates_by_size(tmp_path) -> None:
+    path = str(tmp_path / "traces.jsonl")
+    sink = tracing.JsonlSpanSink(path, max_bytes=2000, backups=2, flush_interval=0)
+    for i in range(60):
+        span = tracing.Span(f"span-{i}", "req", None, {})
+        span.finish()
+        sink.export(span)
+    sink.close()
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["traces.jsonl", "traces.jsonl.1", "traces.jsonl.2"]
+    assert all(p.stat().st_size <= 2000 for p in tmp_path.iterdir())
+    assert [row["name"] for row in tracing.summarize(path)] != []
+
+
+def test_disabled_tracing_exports_nothing(monkeypatch) -> None:
+    monkeypatch.setattr(tracing, "TRACE_ENABLED", False)
+    exporter = ListExporter()
+    tracing.set_exporters([exporter])
+    with tracing.span("answer_query") as current:
+        pass
+    assert current is None and exporter.spans == []
@@ -0,0 +1,25 @@
+import importlib
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# graph.nodes.web_search es también el nombre del nodo que exporta graph.nodes
+web_search = importlib.import_module("graph.nodes.web_search")
+
+
+def test_speculative_outcomes_are_counted(monkeypatch) -> None:
+    monkeypatch.setattr(web_search, "speculative_stats", {"hit": 0, "miss": 0, "cancelled": 0})
+
+    # Pendiente y no hizo falta: se cancela sin costo
+    assert web_search.finish_speculative_search(Future(), needed=False) == "cancelled"
+
+    # Ya en curso y no hizo falta: la llamada a Tavily se desperdicia
+    release = threading.Event()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        running = executor.submit(release.wait, 2)
+        while not running.running():
+            pass
+        assert web_search.finish_speculative_search(running, needed=False) == "miss"
+        release.set()
+
+    assert web_search.finish_speculative_search(Future(), needed=True) == "hit"
+    assert web_search.speculative_stats == {"hit": 1, "miss": 1, "cancelled": 1}
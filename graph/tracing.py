@@ -0,0 +1,414 @@
+"""
+Trazas por etapa del flujo de consulta (embedding, Pinecone, reranking, generación,
+evaluadores y nodos del grafo).
+
+Cada etapa se registra como un "span" con su duración, el span padre, el id de la
+consulta (request id) y, cuando la etapa llama a OpenAI, los tokens reportados en
+`usage`. Los spans terminados se escriben en un archivo JSONL que se puede analizar
+sin conexión y, opcionalmente, se envían a un colector OTLP/HTTP (JSON).
+
+Las trazas están desactivadas por defecto. El archivo se mantiene abierto con
+búfer (se vacía cada pocos segundos) y rota al pasar de TRACE_MAX_BYTES,
+conservando TRACE_BACKUPS copias (traces.jsonl.1, .2, ...).
+
+Los spans se propagan con contextvars: los hilos que copian el contexto
+(contextvars.copy_context) quedan anidados bajo el span que los lanzó.
+
+Configuración por variables de entorno:
+    TRACE_ENABLED: "true" activa las trazas (por defecto desactivadas)
+    TRACE_FILE: archivo JSONL de salida (por defecto traces.jsonl)
+    TRACE_MAX_BYTES: tamaño a partir del cual rota el archivo (por defecto 50 MB)
+    TRACE_BACKUPS: archivos rotados que se conservan (por defecto 3)
+    OTEL_EXPORTER_OTLP_ENDPOINT: si se define, los spans se envían a
+        <endpoint>/v1/traces en formato OTLP/HTTP JSON
+    OTEL_SERVICE_NAME: nombre del servicio en OTLP (por defecto consultoria-tributaria)
+
+Resumen de un archivo de trazas:
+    python -m graph.tracing traces.jsonl
+"""
+
+import atexit
+import contextlib
+import contextvars
+import functools
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+TRACE_ENABLED = os.environ.get("TRACE_ENABLED", "false").lower() in ("1", "true", "yes")
+TRACE_FILE = os.environ.get("TRACE_FILE", "traces.jsonl")
+TRACE_MAX_BYTES = int(os.environ.get("TRACE_MAX_BYTES", 50 * 1024 * 1024))
+TRACE_BACKUPS = int(os.environ.get("TRACE_BACKUPS", 3))
+OTLP_ENDPOINT = os.environ.get("OTEL_EXPORTER_OTLP_ENDPOINT")
+SERVICE_NAME = os.environ.get("OTEL_SERVICE_NAME", "consultoria-tributaria")
+
+# Segundos máximos que un span espera en el búfer antes de llegar al archivo
+FLUSH_INTERVAL = 2.0
+
+# Campos de `usage` de OpenAI que se acumulan en el span
+USAGE_FIELDS = ("prompt_tokens", "completion_tokens", "total_tokens")
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+_current_request: contextvars.ContextVar = contextvars.ContextVar("current_request", default=None)
+
+
+class Span:
+    """
+    Una etapa medida dentro de una consulta.
+    """
+
+    def __init__(self, name: str, request_id: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.request_id = request_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attributes = dict(attributes)
+        self.start = time.time()
+        self._start_perf = time.perf_counter()
+        self.duration = None
+        self.status = "ok"
+        self.error = None
+
+    def set(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def add_usage(self, usage: Any):
+        """
+        Suma los tokens de un objeto `usage` de OpenAI a los atributos del span.
+        """
+        for field in USAGE_FIELDS:
+            value = getattr(usage, field, None)
+            if value is None and isinstance(usage, dict):
+                value = usage.get(field)
+            if value:
+                self.attributes[field] = self.attributes.get(field, 0) + value
+
+    def finish(self, error: Optional[BaseException] = None):
+        self.duration = time.perf_counter() - self._start_perf
+        if error is not None:
+            self.status = "error"
+            self.error = f"{type(error).__name__}: {error}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "request_id": self.request_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start,
+            "duration": self.duration,
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class JsonlSpanSink:
+    """
+    Escribe cada span terminado como una línea JSON en un archivo que rota por tamaño.
+    """
+
+    def __init__(self, path: str, max_bytes: int = TRACE_MAX_BYTES, backups: int = TRACE_BACKUPS,
+                 flush_interval: float = FLUSH_INTERVAL):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_interval = flush_interval
+        self._file = None
+        self._size = 0
+        self._last_flush = 0.0
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def export(self, span: Span):
+        line = json.dumps(span.to_dict(), ensure_ascii=False, default=str) + "\n"
+        size = len(line.encode("utf-8"))
+        with self._lock:
+            if self._file is None:
+                self._open()
+            if self.max_bytes and self._size and self._size + size > self.max_bytes:
+                self._rotate()
+            self._file.write(line)
+            self._size += size
+            now = time.monotonic()
+            if now - self._last_flush >= self.flush_interval:
+                self._file.flush()
+                self._last_flush = now
+
+    def _open(self):
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._size = os.path.getsize(self.path)
+
+    def _rotate(self):
+        self._file.close()
+        if self.backups:
+            for i in range(self.backups - 1, 0, -1):
+                if os.path.exists(f"{self.path}.{i}"):
+                    os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._open()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class OtlpSpanExporter:
+    """
+    Envía los spans a un colector OTLP/HTTP en formato JSON, por lotes y desde un
+    hilo en segundo plano para no bloquear la consulta.
+    """
+
+    def __init__(self, endpoint: str, service_name: str = SERVICE_NAME, batch_size: int = 50, interval: float = 5.0):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.service_name = service_name
+        self.batch_size = batch_size
+        self.interval = interval
+        self._pending: List[Span] = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        threading.Thread(target=self._run, name="otlp-exporter", daemon=True).start()
+
+    def export(self, span: Span):
+        with self._lock:
+            self._pending.append(span)
+            if len(self._pending) >= self.batch_size:
+                self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait(timeout=self.interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return
+        try:
+            import requests
+
+            requests.post(self.url, json=self._payload(batch), timeout=10)
+        except Exception as e:
+            print(f"tracing: No se pudieron enviar {len(batch)} spans a {self.url}: {e}")
+
+    @staticmethod
+    def _trace_id(request_id: str) -> str:
+        # OTLP exige 16 bytes en hexadecimal; los request ids arbitrarios se resumen
+        if len(request_id) == 32 and all(c in "0123456789abcdef" for c in request_id):
+            return request_id
+        return hashlib.md5(request_id.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _value(value: Any) -> Dict[str, Any]:
+        if isinstance(value, bool):
+            return {"boolValue": value}
+        if isinstance(value, int):
+            return {"intValue": str(value)}
+        if isinstance(value, float):
+            return {"doubleValue": value}
+        return {"stringValue": str(value)}
+
+    def _payload(self, batch: List[Span]) -> Dict[str, Any]:
+        spans = []
+        for span in batch:
+            start_ns = int(span.start * 1e9)
+            spans.append({
+                "traceId": self._trace_id(span.request_id),
+                "spanId": span.span_id,
+                "parentSpanId": span.parent_id or "",
+                "name": span.name,
+                "kind": 1,
+                "startTimeUnixNano": str(start_ns),
+                "endTimeUnixNano": str(start_ns + int((span.duration or 0) * 1e9)),
+                "attributes": [
+                    {"key": key, "value": self._value(value)} for key, value in span.attributes.items()
+                ] + [{"key": "request.id", "value": {"stringValue": span.request_id}}],
+                "status": {"code": 2, "message": span.error} if span.status == "error" else {"code": 1},
+            })
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+                "scopeSpans": [{"scope": {"name": "graph.tracing"}, "spans": spans}],
+            }]
+        }
+
+
+_exporters: List[Any] = []
+_exporters_lock = threading.Lock()
+_configured = False
+
+
+def get_exporters() -> List[Any]:
+    """
+    Devuelve los exportadores configurados (se crean en el primer span).
+    """
+    global _configured
+    with _exporters_lock:
+        if not _configured:
+            _exporters.append(JsonlSpanSink(TRACE_FILE))
+            if OTLP_ENDPOINT:
+                _exporters.append(OtlpSpanExporter(OTLP_ENDPOINT))
+            _configured = True
+        return list(_exporters)
+
+
+def set_exporters(exporters: List[Any]):
+    """
+    Reemplaza los exportadores (útil en pruebas o para enviar spans a otro destino).
+    """
+    global _configured
+    with _exporters_lock:
+        _exporters[:] = exporters
+        _configured = True
+
+
+def get_request_id() -> Optional[str]:
+    """
+    Id de la consulta en curso (None fuera de una traza).
+    """
+    return _current_request.get()
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+@contextlib.contextmanager
+def trace_request(request_id: Optional[str] = None):
+    """
+    Agrupa todos los spans del bloque bajo un mismo request id.
+    """
+    token = _current_request.set(request_id or uuid.uuid4().hex)
+    try:
+        yield _current_request.get()
+    finally:
+        _current_request.reset(token)
+
+
+@contextlib.contextmanager
+def span(name: str, **attributes: Any):
+    """
+    Mide un bloque como span hijo del span actual.
+
+    Fuera de trace_request, el span raíz abre su propio request id.
+    """
+    if not TRACE_ENABLED:
+        yield None
+        return
+
+    parent = _current_span.get()
+    request_id = _current_request.get() or (parent.request_id if parent else uuid.uuid4().hex)
+    current = Span(name, request_id, parent.span_id if parent else None, attributes)
+    token = _current_span.set(current)
+    error = None
+    try:
+        yield current
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        _current_span.reset(token)
+        current.finish(error)
+        for exporter in get_exporters():
+            try:
+                exporter.export(current)
+            except Exception as e:
+                print(f"tracing: Error al exportar el span {name}: {e}")
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """
+    Decorador que ejecuta la función dentro de un span.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def record_usage(usage: Any):
+    """
+    Suma los tokens de `usage` al span actual (si hay uno).
+    """
+    current = _current_span.get()
+    if current is not None and usage is not None:
+        current.add_usage(usage)
+
+
+def set_attribute(key: str, value: Any):
+    """
+    Agrega un atributo al span actual (si hay uno).
+    """
+    current = _current_span.get()
+    if current is not None:
+        current.set(key, value)
+
+
+def summarize(path: str) -> List[Dict[str, Any]]:
+    """
+    Agrega un archivo JSONL de spans por nombre: número, duración p50/p95/máx.,
+    errores y tokens.
+    """
+    groups: Dict[str, Dict[str, Any]] = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            group = groups.setdefault(record["name"], {"durations": [], "errors": 0, "tokens": 0})
+            group["durations"].append(record.get("duration") or 0.0)
+            group["errors"] += record.get("status") == "error"
+            group["tokens"] += (record.get("attributes") or {}).get("total_tokens", 0)
+
+    rows = []
+    for name, group in groups.items():
+        durations = sorted(group["durations"])
+        rows.append({
+            "name": name,
+            "count": len(durations),
+            "p50": durations[len(durations) // 2],
+            "p95": durations[min(len(durations) - 1, int(len(durations) * 0.95))],
+            "max": durations[-1],
+            "total": sum(durations),
+            "errors": group["errors"],
+            "tokens": group["tokens"],
+        })
+    return sorted(rows, key=lambda row: row["total"], reverse=True)
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else TRACE_FILE
+    if not os.path.exists(path):
+        print(f"No existe el archivo de trazas: {path}")
+        sys.exit(1)
+
+    print(f"{'span':<40} {'n':>6} {'p50':>8} {'p95':>8} {'máx':>8} {'total':>9} {'err':>5} {'tokens':>9}")
+    for row in summarize(path):
+        print(
+            f"{row['name']:<40} {row['count']:>6} {row['p50']:>7.2f}s {row['p95']:>7.2f}s "
+            f"{row['max']:>7.2f}s {row['total']:>8.1f}s {row['errors']:>5} {row['tokens']:>9}"
+        )
+
+
+if __name__ == "__main__":
+    main()
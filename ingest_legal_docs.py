@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+"""
+Script para ingerir los documentos de data/<tema>/ en Pinecone (o en la colección local de Chroma).
+
+Ejemplos:
+    python ingest_legal_docs.py                 # todos los temas de data/
+    python ingest_legal_docs.py renta timbre    # solo esos temas
+    python ingest_legal_docs.py --local         # a la colección local de Chroma
+    python ingest_legal_docs.py --dry-run       # muestra qué archivos cambiaron, sin ingerir
+    python ingest_legal_docs.py --spool spool/  # escribe los vectores para corpus/upsert.py
+
+Solo se procesan los archivos nuevos o modificados desde la última ingesta (ver
+corpus/manifest.py); --full vuelve a ingerir todo. --spool siempre procesa todos los
+archivos: la carga en Pinecone la hace después `python -m corpus.upsert`.
+"""
+
+import argparse
+import json
+
+from dotenv import load_dotenv
+
+from corpus.ingesta import (
+    EMBEDDING_BATCH_SIZE,
+    INGEST_WORKERS,
+    LOCAL_EMBEDDING_MODEL,
+    ChromaSink,
+    PineconeSink,
+    SpoolSink,
+    ingest,
+)
+from corpus.manifest import INGEST_MANIFEST_DB, Manifest
+
+# Cargar variables de entorno
+load_dotenv()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingesta del corpus de data/ en los índices vectoriales.")
+    parser.add_argument("topics", nargs="*", help="Carpetas de data/ a ingerir (por defecto, todas)")
+    parser.add_argument("--data-dir", default="data", help="Directorio del corpus")
+    parser.add_argument("--local", action="store_true", help="Ingerir en la colección local de Chroma")
+    parser.add_argument("--workers", type=int, default=INGEST_WORKERS, help="Procesos de extracción")
+    parser.add_argument("--batch-size", type=int, default=EMBEDDING_BATCH_SIZE, help="Textos por lote de embeddings")
+    parser.add_argument("--manifest", default=INGEST_MANIFEST_DB, help="Manifiesto de la ingesta incremental")
+    parser.add_argument("--full", action="store_true", help="Ingerir todos los archivos aunque no hayan cambiado")
+    parser.add_argument("--dry-run", action="store_true", help="Mostrar qué cambiaría sin ingerir ni borrar")
+    parser.add_argument("--spool", help="Escribir los vectores en este directorio para corpus/upsert.py")
+    args = parser.parse_args(argv)
+
+    if args.full and args.dry_run:
+        parser.error("--dry-run necesita el manifiesto; no se puede combinar con --full")
+    if args.spool and (args.local or args.dry_run):
+        parser.error("--spool no se puede combinar con --local ni con --dry-run")
+
+    manifest = None if args.full or args.spool else Manifest("chroma" if args.local else "pinecone", args.manifest)
+    options = dict(workers=args.workers, batch_size=args.batch_size, manifest=manifest, dry_run=args.dry_run)
+    if args.local:
+        sink = None
+
+        def local_sink(topic):
+            # La colección se abre solo si hay algo que escribir o borrar
+            nonlocal sink
+            sink = sink or ChromaSink()
+            return sink
+
+        stats = ingest(args.data_dir, args.topics, sink_for=local_sink, embedding_model=LOCAL_EMBEDDING_MODEL, **options)
+    elif args.spool:
+        stats = ingest(args.data_dir, args.topics, sink_for=SpoolSink.for_topic(args.spool), **options)
+    else:
+        stats = ingest(args.data_dir, args.topics, sink_for=PineconeSink.for_topic, **options)
+    print(json.dumps(stats.summary(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+#!/usr/bin/env python
+"""
+Script para ingerir los documentos de data/renta/ en Pinecone (ver ingest_legal_docs.py).
+"""
+
+import sys
+
+from ingest_legal_docs import main
+
+if __name__ == "__main__":
+    main(["renta", *sys.argv[1:]])
@@ -1,8 +1,6 @@
 from dotenv import load_dotenv
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_chroma import Chroma
 from langchain_community.document_loaders import WebBaseLoader
-from langchain_openai import OpenAIEmbeddings
 
 load_dotenv()
 
@@ -30,9 +28,13 @@ load_dotenv()
 #     persist_directory="./.chroma",
 # )
 
-# Configurar el retriever para usar la nueva colección de documentos jurídicos
-retriever = Chroma(
-    collection_name="legal-docs-chroma",  # Actualizado para usar la nueva colección
-    persist_directory="./.chroma",
-    embedding_function=OpenAIEmbeddings(),
-).as_retriever()
+# El retriever de la colección de documentos jurídicos es el mismo que usa
+# graph.chains.retrieval; se abre una sola vez por proceso y solo cuando se usa
+from graph.chains.retrieval import get_chroma_retriever
+
+
+def __getattr__(name):
+    # Compatibilidad con `from ingestion import retriever`
+    if name == "retriever":
+        return get_chroma_retriever()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
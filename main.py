@@ -2,8 +2,8 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-from graph.graph import app
+from graph.graph import invoke_with_resume
 
 if __name__ == "__main__":
     print("Hello Advanced RAG")
-    print(app.invoke(input={"question": "Qué es el impuesto de timbre?"}))
+    print(invoke_with_resume({"question": "Qué es el impuesto de timbre?"}))
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+"""
+Mide el tiempo de importación de los módulos que usa cada página de Streamlit.
+
+Para cada página se leen sus sentencias import (sin ejecutarla) y se importan esos
+módulos en un proceso nuevo con `python -X importtime`, de modo que cada medición
+parte de un arranque en frío. Muestra el tiempo total por página y los módulos
+más lentos.
+
+Ejemplo:
+    python measure_import_time.py                  # todas las páginas
+    python measure_import_time.py pages/8_Renta.py --top 15
+"""
+
+import argparse
+import ast
+import glob
+import os
+import re
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+# Importa cada módulo por separado para que un fallo no oculte el resto
+CHILD_CODE = """
+import importlib, sys
+for name in sys.argv[1:]:
+    try:
+        importlib.import_module(name)
+    except Exception as e:
+        print(f"{name}: {type(e).__name__}: {e}")
+"""
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s+)(\S+)")
+
+
+def page_imports(path: str) -> List[str]:
+    """
+    Módulos importados por una página, en orden de aparición.
+    """
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=path)
+
+    modules = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            modules.append(node.module)
+    return list(dict.fromkeys(modules))
+
+
+def measure(modules: List[str]) -> Tuple[float, List[Tuple[str, float]], List[str]]:
+    """
+    Importa los módulos en un proceso nuevo.
+
+    Returns:
+        Tupla (segundos totales, [(módulo, segundos acumulados)], errores)
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD_CODE, *modules],
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+
+    cumulative: Dict[str, float] = {}
+    total = 0.0
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        seconds = int(match.group(2)) / 1e6
+        cumulative[match.group(4)] = seconds
+        # Solo los módulos de primer nivel suman al total (los anidados ya están incluidos)
+        if len(match.group(3)) == 1:
+            total += seconds
+
+    slowest = sorted(cumulative.items(), key=lambda item: item[1], reverse=True)
+    errors = [line for line in result.stdout.splitlines() if line.strip()]
+    return total, slowest, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mide el tiempo de importación de las páginas")
+    parser.add_argument("pages", nargs="*", help="Páginas a medir (por defecto pages/*.py)")
+    parser.add_argument("--top", type=int, default=8, help="Número de módulos lentos a mostrar por página")
+    args = parser.parse_args()
+
+    pages = args.pages or sorted(glob.glob("pages/*.py"))
+    summary = []
+    for page in pages:
+        modules = page_imports(page)
+        total, slowest, errors = measure(modules)
+        summary.append((page, total))
+
+        print(f"\n{page}: {total:.2f} s")
+        for name, seconds in slowest[:args.top]:
+            print(f"  {seconds:7.3f} s  {name}")
+        for error in errors:
+            print(f"  error: {error}")
+
+    print("\nResumen:")
+    for page, total in sorted(summary, key=lambda item: item[1], reverse=True):
+        print(f"  {total:6.2f} s  {page}")
+
+
+if __name__ == "__main__":
+    main()
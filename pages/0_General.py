@@ -1,13 +1,10 @@
 import streamlit as st
 from dotenv import load_dotenv
 import os
-import time
 import re
-# Importar el grafo completo en lugar de solo los componentes individuales
-from graph.graph import app, set_debug
-# Importar funciones específicas para consulta general
-from graph.chains.reranking import retrieve_with_multi_index_reranking
-from graph.chains.openai_generation import generate_simple_response
+from graph.chat_ui import cached_html, lazy_sources, pending_query, prepare_history, submit_query, visible_history
+from graph.conversation import has_sources
+from graph.resources import load_resources
 
 # Cargar variables de entorno
 load_dotenv()
@@ -35,9 +32,11 @@ Ideal para:
 - Obtener respuestas rápidas y directas
 """)
 
+# Clientes de Pinecone y OpenAI compartidos por todas las sesiones
+load_resources()
+
 # Verificar si Pinecone está configurado
 try:
-    import pinecone
     pinecone_api_key = os.environ.get("PINECONE_API_KEY")
     
     if not pinecone_api_key:
@@ -69,12 +68,19 @@ try:
             
             return texto_formateado
         
+        # Historial compacto: referencias a fragmentos y tope de memoria por sesión
+        prepare_history(st.session_state.general_messages)
+
         # Mostrar mensajes anteriores
-        for message in st.session_state.general_messages:
+        @st.fragment
+        def mostrar_mensaje(message):
+            """
+            Dibuja un mensaje del historial; sus controles solo vuelven a ejecutar este fragmento.
+            """
             with st.chat_message(message["role"]):
                 # Si hay citas, formatear el texto con ellas
                 if message["role"] == "assistant" and "citations" in message and message["citations"]:
-                    formatted_content = formatear_texto_con_citas(message["content"], message["citations"])
+                    formatted_content = cached_html(message, formatear_texto_con_citas)
                     st.markdown(formatted_content, unsafe_allow_html=True)
                 else:
                     st.markdown(message["content"])
@@ -94,9 +100,9 @@ try:
                             st.markdown(f"*\"{citation['cited_text']}\"*")
                 
                 # Después mostrar los documentos
-                if "documents" in message:
+                if has_sources(message):
                     with st.expander("Ver fuentes utilizadas"):
-                        for i, doc in enumerate(message["documents"]):
+                        for i, doc in lazy_sources(message):
                             source = doc.metadata.get('source', f'Documento {i+1}')
                             # Eliminar las extensiones del nombre de la fuente
                             source = source.replace('.pdf', '').replace('.html', '')
@@ -134,190 +140,19 @@ try:
                 if "flow" in message:
                     with st.expander("Ver flujo de procesamiento"):
                         st.markdown(message["flow"])
+
+        for message in visible_history(st.session_state.general_messages, "general_messages"):
+            mostrar_mensaje(message)
         
         # Input para la consulta
         query = st.chat_input("Escribe tu consulta general...")
         
-        # Procesar la consulta
+        # Enviar la consulta a la cola de trabajos
         if query:
-            # Agregar la consulta del usuario a los mensajes
-            st.session_state.general_messages.append({
-                "role": "user", 
-                "content": query
-            })
-            
-            # Mostrar la consulta en la interfaz
-            with st.chat_message("user"):
-                st.markdown(query)
-            
-            # Mostrar un spinner mientras se procesa la consulta
-            with st.chat_message("assistant"):
-                # Crear un placeholder para mostrar el flujo en tiempo real
-                flow_placeholder = st.empty()
-                
-                # Usar una lista para almacenar los pasos del flujo
-                flow_steps = []
-                
-                # Función para actualizar el flujo
-                def update_flow(step):
-                    flow_steps.append(f"- {step}")
-                    flow_text = ""
-                    for s in flow_steps:
-                        flow_text += s + "\n"
-                    flow_placeholder.markdown(f"**Procesando:**\n{flow_text}")
-                
-                # Mostrar el flujo de procesamiento
-                update_flow(f"🔄 Iniciando procesamiento de la consulta general...")
-                time.sleep(0.5)
-                
-                update_flow("🧠 Analizando la consulta...")
-                time.sleep(0.5)
-                
-                update_flow("🔍 Buscando en todos los índices disponibles...")
-                time.sleep(1)
-                
-                # Consultar todos los índices
-                try:
-                    # Recuperar documentos de múltiples índices con reranking
-                    print("General.py: Consultando múltiples índices")
-                    documents = retrieve_with_multi_index_reranking(query, top_k=12)
-                    print(f"General.py: Recuperados {len(documents)} documentos después del reranking")
-                    
-                    # Verificar si se encontraron documentos
-                    if not documents:
-                        update_flow("❌ No se encontraron documentos relevantes en ningún índice")
-                        response = "Lo siento, no encontré información relevante sobre tu consulta en ninguna de nuestras bases de conocimiento. Por favor, intenta reformular tu pregunta."
-                        final_flow = '\n'.join(flow_steps)
-                        flow_placeholder.empty()
-                        st.markdown(response)
-                        citations = []
-                        documents = []
-                        indices_used = []
-                    else:
-                        # Contar documentos por índice
-                        indices_counts = {}
-                        for doc in documents:
-                            index_name = doc.metadata.get('source_index', 'Desconocido')
-                            if index_name in indices_counts:
-                                indices_counts[index_name] += 1
-                            else:
-                                indices_counts[index_name] = 1
-                        
-                        indices_str = ", ".join([f"{name} ({count})" for name, count in indices_counts.items()])
-                        update_flow(f"📝 Encontrados {len(documents)} documentos relevantes en: {indices_str}")
-                        time.sleep(0.5)
-                        
-                        update_flow("✍️ Generando respuesta basada en múltiples fuentes...")
-                        time.sleep(0.5)
-                        
-                        # Generar respuesta con OpenAI (formato simplificado)
-                        openai_response = generate_simple_response(query, documents)
-                        response = openai_response["text"]
-                        citations = openai_response.get("citations", [])
-                        indices_used = openai_response.get("indices_used", [])
-                        
-                        update_flow("🔎 Verificando que la respuesta sea relevante...")
-                        time.sleep(0.5)
-                        
-                        if citations:
-                            update_flow(f"📌 Añadiendo {len(citations)} citas a la respuesta...")
-                            time.sleep(0.5)
-                        
-                        update_flow("✨ Respuesta generada con éxito!")
-                        
-                        # Guardar el flujo para mostrarlo en el historial
-                        final_flow = '\n'.join(flow_steps)
-                        
-                        # Limpiar el placeholder
-                        flow_placeholder.empty()
-                        
-                        # Verificar si hay citas en la respuesta
-                        if "[1]" in response or response.find("\n\n### Citas\n\n") > -1:
-                            # Si hay citas, separarlas de la respuesta principal
-                            if "\n\n### Citas\n\n" in response:
-                                # Separar el texto principal de las citas
-                                main_response, citations_text = response.split("\n\n### Citas\n\n", 1)
-                                
-                                # Mostrar el texto principal
-                                st.write(main_response)
-                                
-                                # Mostrar las citas en un expander
-                                with st.expander("Referencias:", expanded=False):
-                                    st.write(f"### Citas\n\n{citations_text}")
-                            else:
-                                # Si no hay formato específico, mostrar toda la respuesta
-                                st.write(response)
-                        else:
-                            # Si no hay citas, mostrar la respuesta completa
-                            st.write(response)
-                
-                except Exception as e:
-                    update_flow(f"❌ Error: {str(e)}")
-                    response = f"Lo siento, ocurrió un error al procesar tu consulta: {str(e)}"
-                    final_flow = '\n'.join(flow_steps)
-                    flow_placeholder.empty()
-                    st.markdown(response)
-                    citations = []
-                    documents = []
-                    indices_used = []
-            
-            # Agregar la respuesta del asistente a los mensajes
-            st.session_state.general_messages.append({
-                "role": "assistant", 
-                "content": response,
-                "documents": documents if 'documents' in locals() else [],
-                "flow": final_flow if 'final_flow' in locals() else '',
-                "citations": citations if 'citations' in locals() else [],
-                "indices_used": indices_used if 'indices_used' in locals() else []
-            })
-            
-            # Añadir esta sección para mostrar los expanders como en Estatuto y DUR
-            # Forzar la visualización de todos los expanders relevantes
-            if 'citations' in locals() and citations:
-                with st.expander("Ver referencias", expanded=False):
-                    for i, citation in enumerate(citations):
-                        document_title = citation['document_title']
-                        document_title = document_title.replace('.pdf', '').replace('.html', '')
-                        index_name = ""
-                        if "source_index" in citation:
-                            index_name = f" [{citation['source_index']}]"
-                        st.markdown(f"**[{i+1}]** `{document_title}{index_name}`")
-                        st.markdown(f"*\"{citation['cited_text']}\"*")
-            
-            if 'documents' in locals() and documents:
-                with st.expander("Ver fuentes utilizadas", expanded=False):
-                    for i, doc in enumerate(documents):
-                        source = doc.metadata.get('source', f'Documento {i+1}')
-                        source = source.replace('.pdf', '').replace('.html', '')
-                        prefixes_to_remove = [
-                            "pinecone_docs/", "Pinecone: ",
-                            "pinecone_timbre/data/timbre/", "pinecone_renta/data/renta/",
-                            "pinecone_iva/data/iva/", "pinecone_retencion/data/retencion/",
-                            "pinecone_ipoconsumo/data/ipoconsumo/", "pinecone_aduanas/data/aduanas/",
-                            "pinecone_cambiario/data/cambiario/", "pinecone_ica/data/ica/",
-                            "data/timbre/", "data/renta/", "data/iva/", "data/ica/",
-                            "data/retencion/", "data/ipoconsumo/", "data/aduanas/", "data/cambiario/"
-                        ]
-                        for prefix in prefixes_to_remove:
-                            if prefix in source:
-                                source = source.replace(prefix, "")
-                        source = re.sub(r'(?:^|/)data/\w+/', '', source)
-                        index_name = doc.metadata.get('source_index', '')
-                        index_info = f" [{index_name}]" if index_name else ""
-                        page = doc.metadata.get('page', None)
-                        page_info = f" (Pág. {page})" if page and page != 0 else ""
-                        st.markdown(f"**Fuente {i+1}:** `{source}{index_info}{page_info}`")
-                        st.markdown(f"```\n{doc.page_content}\n```")
-            
-            if 'indices_used' in locals() and indices_used:
-                with st.expander("Índices consultados", expanded=False):
-                    st.markdown("##### Índices de donde proviene la información:")
-                    for index in indices_used:
-                        st.markdown(f"- {index}")
-            
-            if 'final_flow' in locals():
-                with st.expander("Ver flujo de procesamiento", expanded=False):
-                    st.markdown(final_flow)
+            submit_query(st.session_state.general_messages, "general_messages", "General", query)
+
+        # Consulta en curso: progreso, posición en la cola y respuesta al terminar
+        pending_query(st.session_state.general_messages, "general_messages", "General")
 
 except Exception as e:
     st.error(f"Error al conectar con Pinecone: {str(e)}") 
\ No newline at end of file
@@ -3,6 +3,9 @@ import pandas as pd
 import os
 from dotenv import load_dotenv
 import re
+import time
+
+from corpus.catalog import Catalog
 
 # Cargar variables de entorno
 load_dotenv()
@@ -23,177 +26,141 @@ Esta sección le permite acceder a los documentos oficiales utilizados como fuen
 Puede explorar los documentos por categoría, realizar búsquedas y verificar la información citada. Esta función será funcional en la versión final. Por ahora podrán acceder a los documentos aquí [Biblioteca](https://eba-my.sharepoint.com/:f:/g/personal/hcastro_esguerrajhr_com/EgWozji9P89Gi02QG_0ybskBFzI39tnYkn78gfP3PiGWPw?e=JCZUDU).
 """)
 
-# Crear pestañas para las diferentes categorías
-tab1, tab2, tab3, tab4 = st.tabs(["Renta", "Timbre", "Retención", "IVA"])
-
-# Función para mostrar documentos de ejemplo
-def mostrar_documentos_ejemplo(categoria, num_docs=10):
-    # En una implementación real, estos datos vendrían de una base de datos
-    años = ["2017", "2018", "2019", "2020", "2021", "2022", "2023", "2024"]
-    tipos = ["Concepto", "Oficio", "Resolución", "Circular"]
-    
-    # Crear datos de ejemplo
-    data = []
-    for i in range(num_docs):
-        año = años[i % len(años)]
-        tipo = tipos[i % len(tipos)]
-        numero = f"{10000 + i*1111}"
-        titulo = f"{tipo} {numero} de {año} - {categoria}"
-        data.append({
-            "Año": año,
-            "Tipo": tipo,
-            "Número": numero,
-            "Título": titulo,
-            "Categoría": categoria
-        })
-    
-    return pd.DataFrame(data)
-
-# Contenido para la pestaña de Renta
-with tab1:
-    st.header("Documentos sobre Impuesto de Renta")
-    
-    # Filtros
-    col1, col2, col3 = st.columns(3)
+# Temas que se muestran aunque el catálogo aún no tenga documentos
+TEMAS_BASE = ["Renta", "Timbre", "Retención", "IVA"]
+DOCUMENTOS_POR_PAGINA = 50
+RESULTADOS_POR_PAGINA = 20
+CATALOG_REFRESH_TTL = int(os.environ.get("CATALOG_REFRESH_TTL", 300))
+
+# El catálogo (conexión SQLite) se comparte entre sesiones
+@st.cache_resource
+def obtener_catalogo():
+    return Catalog()
+
+# Como mucho cada CATALOG_REFRESH_TTL segundos se comparan tamaños y fechas de data/; si algo
+# cambió, la extracción de texto corre en un hilo en segundo plano y no en la sesión del usuario
+@st.cache_data(ttl=CATALOG_REFRESH_TTL, show_spinner=False)
+def revisar_catalogo():
+    catalogo = obtener_catalogo()
+    if catalogo.has_changes():
+        catalogo.build_in_background()
+    return time.time()
+
+catalogo = obtener_catalogo()
+revisar_catalogo()
+if catalogo.building:
+    st.info("El catálogo se está actualizando con documentos nuevos; recargue la página en unos minutos para verlos.")
+
+temas = list(dict.fromkeys(TEMAS_BASE + catalogo.topics()))
+tabs = st.tabs(temas)
+
+def mostrar_resultados_texto(busqueda, filtros, clave):
+    # Búsqueda en el texto completo de los documentos, ordenada por relevancia (BM25)
+    inicio = time.perf_counter()
+    resultados, total = catalogo.full_text_search(busqueda, page_size=0, **filtros)
+    if total == 0:
+        st.info("Ningún documento contiene esos términos. Use comillas para buscar una frase exacta.")
+        return
+
+    paginas = (total + RESULTADOS_POR_PAGINA - 1) // RESULTADOS_POR_PAGINA
+    pagina = st.number_input(f"Página (de {paginas})", min_value=1, max_value=paginas, value=1, key=f"pagina_texto_{clave}")
+    resultados, _ = catalogo.full_text_search(busqueda, page=pagina, page_size=RESULTADOS_POR_PAGINA, **filtros)
+    st.caption(f"{total} coincidencias en {(time.perf_counter() - inicio) * 1000:.0f} ms")
+
+    for resultado in resultados:
+        detalle = " · ".join(
+            str(valor) for valor in (resultado["tipo"], resultado["numero"], resultado["anio"], resultado["autoridad"]) if valor
+        )
+        st.markdown(f"**{resultado['titulo']}** — página {resultado['pagina']}  \n{detalle}")
+        st.markdown(f"> {resultado['fragmento']}")
+
+def mostrar_tema(tema):
+    clave = re.sub(r"\W+", "_", tema.lower())
+    facetas = catalogo.facets(tema)
+
+    # Filtros (los valores salen del propio catálogo)
+    col1, col2, col3, col4 = st.columns(4)
     with col1:
-        año_renta = st.selectbox("Año", ["Todos", "2024", "2023", "2022", "2021", "2020", "2019", "2018", "2017"], key="año_renta")
+        año = st.selectbox("Año", ["Todos"] + facetas["anio"], key=f"año_{clave}")
     with col2:
-        tipo_renta = st.selectbox("Tipo de documento", ["Todos", "Concepto", "Oficio", "Resolución", "Circular"], key="tipo_renta")
+        tipo = st.selectbox("Tipo de documento", ["Todos"] + facetas["tipo"], key=f"tipo_{clave}")
     with col3:
-        busqueda_renta = st.text_input("Buscar por palabra clave", key="busqueda_renta")
-    
-    # Mostrar documentos de ejemplo
-    df_renta = mostrar_documentos_ejemplo("Renta")
-    
-    # Aplicar filtros (simulado)
-    if año_renta != "Todos":
-        df_renta = df_renta[df_renta["Año"] == año_renta]
-    if tipo_renta != "Todos":
-        df_renta = df_renta[df_renta["Tipo"] == tipo_renta]
-    if busqueda_renta:
-        df_renta = df_renta[df_renta["Título"].str.contains(busqueda_renta, case=False)]
-    
+        autoridad = st.selectbox("Autoridad", ["Todos"] + facetas["autoridad"], key=f"autoridad_{clave}")
+    with col4:
+        busqueda = st.text_input("Buscar por palabra clave", key=f"busqueda_{clave}",
+                                 help='Busca en el texto de los documentos. Use "comillas" para frases exactas.')
+
+    filtros = {"tema": tema, "anio": año, "tipo": tipo, "autoridad": autoridad}
+    if busqueda:
+        mostrar_resultados_texto(busqueda, filtros, clave)
+        return
+
+    _, total = catalogo.search(page_size=0, **filtros)
+    if total == 0:
+        st.info(f"No hay documentos de {tema} en el catálogo con estos filtros.")
+        return
+
+    paginas = (total + DOCUMENTOS_POR_PAGINA - 1) // DOCUMENTOS_POR_PAGINA
+    pagina = st.number_input(f"Página (de {paginas})", min_value=1, max_value=paginas, value=1, key=f"pagina_{clave}")
+    documentos, _ = catalogo.search(page=pagina, page_size=DOCUMENTOS_POR_PAGINA, **filtros)
+    st.caption(f"{total} documentos")
+
     # Mostrar tabla de documentos
-    st.dataframe(df_renta, use_container_width=True)
-    
+    df = pd.DataFrame([
+        {
+            "Año": doc["anio"],
+            "Tipo": doc["tipo"],
+            "Número": doc["numero"],
+            "Autoridad": doc["autoridad"],
+            "Título": doc["titulo"],
+            "Páginas": doc["paginas"],
+        }
+        for doc in documentos
+    ])
+    st.dataframe(df, use_container_width=True, hide_index=True)
+
     # Previsualización de documento
     st.subheader("Previsualización del documento")
-    documento_seleccionado = st.selectbox("Seleccione un documento para previsualizar", df_renta["Título"].tolist(), key="doc_renta")
-    
-    if documento_seleccionado:
-        with st.expander("Ver contenido del documento", expanded=True):
-            st.markdown(f"### {documento_seleccionado}")
-            st.markdown("""
-            **Extracto del documento:**
-            
-            Considerando que el artículo 240 del Estatuto Tributario, modificado por el artículo 7 de la Ley 2277 de 2022, 
-            establece la tarifa general del impuesto sobre la renta aplicable a las personas jurídicas, la cual será del 
-            35% para el año gravable 2023 y siguientes.
-            
-            Que, adicionalmente, el parágrafo 1 del mismo artículo señala que las instituciones financieras deberán 
-            liquidar unos puntos adicionales al impuesto sobre la renta y complementarios cuando la renta gravable sea 
-            igual o superior a 120.000 UVT.
-            
-            Por lo tanto, se concluye que...
-            """)
-            
-            st.download_button(
-                label="Descargar documento completo",
-                data="Contenido completo del documento en formato PDF",
-                file_name=f"{documento_seleccionado}.pdf",
-                mime="application/pdf",
-                disabled=True  # Deshabilitado en este MVP
-            )
-
-# Contenido para la pestaña de Timbre
-with tab2:
-    st.header("Documentos sobre Impuesto de Timbre")
-    
-    # Filtros
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        año_timbre = st.selectbox("Año", ["Todos", "2024", "2023", "2022", "2021", "2020", "2019", "2018", "2017"], key="año_timbre")
-    with col2:
-        tipo_timbre = st.selectbox("Tipo de documento", ["Todos", "Concepto", "Oficio", "Resolución", "Circular"], key="tipo_timbre")
-    with col3:
-        busqueda_timbre = st.text_input("Buscar por palabra clave", key="busqueda_timbre")
-    
-    # Mostrar documentos de ejemplo
-    df_timbre = mostrar_documentos_ejemplo("Timbre")
-    
-    # Aplicar filtros (simulado)
-    if año_timbre != "Todos":
-        df_timbre = df_timbre[df_timbre["Año"] == año_timbre]
-    if tipo_timbre != "Todos":
-        df_timbre = df_timbre[df_timbre["Tipo"] == tipo_timbre]
-    if busqueda_timbre:
-        df_timbre = df_timbre[df_timbre["Título"].str.contains(busqueda_timbre, case=False)]
-    
-    # Mostrar tabla de documentos
-    st.dataframe(df_timbre, use_container_width=True)
-    
-    # Mensaje de funcionalidad en desarrollo
-    st.info("La previsualización de documentos de Timbre estará disponible próximamente.")
-
-# Contenido para la pestaña de Retención
-with tab3:
-    st.header("Documentos sobre Retención en la Fuente")
-    
-    # Filtros
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        año_retencion = st.selectbox("Año", ["Todos", "2024", "2023", "2022", "2021", "2020", "2019", "2018", "2017"], key="año_retencion")
-    with col2:
-        tipo_retencion = st.selectbox("Tipo de documento", ["Todos", "Concepto", "Oficio", "Resolución", "Circular"], key="tipo_retencion")
-    with col3:
-        busqueda_retencion = st.text_input("Buscar por palabra clave", key="busqueda_retencion")
-    
-    # Mostrar documentos de ejemplo
-    df_retencion = mostrar_documentos_ejemplo("Retención")
-    
-    # Aplicar filtros (simulado)
-    if año_retencion != "Todos":
-        df_retencion = df_retencion[df_retencion["Año"] == año_retencion]
-    if tipo_retencion != "Todos":
-        df_retencion = df_retencion[df_retencion["Tipo"] == tipo_retencion]
-    if busqueda_retencion:
-        df_retencion = df_retencion[df_retencion["Título"].str.contains(busqueda_retencion, case=False)]
-    
-    # Mostrar tabla de documentos
-    st.dataframe(df_retencion, use_container_width=True)
-    
-    # Mensaje de funcionalidad en desarrollo
-    st.info("La previsualización de documentos de Retención estará disponible próximamente.")
-
-# Contenido para la pestaña de IVA
-with tab4:
-    st.header("Documentos sobre Impuesto al Valor Agregado (IVA)")
-    
-    # Filtros
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        año_iva = st.selectbox("Año", ["Todos", "2024", "2023", "2022", "2021", "2020", "2019", "2018", "2017"], key="año_iva")
-    with col2:
-        tipo_iva = st.selectbox("Tipo de documento", ["Todos", "Concepto", "Oficio", "Resolución", "Circular"], key="tipo_iva")
-    with col3:
-        busqueda_iva = st.text_input("Buscar por palabra clave", key="busqueda_iva")
-    
-    # Mostrar documentos de ejemplo
-    df_iva = mostrar_documentos_ejemplo("IVA")
-    
-    # Aplicar filtros (simulado)
-    if año_iva != "Todos":
-        df_iva = df_iva[df_iva["Año"] == año_iva]
-    if tipo_iva != "Todos":
-        df_iva = df_iva[df_iva["Tipo"] == tipo_iva]
-    if busqueda_iva:
-        df_iva = df_iva[df_iva["Título"].str.contains(busqueda_iva, case=False)]
-    
-    # Mostrar tabla de documentos
-    st.dataframe(df_iva, use_container_width=True)
-    
-    # Mensaje de funcionalidad en desarrollo
-    st.info("La previsualización de documentos de IVA estará disponible próximamente.")
+    por_id = {doc["id"]: doc for doc in documentos}
+    documento_id = st.selectbox(
+        "Seleccione un documento para previsualizar",
+        list(por_id),
+        format_func=lambda doc_id: por_id[doc_id]["titulo"],
+        key=f"doc_{clave}",
+    )
+    if documento_id is None:
+        return
+
+    documento = por_id[documento_id]
+    with st.expander("Ver detalles del documento", expanded=True):
+        st.markdown(f"### {documento['titulo']}")
+        st.markdown(
+            f"**Tipo:** {documento['tipo'] or '-'} · **Número:** {documento['numero'] or '-'} · "
+            f"**Año:** {documento['anio'] or '-'} · **Autoridad:** {documento['autoridad'] or '-'} · "
+            f"**Páginas:** {documento['paginas'] or '-'}"
+        )
+        ruta = catalogo.absolute_path(documento)
+        descarga = f"descarga_{clave}"
+        if not os.path.exists(ruta):
+            st.warning("El archivo ya no está disponible; el catálogo se actualizará en breve.")
+        elif st.session_state.get(descarga) == documento_id:
+            # El archivo se lee solo para el documento pedido y se libera al descargarlo
+            with open(ruta, "rb") as f:
+                st.download_button(
+                    label="Descargar documento completo",
+                    data=f,
+                    file_name=os.path.basename(ruta),
+                    key=f"descargar_{clave}",
+                    on_click=lambda: st.session_state.pop(descarga, None),
+                )
+        elif st.button("Preparar descarga", key=f"preparar_{clave}"):
+            st.session_state[descarga] = documento_id
+            st.rerun()
+
+for tema, tab in zip(temas, tabs):
+    with tab:
+        st.header(f"Documentos sobre {tema}")
+        mostrar_tema(tema)
 
 # Sección de próximas funcionalidades
 st.markdown("""
@@ -202,10 +169,9 @@ st.markdown("""
 
 En futuras actualizaciones, implementaremos:
 
-1. **Búsqueda avanzada**: Filtros adicionales y búsqueda por contenido del documento
-2. **Exportación masiva**: Posibilidad de descargar múltiples documentos a la vez
-3. **Anotaciones**: Herramientas para que los abogados puedan agregar notas a los documentos
-4. **Integración con respuestas**: Acceso directo a los documentos citados en cada respuesta
+1. **Exportación masiva**: Posibilidad de descargar múltiples documentos a la vez
+2. **Anotaciones**: Herramientas para que los abogados puedan agregar notas a los documentos
+3. **Integración con respuestas**: Acceso directo a los documentos citados en cada respuesta
 
 Estamos trabajando para proporcionar una herramienta completa que facilite la investigación jurídica tributaria.
 """)
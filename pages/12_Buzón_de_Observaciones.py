@@ -1,13 +1,13 @@
 import streamlit as st
 from dotenv import load_dotenv
-import os
 import pandas as pd
 import datetime
-import csv
-import io
-import requests
-import base64
-import json
+
+from buzon.cache import ObservacionesCache
+from buzon.github import GitHubContents, to_csv
+from buzon.journal import Flusher, Journal
+
+OBSERVACIONES_POR_PAGINA = 50
 
 # Cargar variables de entorno
 load_dotenv()
@@ -30,162 +30,36 @@ Por favor, comparta sus observaciones, sugerencias o reporte cualquier problema
 Todas las observaciones son confidenciales y solo serán revisadas por el administrador del sistema.
 """)
 
-# Función para guardar observaciones en GitHub
-def guardar_observaciones_en_github(observaciones):
-    try:
-        # Configuración de GitHub desde variables de entorno
-        github_token = os.environ.get("GITHUB_TOKEN", "")
-        repo_owner = os.environ.get("GITHUB_REPO_OWNER", "EsguerraJHR")
-        repo_name = os.environ.get("GITHUB_REPO_NAME", "consultoriav-vf")
-        file_path = os.environ.get("GITHUB_FILE_PATH", "data/observaciones.csv")
-        
-        # Verificar si tenemos un token
-        if not github_token:
-            st.warning("No se ha configurado el token de GitHub. Las observaciones se guardarán solo en la sesión actual.")
-            return False
-        
-        # Convertir la lista de observaciones a DataFrame y luego a CSV
-        df = pd.DataFrame(observaciones)
-        
-        # Si no hay observaciones, crear un DataFrame vacío con las columnas correctas
-        if df.empty:
-            df = pd.DataFrame(columns=['Fecha', 'Nombre', 'Correo', 'Tipo', 'Asunto', 'Mensaje'])
-        
-        csv_content = df.to_csv(index=False)
-        
-        # URL de la API de GitHub para obtener el contenido actual del archivo
-        url = f"https://api.github.com/repos/{repo_owner}/{repo_name}/contents/{file_path}"
-        
-        # Configurar headers con el token de autenticación
-        headers = {
-            "Authorization": f"token {github_token}",
-            "Accept": "application/vnd.github.v3+json"
-        }
-        
-        # Verificar si el archivo ya existe
-        response = requests.get(url, headers=headers)
-        
-        # Preparar el contenido codificado en base64
-        encoded_content = base64.b64encode(csv_content.encode("utf-8")).decode("utf-8")
-        
-        # Datos para la solicitud
-        data = {
-            "message": "Actualizar observaciones",
-            "content": encoded_content,
-        }
-        
-        # Si el archivo existe, necesitamos su SHA para actualizarlo
-        if response.status_code == 200:
-            data["sha"] = response.json()["sha"]
-            
-            # Realizar la solicitud para actualizar el archivo
-            response = requests.put(url, headers=headers, data=json.dumps(data))
-            
-            if response.status_code in [200, 201]:
-                return True
-            else:
-                st.error(f"Error al actualizar el archivo: {response.status_code} - {response.text}")
-                return False
-        elif response.status_code == 404:
-            # Si el archivo no existe, primero verificar si la carpeta data existe
-            folder_parts = file_path.split('/')
-            if len(folder_parts) > 1:
-                folder_path = '/'.join(folder_parts[:-1])
-                
-                # Verificar si la carpeta existe
-                folder_url = f"https://api.github.com/repos/{repo_owner}/{repo_name}/contents/{folder_path}"
-                folder_response = requests.get(folder_url, headers=headers)
-                
-                # Si la carpeta no existe, intentar crearla
-                if folder_response.status_code == 404:
-                    st.info(f"La carpeta {folder_path} no existe. Creando archivo directamente...")
-            
-            # Crear el archivo
-            response = requests.put(url, headers=headers, data=json.dumps(data))
-            
-            if response.status_code in [200, 201]:
-                return True
-            else:
-                st.error(f"Error al crear el archivo: {response.status_code} - {response.text}")
-                return False
-        else:
-            st.error(f"Error al verificar el archivo: {response.status_code} - {response.text}")
-            return False
-    except Exception as e:
-        st.error(f"Error al guardar observaciones: {str(e)}")
-        return False
+# Journal local y sincronización con GitHub en segundo plano (compartidos entre sesiones)
+@st.cache_resource
+def obtener_buzon():
+    journal = Journal()
+    remote = GitHubContents.from_env()
+    flusher = Flusher(journal, remote).start() if remote else None
+    return journal, flusher, ObservacionesCache(journal, remote)
 
-# Función para guardar observaciones (con respaldo en sesión)
+# Función para guardar observaciones: se registra en el journal local y se sube a GitHub por lotes
 def guardar_observacion(nueva_observacion):
-    # Agregar la observación a la lista en el estado de la sesión
-    st.session_state.observaciones.append(nueva_observacion)
-    
-    # Intentar guardar en GitHub
-    exito = guardar_observaciones_en_github(st.session_state.observaciones)
-    
-    # Incluso si falla GitHub, la observación se guarda en la sesión
-    if not exito:
-        st.warning("La observación se ha guardado en la sesión actual, pero no se pudo guardar en GitHub. Las observaciones se perderán al reiniciar la aplicación.")
-    
+    journal, flusher, _ = obtener_buzon()
+    nueva_observacion["Id"] = journal.append(nueva_observacion)
+
+    if flusher:
+        flusher.notify()
+    else:
+        st.warning("No se ha configurado el token de GitHub. La observación se guardó solo en el servidor de la aplicación.")
+
     return True
 
-# Función para cargar observaciones desde GitHub
+# Función para cargar observaciones desde GitHub: petición condicional sobre la copia local
 def cargar_observaciones_desde_github():
+    _, _, cache = obtener_buzon()
+    if cache.remote is None:
+        st.warning("No se ha configurado el token de GitHub. Solo se muestran las observaciones guardadas en este servidor.")
     try:
-        # Configuración de GitHub desde variables de entorno
-        github_token = os.environ.get("GITHUB_TOKEN", "")
-        repo_owner = os.environ.get("GITHUB_REPO_OWNER", "EsguerraJHR")
-        repo_name = os.environ.get("GITHUB_REPO_NAME", "consultoriav-vf")
-        file_path = os.environ.get("GITHUB_FILE_PATH", "data/observaciones.csv")
-        
-        # Verificar si tenemos un token
-        if not github_token:
-            st.warning("No se ha configurado el token de GitHub. Las observaciones se guardarán solo en la sesión actual.")
-            return []
-        
-        # URL de la API de GitHub para obtener el contenido del archivo
-        url = f"https://api.github.com/repos/{repo_owner}/{repo_name}/contents/{file_path}"
-        
-        # Configurar headers con el token de autenticación
-        headers = {
-            "Authorization": f"token {github_token}",
-            "Accept": "application/vnd.github.v3+json"
-        }
-        
-        # Realizar la solicitud a la API de GitHub
-        response = requests.get(url, headers=headers)
-        
-        # Si el archivo existe, decodificar su contenido
-        if response.status_code == 200:
-            content = response.json()
-            file_content = base64.b64decode(content["content"]).decode("utf-8")
-            
-            # Convertir el contenido CSV a DataFrame
-            df = pd.read_csv(io.StringIO(file_content))
-            return df.to_dict('records')  # Convertir DataFrame a lista de diccionarios
-        elif response.status_code == 404:
-            # Si el archivo no existe, intentar crear la carpeta data y un archivo vacío
-            st.info("No se encontró el archivo de observaciones. Se creará uno nuevo.")
-            return []
-        else:
-            st.warning(f"Error al acceder a GitHub: {response.status_code} - {response.text}")
-            return []
+        return cache.refresh()
     except Exception as e:
-        st.warning(f"Error al cargar observaciones: {str(e)}")
-        return []
-
-# Inicializar la lista de observaciones
-if 'observaciones' not in st.session_state:
-    # Intentar cargar observaciones desde GitHub
-    github_observaciones = cargar_observaciones_desde_github()
-    
-    # Si hay observaciones en GitHub, usarlas; de lo contrario, inicializar una lista vacía
-    if github_observaciones:
-        st.session_state.observaciones = github_observaciones
-        st.success("Observaciones cargadas correctamente desde GitHub.")
-    else:
-        st.session_state.observaciones = []
-        st.info("No se pudieron cargar observaciones desde GitHub. Se usará almacenamiento en sesión.")
+        st.warning(f"Error al cargar observaciones: {str(e)}. Se muestra la última copia descargada.")
+        return None
 
 # Inicializar el estado de envío
 if 'observacion_enviada' not in st.session_state:
@@ -294,75 +168,78 @@ with st.expander("Acceso Administrativo (Solo para Hernando Castro)", expanded=F
     if admin_password == "EJHRtributario2025":  # Reemplaza esto con tu contraseña real
         st.success("Acceso concedido. Bienvenido, Hernando.")
         
-        # Botón para recargar observaciones desde GitHub
-        if st.button("Recargar observaciones desde GitHub"):
-            st.session_state.observaciones = cargar_observaciones_desde_github()
-            st.success(f"Se han cargado {len(st.session_state.observaciones)} observaciones desde GitHub.")
-            st.rerun()
-        
-        # Mostrar las observaciones
-        if st.session_state.observaciones:
-            # Convertir la lista de observaciones a un DataFrame
-            observaciones_df = pd.DataFrame(st.session_state.observaciones)
-            
-            st.write(f"Total de observaciones: {len(observaciones_df)}")
-            
+        journal, flusher, cache = obtener_buzon()
+        if flusher:
+            estado = flusher.status()
+            st.caption(f"Pendientes de sincronizar con GitHub: {estado['pending']}")
+            if estado["last_error"]:
+                st.warning(f"Último error de sincronización ({estado['failures']} fallos seguidos): {estado['last_error']}")
+
+        # La copia local se actualiza al entrar (una vez por sesión) y al recargar
+        recargar = st.button("Recargar observaciones desde GitHub")
+        if recargar or not st.session_state.get("observaciones_cargadas"):
+            resultado = cargar_observaciones_desde_github()
+            st.session_state.observaciones_cargadas = True
+            if recargar and resultado:
+                if resultado["changed"]:
+                    st.success(f"Se han cargado {resultado['rows']} observaciones desde GitHub.")
+                else:
+                    st.success("Las observaciones no han cambiado desde la última carga.")
+
+        total_observaciones = cache.count()
+        if total_observaciones:
+            st.write(f"Total de observaciones: {total_observaciones}")
+
             # Agregar filtros para las observaciones
             st.subheader("Filtros")
-            col1, col2 = st.columns(2)
-            
+            facetas = cache.facets()
+            col1, col2, col3 = st.columns(3)
+
             with col1:
-                if 'Tipo' in observaciones_df.columns:
-                    tipos_unicos = ["Todos"] + list(observaciones_df['Tipo'].unique())
-                    tipo_filtro = st.selectbox("Filtrar por tipo", tipos_unicos)
-            
+                tipo_filtro = st.selectbox("Filtrar por tipo", ["Todos"] + facetas["tipo"])
+
             with col2:
-                if 'Fecha' in observaciones_df.columns:
-                    fechas_unicas = ["Todas"] + list(observaciones_df['Fecha'].str.split(' ').str[0].unique())
-                    fecha_filtro = st.selectbox("Filtrar por fecha", fechas_unicas)
-            
-            # Aplicar filtros
-            df_filtrado = observaciones_df.copy()
-            if tipo_filtro != "Todos" and 'Tipo' in df_filtrado.columns:
-                df_filtrado = df_filtrado[df_filtrado['Tipo'] == tipo_filtro]
-            
-            if fecha_filtro != "Todas" and 'Fecha' in df_filtrado.columns:
-                df_filtrado = df_filtrado[df_filtrado['Fecha'].str.contains(fecha_filtro)]
-            
-            # Mostrar DataFrame filtrado
-            st.dataframe(df_filtrado)
-            
+                fecha_filtro = st.selectbox("Filtrar por fecha", ["Todas"] + facetas["fecha"])
+
+            # Los filtros y la paginación se resuelven con SQL sobre la copia local
+            filtros = {"tipo": tipo_filtro, "fecha": fecha_filtro}
+            total_filtrado = cache.count(**filtros)
+            paginas = max((total_filtrado + OBSERVACIONES_POR_PAGINA - 1) // OBSERVACIONES_POR_PAGINA, 1)
+            with col3:
+                pagina = st.number_input(f"Página (de {paginas})", min_value=1, max_value=paginas, value=1)
+            observaciones_pagina, _ = cache.query(page=pagina, page_size=OBSERVACIONES_POR_PAGINA, **filtros)
+
+            # Mostrar la página filtrada
+            st.caption(f"{total_filtrado} observaciones con los filtros seleccionados")
+            st.dataframe(pd.DataFrame(observaciones_pagina))
+
             # Opción para descargar las observaciones como CSV
-            csv_buffer = io.StringIO()
-            observaciones_df.to_csv(csv_buffer, index=False)
-            csv_data = csv_buffer.getvalue().encode('utf-8')
-            
             st.download_button(
                 label="Descargar todas las observaciones como CSV",
-                data=csv_data,
+                data=to_csv(cache.query(page_size=-1)[0]).encode('utf-8'),
                 file_name=f"observaciones_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
                 mime="text/csv"
             )
-            
+
             # También permitir descargar solo las observaciones filtradas
+            observaciones_filtradas = None
             if tipo_filtro != "Todos" or fecha_filtro != "Todas":
-                csv_buffer_filtrado = io.StringIO()
-                df_filtrado.to_csv(csv_buffer_filtrado, index=False)
-                csv_data_filtrado = csv_buffer_filtrado.getvalue().encode('utf-8')
-                
+                observaciones_filtradas, _ = cache.query(page_size=-1, **filtros)
                 st.download_button(
                     label="Descargar observaciones filtradas como CSV",
-                    data=csv_data_filtrado,
+                    data=to_csv(observaciones_filtradas).encode('utf-8'),
                     file_name=f"observaciones_filtradas_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
                     mime="text/csv",
                     key="download_filtered"
                 )
-            
+
             # Mostrar observaciones en formato de texto para copiar manualmente
             with st.expander("Ver observaciones en formato de texto (para copiar)"):
+                if observaciones_filtradas is None:
+                    observaciones_filtradas, _ = cache.query(page_size=-1, **filtros)
                 # Crear un formato de texto más legible
                 texto_observaciones = ""
-                for _, obs in df_filtrado.iterrows():
+                for obs in observaciones_filtradas:
                     texto_observaciones += f"Fecha: {obs['Fecha']}\n"
                     texto_observaciones += f"Nombre: {obs['Nombre']}\n"
                     texto_observaciones += f"Correo: {obs['Correo']}\n"
@@ -370,24 +247,22 @@ with st.expander("Acceso Administrativo (Solo para Hernando Castro)", expanded=F
                     texto_observaciones += f"Asunto: {obs['Asunto']}\n"
                     texto_observaciones += f"Mensaje: {obs['Mensaje']}\n"
                     texto_observaciones += "-" * 50 + "\n"
-                
-                st.text_area("Selecciona todo este texto y cópialo (Ctrl+C o Cmd+C)", 
-                             texto_observaciones, 
+
+                st.text_area("Selecciona todo este texto y cópialo (Ctrl+C o Cmd+C)",
+                             texto_observaciones,
                              height=300)
                 st.info("Puedes seleccionar todo el texto de arriba, copiarlo y pegarlo en un correo electrónico o documento.")
-            
+
             # Opción para eliminar todas las observaciones
             st.subheader("Administración de observaciones")
             if st.button("Eliminar todas las observaciones", type="primary", use_container_width=True):
                 confirmacion = st.text_input("Para confirmar, escribe 'ELIMINAR'")
                 if confirmacion == "ELIMINAR":
-                    # Vaciar la lista de observaciones
-                    st.session_state.observaciones = []
-                    
-                    # Guardar la lista vacía en GitHub
-                    exito = guardar_observaciones_en_github(st.session_state.observaciones)
-                    
+                    # Vaciar el archivo en GitHub, el journal local y la copia descargada
+                    exito = flusher.reset_remote() if flusher else False
+
                     if exito:
+                        cache.clear()
                         st.success("Todas las observaciones han sido eliminadas permanentemente.")
                         st.rerun()
                     else:
@@ -12,7 +12,8 @@ import sys
 import os
 
 # Importar el grafo y componentes
-from graph.graph import app, set_debug
+from graph.debug import set_debug
+from graph.graph import invoke_with_resume
 from graph.state import GraphState
 from graph.chains.retrieval import chroma_retriever, query_pinecone
 from graph.chains.openai_generation import generate_with_openai
@@ -122,8 +123,8 @@ def test_rag_flow(question: str, topic: str):
     print(f"\nEstado inicial: {initial_state}")
     
     try:
-        # Invocar el grafo
-        result = app.invoke(initial_state)
+        # Invocar el grafo (con puntos de control para reanudar ante errores transitorios)
+        result = invoke_with_resume(initial_state)
         
         end_time = time.time()
         duration = end_time - start_time